@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 在项目根目录下用 python -m parse_diag_table <命令> 运行，与 python main.py <命令> 相同
+
+import sys
+from parse_diag_table.main import main
+
+if __name__ == "__main__":
+    sys.exit(main())
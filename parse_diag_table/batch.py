@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License: 
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import os
+import re
+import time
+import traceback
+from contextlib import nullcontext
+
+from parse_diag_table.config import (
+    TARGET_SHEET1, TARGET_SHEET2,
+    SOURCE_SHEETS, TARGET_SHEETS,
+    ECU_NAME_PATTERN, OUTPUT_FILE_SUFFIX, PIPELINE,
+    get_data_dirs
+)
+from parse_diag_table.profiling import StageTimer, profile_to, timed
+
+
+def get_excel_files(directory):
+    """ 获取目录下所有 Excel 文件（忽略临时文件 `~$` 开头的文件） """
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if f.endswith(".xlsx") and not f.startswith("~$")]
+
+def name_tokens(file_path):
+    """文件名 (不含扩展名) 和其中由字母、数字组成的各段，如 NIO_XXX_CDC_Diag -> NIO, XXX, CDC, Diag"""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name, list(re.finditer(r"[A-Za-z0-9]+", name))
+
+def common_prefix(files):
+    """目录中所有文件名开头相同的段 (大写)，如厂商或项目前缀 NIO_XXX_；少于 2 个文件时为空
+    每个文件名至少保留最后一段，不会把整个文件名当作前缀
+    """
+    if len(files) < 2:
+        return ()
+    tokens = [[m.group(0).upper() for m in name_tokens(f)[1]] for f in files]
+    prefix = []
+    for column in zip(*(t[:-1] for t in tokens)):
+        if len(set(column)) > 1:
+            break
+        prefix.append(column[0])
+    return tuple(prefix)
+
+def get_name_prefixes(*file_lists):
+    """各目录的公共前缀，作为 get_ecu_name 的 prefixes 参数"""
+    return tuple(prefix for prefix in {common_prefix(files) for files in file_lists} if prefix)
+
+def get_vehicle_prefixes(vehicle_type):
+    """一个车辆类型 CURR_REL 和 LAST_REL 目录的公共前缀，与 get_vehicle_pairs 配对时使用的相同"""
+    curr_rel_dir, last_rel_dir, _ = get_data_dirs(vehicle_type)
+    return get_name_prefixes(*(get_excel_files(d) if os.path.isdir(d) else [] for d in (curr_rel_dir, last_rel_dir)))
+
+def get_ecu_name(file_path, prefixes=()):
+    """从文件名中提取 ECU 名称 (大写)，提取不到时使用整个文件名
+    Args:
+        prefixes: 目录的公共前缀 (get_name_prefixes)，文件名以其中之一开头时先去掉最长的一个，
+                  所有文件名都以 NIO_XXX_ 开头时不会都提取为 NIO
+    """
+    name, tokens = name_tokens(file_path)
+    words = [m.group(0).upper() for m in tokens]
+    skip = max((len(p) for p in prefixes if len(p) < len(words) and tuple(words[:len(p)]) == p), default=0)
+    if skip:
+        name = name[tokens[skip].start():]
+    match = re.match(ECU_NAME_PATTERN, name)
+    return (match.group(1) if match else name).upper()
+
+def get_output_file(output_dir, target_file):
+    """输出文件：OUTPUT/<模板文件名>_更新后.xlsx"""
+    return os.path.join(output_dir, os.path.basename(target_file).replace(".xlsx", f"{OUTPUT_FILE_SUFFIX}.xlsx"))
+
+def pair_excel_files(source_files, target_files):
+    """按 ECU 名称配对 CURR_REL 和 LAST_REL 中的文件，先去掉各目录文件名的公共前缀 (见 get_ecu_name)
+    Returns:
+        list: [(ECU 名称, 标准诊断表, 模板诊断表)]，按 ECU 名称排序
+        list: [(ECU 名称, 错误信息)]，无法配对的文件
+    """
+    errors = []
+    grouped = {}
+    prefixes = get_name_prefixes(source_files, target_files)
+    for kind, files in (('source', source_files), ('target', target_files)):
+        for file_path in files:
+            grouped.setdefault(get_ecu_name(file_path, prefixes), {}).setdefault(kind, []).append(file_path)
+
+    pairs = []
+    for ecu, files in sorted(grouped.items()):
+        sources = files.get('source', [])
+        targets = files.get('target', [])
+        if len(sources) > 1 or len(targets) > 1:
+            names = ', '.join(os.path.basename(f) for f in sources + targets)
+            errors.append((ecu, f"ECU 名称重复，无法配对: {names}"))
+        elif not targets:
+            errors.append((ecu, f"缺少模板诊断表 (LAST_REL): {os.path.basename(sources[0])}"))
+        elif not sources:
+            errors.append((ecu, f"缺少标准诊断表 (CURR_REL): {os.path.basename(targets[0])}"))
+        else:
+            pairs.append((ecu, sources[0], targets[0]))
+    return pairs, errors
+
+def get_vehicle_pairs(vehicle_type):
+    """按 ECU 名称配对一个车辆类型下新版本和旧版本的文件 (不创建输出目录)
+    Returns:
+        list: [(ECU 名称, 标准诊断表, 模板诊断表)]
+        list: [(ECU 名称, 错误信息)]，无法配对的文件
+        str: 输出目录
+    """
+    curr_rel_dir, last_rel_dir, output_dir = get_data_dirs(vehicle_type)
+
+    # 检查源目录和目标目录是否存在
+    if not os.path.exists(curr_rel_dir):
+        raise FileNotFoundError(f"源目录不存在: {curr_rel_dir}")
+    if not os.path.exists(last_rel_dir):
+        raise FileNotFoundError(f"目标目录不存在: {last_rel_dir}")
+
+    pairs, pair_errors = pair_excel_files(get_excel_files(curr_rel_dir), get_excel_files(last_rel_dir))
+    return pairs, pair_errors, output_dir
+
+def collect_vehicle_tasks(vehicle_type):
+    """收集一个车辆类型下需要处理的所有文件
+    Args:
+        vehicle_type: 车辆类型
+    Returns:
+        list: [(车辆类型, ECU 名称, 标准诊断表, 模板诊断表, 输出文件)]
+        list: [(车辆类型, ECU 名称, 错误信息)]，无法配对的文件
+    """
+    pairs, pair_errors, output_dir = get_vehicle_pairs(vehicle_type)
+
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [(vehicle_type, ecu, source_file, target_file, get_output_file(output_dir, target_file))
+             for ecu, source_file, target_file in pairs]
+    errors = [(vehicle_type, ecu, message) for ecu, message in pair_errors]
+    return tasks, errors
+
+def get_profile_file(profile_dir, vehicle_type, ecu):
+    """子进程的 cProfile 数据文件：<profile_dir>/<车辆类型>_<ECU>.prof"""
+    return os.path.join(profile_dir, f"{os.path.basename(os.path.normpath(vehicle_type))}_{ecu}.prof")
+
+def read_pair_sheets(source_file, target_file, use_cache=True, reader=None, stream=None, loader=None):
+    """读取一对文件需要的工作表，每个文件只打开、解析一次，所有工作表在 22/2E 和 31 处理之间共享
+    参数与 process_file_pair 相同
+    Returns:
+        dict: source 的工作表 {工作表名称: DataFrame}
+        dict: target 的工作表
+    """
+    from parse_diag_table.utils import read_excel_sheets
+    from parse_diag_table.cache import read_excel_sheets_cached
+
+    if loader is not None:
+        return loader(source_file, SOURCE_SHEETS), loader(target_file, TARGET_SHEETS)
+    if use_cache:
+        return (read_excel_sheets_cached(source_file, SOURCE_SHEETS, reader=reader, stream=stream),
+                read_excel_sheets_cached(target_file, TARGET_SHEETS, reader=reader))
+    return (read_excel_sheets(source_file, SOURCE_SHEETS, reader, stream),
+            read_excel_sheets(target_file, TARGET_SHEETS, reader))
+
+def save_outputs(output_file, sheets, manifest):
+    """写出一对文件的处理结果 (save_excel_workbook 的 sheets) 和清单"""
+    from parse_diag_table.utils import save_excel_workbook
+    from parse_diag_table.incremental import save_manifest
+
+    # 一次写出所有处理结果：两个工作表、31 表 A/B 列的合并单元格和列宽，不修改模板文件
+    save_excel_workbook(output_file, sheets)
+    save_manifest(output_file, manifest)
+    print(f"处理完毕, 所有处理结果已保存到: {output_file}")
+
+def process_file_pair(vehicle_type, ecu, source_file, target_file, output_file, use_cache=True, incremental=True,
+                      profile_dir=None, reader=None, stream=None, loader=None, saver=None):
+    """处理一对文件并保存结果，出错时不抛出异常，而是记录在返回结果中
+    use_cache 为 True 时，内容未修改的文件直接从解析缓存读取；
+    loader 不为空时改用 loader(文件路径, 工作表名称列表) 读取工作表 (例如 watch 模式保留在内存中的工作表)，
+    此时不再使用 use_cache/reader/stream；
+    reader 为 Excel 读取后端 (见 readers.py)，None 时使用 config.EXCEL_READER；
+    stream 为 True 时流式读取 source 的 3.1/3.2/3.3 工作表，None 时使用 config.STREAM_SOURCE_SHEETS；
+    incremental 为 True 时，只重新计算与上一次输出相比 source 有变化的 DID/RID，否则全部重新计算；
+    profile_dir 不为空时，把本次处理的 cProfile 数据保存到该目录；
+    saver 不为空时不在这里保存，而是调用 saver(result, sheets, manifest) 交给调用方写出 (见 pipeline.py)
+    Returns:
+        dict: 处理结果 {vehicle, ecu, source_file, target_file, output_file, status, error, started, elapsed,
+              recomputed, reused, timings: {stages, counts}}
+    """
+    # pandas/openpyxl 和处理模块在这里才导入，只列出文件等轻量命令不需要加载它们
+    from parse_diag_table.schema import compile_schemas
+    from parse_diag_table.records import pool_scope
+    from parse_diag_table.incremental import (
+        load_manifest, process_22_2E_incremental, process_31_incremental
+    )
+
+    result = {
+        'vehicle': vehicle_type,
+        'ecu': ecu,
+        'source_file': source_file,
+        'target_file': target_file,
+        'output_file': output_file,
+        'status': 'ok',
+        'error': None,
+        'started': time.time(),
+        'recomputed': 0,
+        'reused': 0,
+    }
+    # 子进程中单独记录 cProfile 数据，由主进程合并
+    profiler = profile_to(get_profile_file(profile_dir, vehicle_type, ecu)) if profile_dir else nullcontext()
+    start = time.perf_counter()
+    # 每对文件使用单独的取值表，处理结果 (DataFrame 和清单) 中只有解码后的值，处理完后取值表随之释放
+    with StageTimer() as timer, profiler, pool_scope():
+        try:
+            print(f"####开始处理### [{vehicle_type}] \n标准诊断表：{source_file} \n模板诊断表：{target_file}")
+
+            source_sheets, target_sheets = read_pair_sheets(source_file, target_file, use_cache, reader, stream, loader)
+
+            # 每对文件只按表头编译一次工作表结构，22/2E 和 31 处理共用；表头与配置对不上时在处理前直接报错
+            with timed('compile_schemas'):
+                schemas = compile_schemas({**source_sheets, **target_sheets})
+
+            # 上一次生成输出文件时记录的清单，只有指纹变化的 DID/RID 需要重新计算
+            manifest = load_manifest(output_file) if incremental else None
+
+            # 处理 22 和 2E 相关的内容
+            target_df_22_2E, did_manifest, did_counts = process_22_2E_incremental(
+                source_sheets, target_sheets, manifest, schemas)
+
+            # 处理 RoutineControl 0x31 相关的内容
+            target_df_31, rid_manifest, rid_counts = process_31_incremental(
+                source_sheets, target_sheets, manifest, schemas)
+            result['recomputed'] = did_counts[0] + rid_counts[0]
+            result['reused'] = did_counts[1] + rid_counts[1]
+
+            output_sheets = [
+                (TARGET_SHEET1, target_df_22_2E, []),
+                (TARGET_SHEET2, target_df_31, schemas[TARGET_SHEET2].indices(['A', 'B'])),
+            ]
+            output_manifest = {'did': did_manifest, 'rid': rid_manifest}
+            if saver is not None:
+                saver(result, output_sheets, output_manifest)
+            else:
+                save_outputs(output_file, output_sheets, output_manifest)
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = f"{type(e).__name__}: {e}"
+            print(f"错误: 处理 [{vehicle_type}] {ecu} 时出错\n{traceback.format_exc()}")
+    result['elapsed'] = time.perf_counter() - start
+    result['timings'] = timer.to_dict()
+    return result
+
+def run_tasks(tasks, jobs=1, interactive=False, use_cache=True, incremental=True, profile_dir=None, reader=None,
+              stream=None, pipeline=None):
+    """处理所有任务，所有车辆的文件共用一个进程池
+    Args:
+        tasks: collect_vehicle_tasks 返回的任务列表 (可以包含多个车辆类型)
+        jobs: 并行进程数，大于 1 时使用进程池
+        interactive: 每处理完一个文件询问是否继续 (只在串行处理时有效)
+        use_cache: 是否使用解析缓存
+        reader: Excel 读取后端，None 时使用 config.EXCEL_READER
+        stream: 是否流式读取 source 工作表，None 时使用 config.STREAM_SOURCE_SHEETS
+        incremental: 是否只重新计算有变化的 DID/RID
+        profile_dir: 使用进程池时，各子进程保存 cProfile 数据的目录 (串行处理时由调用方直接记录)
+        pipeline: 串行、非交互处理时是否使用流水线 (见 pipeline.py)，None 时使用 config.PIPELINE
+    Returns:
+        list: 每个任务的处理结果，顺序与 tasks 一致
+    """
+    results = []
+
+    if jobs > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            futures = {executor.submit(process_file_pair, *task, use_cache=use_cache, incremental=incremental,
+                                       profile_dir=profile_dir, reader=reader, stream=stream): task for task in tasks}
+            for future in as_completed(futures):
+                vehicle_type, ecu, source_file, target_file, output_file = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # 子进程异常退出等进程池错误
+                    results.append({
+                        'vehicle': vehicle_type, 'ecu': ecu,
+                        'source_file': source_file, 'target_file': target_file,
+                        'output_file': output_file, 'status': 'failed',
+                        'error': f"{type(e).__name__}: {e}", 'started': time.time(), 'elapsed': 0.0,
+                        'recomputed': 0, 'reused': 0, 'timings': {'stages': [], 'counts': {}},
+                    })
+        # 汇总顺序与提交顺序一致
+        order = {(task[0], task[1]): i for i, task in enumerate(tasks)}
+        results.sort(key=lambda r: order[(r['vehicle'], r['ecu'])])
+        return results
+
+    if not interactive and len(tasks) > 1 and (PIPELINE if pipeline is None else pipeline):
+        from parse_diag_table.pipeline import run_pipelined
+        return run_pipelined(tasks, use_cache=use_cache, incremental=incremental, reader=reader, stream=stream)
+
+    for task in tasks:
+        results.append(process_file_pair(*task, use_cache=use_cache, incremental=incremental, reader=reader,
+                                         stream=stream))
+        if interactive and task is not tasks[-1]:
+            # 处理完当前文件后，提示用户是否继续
+            user_input = input(f"文件 {task[2]} 处理完毕，是否继续处理下一个文件？(y/n): ").strip().lower()
+            if user_input == 'n':
+                print("用户选择退出，程序终止。")
+                break
+    return results
+
+def print_summary(results, errors=(), wall_time=None):
+    """按车辆类型打印每个 ECU 的处理结果和耗时，返回失败/跳过的数量"""
+    vehicles = list(dict.fromkeys([r['vehicle'] for r in results] + [e[0] for e in errors]))
+
+    print(f"\n{'=' * 60}\n处理结果汇总\n{'=' * 60}")
+    for vehicle_type in vehicles:
+        vehicle_results = [r for r in results if r['vehicle'] == vehicle_type]
+        vehicle_errors = [e for e in errors if e[0] == vehicle_type]
+        print(f"[{vehicle_type}]")
+        for result in vehicle_results:
+            status = "成功" if result['status'] == 'ok' else "失败"
+            print(f"  {result['ecu']:<16} {status}  {result['elapsed']:7.2f}s  {os.path.basename(result['output_file'])}"
+                  f"  (重新计算 {result['recomputed']}，沿用 {result['reused']})")
+            if result['error']:
+                print(f"  {'':<16} {result['error']}")
+        for _, ecu, message in vehicle_errors:
+            print(f"  {ecu:<16} 跳过  {message}")
+
+        ok = sum(1 for r in vehicle_results if r['status'] == 'ok')
+        cpu_time = sum(r['elapsed'] for r in vehicle_results)
+        # 并行处理时车辆的耗时为第一个文件开始到最后一个文件结束
+        span = max((r['started'] + r['elapsed'] for r in vehicle_results), default=0.0) - \
+            min((r['started'] for r in vehicle_results), default=0.0)
+        print(f"  小计: {len(vehicle_results) + len(vehicle_errors)} 个 ECU，成功 {ok} 个，"
+              f"累计处理耗时 {cpu_time:.2f}s，实际耗时 {span:.2f}s")
+
+    failed = sum(1 for r in results if r['status'] != 'ok') + len(errors)
+    total = len(results) + len(errors)
+    print(f"{'=' * 60}\n共 {len(vehicles)} 个车辆类型，{total} 个 ECU，成功 {total - failed} 个，失败/跳过 {failed} 个")
+    if wall_time is not None:
+        print(f"总耗时: {wall_time:.2f}s")
+    return failed
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 内存测试：用合成诊断表分别测量完整读取和流式读取 (--stream) source 工作表时的峰值内存 (RSS)
+# 每次读取在新进程中进行，峰值内存减去导入模块后的内存即为读取本身占用的内存
+# 用法: python main.py bench memory [--sizes 1000,10000,50000] [--readers openpyxl,calamine] [--json 结果.json]
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from parse_diag_table.config import EXCEL_READERS
+from parse_diag_table.readers import is_reader_available
+from parse_diag_table.synthetic import generate_pair
+
+# 子进程：导入模块后记录一次峰值内存，读取 source 工作表后再记录一次
+# Linux 上 ru_maxrss 会继承父进程 (生成诊断表后的本进程) 的峰值，因此优先使用 /proc 中按进程记录的 VmHWM
+MEASURE = """
+import os, sys, json, resource
+from parse_diag_table.config import SOURCE_SHEETS
+from parse_diag_table.utils import read_excel_sheets
+def peak_rss():
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmHWM:'))
+    # macOS 上 ru_maxrss 的单位为字节
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+before = peak_rss()
+sheets = read_excel_sheets(sys.argv[1], SOURCE_SHEETS, None if sys.argv[2] == 'stream' else sys.argv[2],
+                           stream=sys.argv[2] == 'stream')
+after = peak_rss()
+print(json.dumps({'before': before, 'after': after, 'rows': sum(len(df) for df in sheets.values())}))
+"""
+
+
+def measure(file_path, mode):
+    """在新进程中读取一次，返回 {before, after, rows}"""
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run([sys.executable, '-c', MEASURE, file_path, mode],
+                               capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{mode} 读取 {os.path.basename(file_path)} 失败:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='完整读取与流式读取的峰值内存对比')
+    parser.add_argument('--sizes', type=str, default='1000,10000,50000', help='合成诊断表的 DID 数，多个用逗号分隔')
+    parser.add_argument('--rid-ratio', type=float, default=0.1, help='RID 数与 DID 数的比例')
+    parser.add_argument('--readers', type=str, default='openpyxl,calamine', help='参与对比的完整读取后端，多个用逗号分隔')
+    parser.add_argument('--json', type=str, help='把结果保存为 JSON 文件')
+    args = parser.parse_args(argv)
+
+    readers = [r.strip() for r in args.readers.split(',') if r.strip()]
+    unknown = [r for r in readers if r not in EXCEL_READERS]
+    if unknown:
+        parser.error(f"未知的读取后端: {', '.join(unknown)} (可选: {', '.join(EXCEL_READERS)})")
+    skipped = [r for r in readers if not is_reader_available(r)]
+    if skipped:
+        print(f"未安装，跳过: {', '.join(skipped)}")
+    modes = [r for r in readers if r not in skipped] + ['stream']
+
+    results = []
+    print(f"{'DID 数':>8}{'行数':>10}" + "".join(f"{mode:>18}" for mode in modes))
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_dids in [int(size) for size in args.sizes.split(',') if size.strip()]:
+            source_file = os.path.join(work_dir, f"source_{n_dids}.xlsx")
+            target_file = os.path.join(work_dir, f"target_{n_dids}.xlsx")
+            generate_pair(source_file, target_file, n_dids, max(1, int(n_dids * args.rid_ratio)))
+            peaks = {}
+            rows = 0
+            for mode in modes:
+                usage = measure(source_file, mode)
+                peaks[mode] = usage['after'] - usage['before']
+                rows = usage['rows']
+            results.append({'dids': n_dids, 'rows': rows, 'file_bytes': os.path.getsize(source_file),
+                            'peak_bytes': peaks})
+            print(f"{n_dids:>8}{rows:>10}" + "".join(f"{peaks[mode] / 1024 / 1024:>16.1f}MB" for mode in modes),
+                  flush=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'modes': modes, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
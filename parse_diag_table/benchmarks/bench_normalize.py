@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License: 
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 单元格预处理的微基准测试：逐个单元格 apply 与整列向量化处理的对比
+# 用法: python main.py bench normalize [--rows 20000] [--cols 30] [--repeat 3]
+
+import argparse
+import random
+import time
+import pandas as pd
+from parse_diag_table.utils import normalize_df
+
+
+def legacy_normalize_df(df):
+    """原来的逐个单元格处理方式，作为对比基准"""
+    def process_cell_value(value):
+        if isinstance(value, str):
+            value = value.strip()
+            if value == '':
+                return pd.NA
+            return value
+        if pd.isna(value):
+            return pd.NA
+        return value
+
+    for col in df.columns:
+        df[col] = df[col].apply(process_cell_value)
+    df = df.dropna(how='all')
+    df = df.reset_index(drop=True)
+    return df
+
+
+def build_raw_frame(rows, cols, seed=0):
+    """构造与 pd.read_excel(na_filter=False) 结果相似的原始数据"""
+    rnd = random.Random(seed)
+    cells = ['', ' ', 'yes', 'no', ' Locked ', 'L1/L2', 'NA', 'NAN', '03', 'Resp', 'Req', 8, 16, 32]
+    data = {}
+    for c in range(cols):
+        if c == 0:
+            data[f'col{c}'] = [f'0x{i:04X}' if i % 7 else '' for i in range(rows)]
+        else:
+            data[f'col{c}'] = [rnd.choice(cells) for _ in range(rows)]
+    df = pd.DataFrame(data)
+    # 模拟整行为空的行
+    df.iloc[::50, :] = ''
+    return df
+
+
+def bench(func, raw, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        df = raw.copy()
+        start = time.perf_counter()
+        result = func(df)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='单元格预处理微基准测试')
+    parser.add_argument('--rows', type=int, default=20000, help='行数')
+    parser.add_argument('--cols', type=int, default=30, help='列数')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最短时间')
+    args = parser.parse_args(argv)
+
+    raw = build_raw_frame(args.rows, args.cols)
+    legacy_time, legacy_df = bench(legacy_normalize_df, raw, args.repeat)
+    vector_time, vector_df = bench(normalize_df, raw, args.repeat)
+
+    # 两种处理方式的结果必须完全一致
+    pd.testing.assert_frame_equal(legacy_df, vector_df)
+
+    print(f"数据规模: {args.rows} 行 x {args.cols} 列")
+    print(f"逐个单元格 apply: {legacy_time * 1000:.1f} ms")
+    print(f"整列向量化处理:   {vector_time * 1000:.1f} ms")
+    print(f"加速比: {legacy_time / vector_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
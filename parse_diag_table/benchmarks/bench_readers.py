@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# Excel 读取后端对比：用合成诊断表分别测量各个后端读取标准诊断表和模板诊断表的耗时，并检查预处理后的结果与 openpyxl 相同
+# 用法: python main.py bench readers [--sizes 1000,10000] [--rid-ratio 0.1] [--repeat 3] [--files a.xlsx,b.xlsx] [--json 结果.json]
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import pandas as pd
+from parse_diag_table.config import SOURCE_SHEETS, TARGET_SHEETS, EXCEL_READERS
+from parse_diag_table.readers import is_reader_available
+from parse_diag_table.synthetic import generate_pair
+from parse_diag_table.utils import read_excel_sheets
+
+
+def bench_file(file_path, sheet_names, readers, repeat):
+    """每个后端读取 repeat 次取最短时间，返回 {后端: 秒}；结果与第一个后端 (openpyxl) 不同时抛出 AssertionError"""
+    best = {}
+    expected = None
+    for reader in readers:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            sheets = read_excel_sheets(file_path, sheet_names, reader, stream=False)
+            elapsed = time.perf_counter() - start
+            best[reader] = min(best.get(reader, elapsed), elapsed)
+        if expected is None:
+            expected = sheets
+            continue
+        for name in sheet_names:
+            try:
+                pd.testing.assert_frame_equal(expected[name], sheets[name])
+            except AssertionError as e:
+                raise AssertionError(f"{reader} 读取 {os.path.basename(file_path)} [{name}] 的结果与 openpyxl 不同: {e}")
+    return best
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Excel 读取后端对比')
+    parser.add_argument('--sizes', type=str, default='1000,10000', help='合成诊断表的 DID 数，多个用逗号分隔')
+    parser.add_argument('--rid-ratio', type=float, default=0.1, help='RID 数与 DID 数的比例')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最短时间')
+    parser.add_argument('--files', type=str, help='同时测试的真实诊断表，多个用逗号分隔 (按所在目录 CURR_REL/LAST_REL 选择工作表)')
+    parser.add_argument('--json', type=str, help='把结果保存为 JSON 文件')
+    args = parser.parse_args(argv)
+
+    # openpyxl 放在第一个，作为比较结果的参照
+    readers = ['openpyxl'] + [r for r in EXCEL_READERS if r != 'openpyxl' and is_reader_available(r)]
+    skipped = [r for r in EXCEL_READERS if r not in readers]
+    if skipped:
+        print(f"未安装，跳过: {', '.join(skipped)}")
+
+    results = []
+    print(f"{'文件':<28}{'工作表':>8}" + "".join(f"{reader:>18}" for reader in readers))
+
+    def report(label, file_path, sheet_names):
+        timings = bench_file(file_path, sheet_names, readers, max(1, args.repeat))
+        results.append({'file': label, 'seconds': timings})
+        base = timings['openpyxl']
+        print(f"{label:<28}{len(sheet_names):>8}" +
+              "".join(f"{timings[r]:>9.3f}s ({base / timings[r]:4.1f}x)" for r in readers), flush=True)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_dids in [int(size) for size in args.sizes.split(',') if size.strip()]:
+            source_file = os.path.join(work_dir, f"source_{n_dids}.xlsx")
+            target_file = os.path.join(work_dir, f"target_{n_dids}.xlsx")
+            generate_pair(source_file, target_file, n_dids, max(1, int(n_dids * args.rid_ratio)))
+            report(f"source ({n_dids} DID)", source_file, SOURCE_SHEETS)
+            report(f"target ({n_dids} DID)", target_file, TARGET_SHEETS)
+
+    for file_path in [f.strip() for f in (args.files or '').split(',') if f.strip()]:
+        is_source = os.path.basename(os.path.dirname(os.path.abspath(file_path))) == 'CURR_REL'
+        report(os.path.basename(file_path)[:27], file_path, SOURCE_SHEETS if is_source else TARGET_SHEETS)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'readers': readers, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 规模测试：用合成诊断表分别测量读取、process_22_2E、process_31 和保存在不同规模下的耗时
+# 用法: python main.py bench scaling [--sizes 100,1000,10000] [--rid-ratio 0.1] [--churn 0.1] [--repeat 1] [--json 结果.json]
+#       [--headers canonical|variant|drift|multirow]
+
+import os
+import io
+import json
+import math
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from parse_diag_table.config import SOURCE_SHEETS, TARGET_SHEETS, TARGET_SHEET1, TARGET_SHEET2, get_column_index
+from parse_diag_table.utils import read_excel_sheets, save_excel_workbook
+from parse_diag_table.synthetic import HEADER_STYLES, generate_pair
+from parse_diag_table.main_process_22_2E import process_22_2E
+from parse_diag_table.main_process_31 import process_31
+
+STAGES = ['read', 'process_22_2E', 'process_31', 'save']
+
+
+def quiet(func, *args):
+    """执行时屏蔽处理函数打印的进度信息"""
+    with redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def bench_size(work_dir, n_dids, n_rids, churn, repeat, seed=0, headers='canonical'):
+    """生成一组指定规模的诊断表，返回每个阶段的最短耗时 {阶段: 秒}
+    headers 为标准诊断表的表头形式 (见 synthetic.HEADER_STYLES)
+    """
+    source_file = os.path.join(work_dir, f"source_{n_dids}.xlsx")
+    target_file = os.path.join(work_dir, f"target_{n_dids}.xlsx")
+    output_file = os.path.join(work_dir, f"output_{n_dids}.xlsx")
+    generate_pair(source_file, target_file, n_dids, n_rids, churn, seed, headers)
+
+    best = {}
+    def record(stage, start):
+        elapsed = time.perf_counter() - start
+        best[stage] = min(best.get(stage, elapsed), elapsed)
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        source_sheets = read_excel_sheets(source_file, SOURCE_SHEETS)
+        target_sheets = read_excel_sheets(target_file, TARGET_SHEETS)
+        record('read', start)
+
+        start = time.perf_counter()
+        target_df_22_2E = quiet(process_22_2E, source_sheets, target_sheets)
+        record('process_22_2E', start)
+
+        start = time.perf_counter()
+        target_df_31 = quiet(process_31, source_sheets, target_sheets)
+        record('process_31', start)
+
+        start = time.perf_counter()
+        save_excel_workbook(output_file, [
+            (TARGET_SHEET1, target_df_22_2E, []),
+            (TARGET_SHEET2, target_df_31, [get_column_index('A', 'rid_library'), get_column_index('B', 'rid_library')]),
+        ])
+        record('save', start)
+    return best
+
+
+def scaling_exponent(n1, t1, n2, t2):
+    """两个规模之间的增长指数：1 表示线性，2 表示平方"""
+    if t1 <= 0 or t2 <= 0 or n1 == n2:
+        return float('nan')
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='诊断表处理规模测试')
+    parser.add_argument('--sizes', type=str, default='100,1000,10000', help='DID 数，多个用逗号分隔')
+    parser.add_argument('--rid-ratio', type=float, default=0.1, help='RID 数与 DID 数的比例')
+    parser.add_argument('--churn', type=float, default=0.1, help='新增/删除的 DID、RID 占比')
+    parser.add_argument('--repeat', type=int, default=1, help='重复次数，取最短时间')
+    parser.add_argument('--headers', choices=HEADER_STYLES, default='canonical',
+                        help='标准诊断表的表头形式 (见 synthetic.py)，用于测量按表头确定列位置的开销')
+    parser.add_argument('--json', type=str, help='把结果保存为 JSON 文件')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_dids in sizes:
+            n_rids = max(1, int(n_dids * args.rid_ratio))
+            timings = bench_size(work_dir, n_dids, n_rids, args.churn, max(1, args.repeat), headers=args.headers)
+            results.append({'dids': n_dids, 'rids': n_rids, 'seconds': timings})
+            print(f"DID {n_dids:>6}  RID {n_rids:>5}  " +
+                  "  ".join(f"{stage} {timings[stage]:8.3f}s" for stage in STAGES), flush=True)
+
+    # 相邻两个规模之间每个阶段的增长指数
+    print(f"\n{'规模':<16}" + "".join(f"{stage:>15}" for stage in STAGES))
+    for prev, curr in zip(results, results[1:]):
+        exponents = [scaling_exponent(prev['dids'], prev['seconds'][stage], curr['dids'], curr['seconds'][stage])
+                     for stage in STAGES]
+        print(f"{prev['dids']:>6} -> {curr['dids']:<6}  " + "".join(f"{value:>15.2f}" for value in exponents))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'rid_ratio': args.rid_ratio, 'churn': args.churn, 'headers': args.headers, 'results': results},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
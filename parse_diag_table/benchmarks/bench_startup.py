@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 启动耗时测试：在新进程中多次运行各个子命令，测量包括解释器启动在内的总耗时，并检查是否导入了 pandas
+# 用法: python main.py bench startup [--repeat 5] [--json 结果.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+MAIN_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# 在 main.py 退出前检查 pandas 是否已经导入 (只对命令本身所在的主进程有效)
+CHECK_PANDAS = ("import atexit, sys; "
+                "atexit.register(lambda: sys.stderr.write('[pandas] %s\\n' % ('pandas' in sys.modules)))")
+
+
+def get_commands(vehicle_dir):
+    """(名称, 参数) 列表；list 使用一个只有文件名、不需要读取内容的车辆目录"""
+    return [
+        ('python -c pass', ['-c', 'pass']),
+        ('python -c "import pandas"', ['-c', 'import pandas']),
+        ('main.py --help', [MAIN_FILE, '--help']),
+        ('main.py run --help', [MAIN_FILE, 'run', '--help']),
+        ('main.py list', [MAIN_FILE, 'list', '--vehicle', vehicle_dir]),
+        ('main.py diff --help', [MAIN_FILE, 'diff', '--help']),
+        ('main.py generate --help', [MAIN_FILE, 'generate', '--help']),
+    ]
+
+
+def run_once(args):
+    """运行一次命令，返回 (耗时秒数, 是否导入了 pandas)"""
+    code = f"{CHECK_PANDAS}; sys.argv = {args!r}; import runpy; runpy.run_path({args[0]!r}, run_name='__main__')" \
+        if args[0] == MAIN_FILE else None
+    command = [sys.executable, '-c', code] if code else [sys.executable] + args
+    start = time.perf_counter()
+    completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"命令执行失败: {' '.join(args)}\n{completed.stderr}")
+    return elapsed, '[pandas] True' in completed.stderr if code else None
+
+
+def make_vehicle_dir(work_dir, ecus=('CDC', 'ADCU', 'CGW')):
+    """list 命令只看文件名，空文件即可"""
+    for sub_dir in ('CURR_REL', 'LAST_REL'):
+        os.makedirs(os.path.join(work_dir, sub_dir))
+    for ecu in ecus:
+        open(os.path.join(work_dir, 'CURR_REL', f"{ecu}_Diag_Spec.xlsx"), 'w').close()
+        open(os.path.join(work_dir, 'LAST_REL', f"{ecu}_Test_Param.xlsx"), 'w').close()
+    return work_dir
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='各子命令的启动耗时测试')
+    parser.add_argument('--repeat', type=int, default=5, help='每个命令的运行次数')
+    parser.add_argument('--json', type=str, help='把结果保存为 JSON 文件')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        vehicle_dir = make_vehicle_dir(os.path.join(work_dir, 'VEHICLE'))
+        print(f"{'命令':<30}{'最短':>10}{'中位数':>10}  导入 pandas")
+        for name, command_args in get_commands(vehicle_dir):
+            runs = [run_once(command_args) for _ in range(max(1, args.repeat))]
+            times = [elapsed for elapsed, _ in runs]
+            pandas_loaded = runs[0][1]
+            results.append({'command': name, 'min': round(min(times), 4), 'median': round(statistics.median(times), 4),
+                            'pandas': pandas_loaded})
+            flag = '' if pandas_loaded is None else ('是' if pandas_loaded else '否')
+            print(f"{name:<30}{min(times) * 1000:>8.0f}ms{statistics.median(times) * 1000:>8.0f}ms  {flag}", flush=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import os
+import pickle
+import hashlib
+import tempfile
+import pandas as pd
+
+from parse_diag_table.config import CACHE_DIR, CACHE_MAX_BYTES, STREAM_SHEETS, STREAM_SOURCE_SHEETS
+from parse_diag_table.utils import read_excel_sheets
+from parse_diag_table.profiling import timed, record_count
+
+# 预处理规则 (normalize_df) 或缓存格式变化时修改版本号，旧的缓存自动失效
+CACHE_VERSION = "2"
+CACHE_SUFFIX = ".pkl"
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_cache_file(file_hash, sheet_name, cache_dir=CACHE_DIR, streamed=False):
+    """缓存文件路径：由缓存版本、pandas 版本、文件内容哈希和工作表名称共同决定
+    流式读取的工作表只保留了列映射中的列，与完整读取的结果分开缓存
+    """
+    mode = "stream" if streamed else "full"
+    key = hashlib.sha256(
+        f"{CACHE_VERSION}\0{pd.__version__}\0{file_hash}\0{sheet_name}\0{mode}".encode('utf-8')
+    ).hexdigest()
+    return os.path.join(cache_dir, key + CACHE_SUFFIX)
+
+def load_cached_sheet(cache_file):
+    """读取缓存的 DataFrame，缓存不存在或已损坏时返回 None"""
+    try:
+        with open(cache_file, 'rb') as f:
+            df = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # 写入中断等原因导致的损坏缓存直接删除，按未命中处理
+        remove_file(cache_file)
+        return None
+    # 更新修改时间，淘汰缓存时按最近使用时间排序
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+    return df
+
+def store_cached_sheet(cache_file, df):
+    """写入缓存：先写临时文件再替换，多个进程同时写同一个缓存也不会读到不完整的文件"""
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # DataFrame 的 pickle 按列块保存 numpy 数组，读取时不需要再解析单元格
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception:
+        remove_file(tmp_file)
+        raise
+
+def remove_file(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+def evict_cache(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """缓存目录超过大小上限时，按最近使用时间从旧到新删除缓存文件
+    Returns:
+        int: 删除的缓存文件数量
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(CACHE_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        remove_file(path)
+        total -= size
+        removed += 1
+    return removed
+
+def read_excel_sheets_cached(file_path, sheet_names, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, reader=None,
+                             stream=None):
+    """与 read_excel_sheets 相同，但优先从缓存读取
+    所有工作表都命中缓存时不会打开 xlsx 文件；否则只解析一次文件，读取未命中的工作表并写入缓存
+    Args:
+        file_path: Excel 文件路径
+        sheet_names: 需要读取的工作表名称列表
+        cache_dir: 缓存目录
+        max_bytes: 缓存目录的大小上限
+        reader: 未命中时使用的读取后端；各个后端的结果相同，缓存不区分后端
+        stream: 是否流式读取 source 工作表 (见 read_excel_sheets)，None 时使用 config.STREAM_SOURCE_SHEETS
+    Returns:
+        dict: {工作表名称: 预处理后的 DataFrame}
+    """
+    with timed('hash_file', os.path.basename(file_path)):
+        file_hash = hash_file(file_path)
+    stream = STREAM_SOURCE_SHEETS if stream is None else stream
+    cache_files = {name: get_cache_file(file_hash, name, cache_dir, stream and name in STREAM_SHEETS)
+                   for name in sheet_names}
+
+    sheets = {}
+    for name, cache_file in cache_files.items():
+        with timed('read_sheet_cached', name):
+            df = load_cached_sheet(cache_file)
+        if df is not None:
+            sheets[name] = df
+            record_count('sheet_rows', len(df))
+
+    missing = [name for name in sheet_names if name not in sheets]
+    if missing:
+        sheets.update(read_excel_sheets(file_path, missing, reader, stream))
+        for name in missing:
+            try:
+                store_cached_sheet(cache_files[name], sheets[name])
+            except OSError as e:
+                # 缓存只用于加速，写入失败 (如磁盘已满、无写权限) 不影响处理
+                print(f"警告: 写入解析缓存失败: {e}")
+        try:
+            evict_cache(cache_dir, max_bytes)
+        except OSError:
+            pass
+
+    return {name: sheets[name] for name in sheet_names}
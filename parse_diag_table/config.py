@@ -41,6 +41,73 @@ def get_data_dirs(vehicle_type):
     output_dir = os.path.join(DATA_DIR, vehicle_type, "OUTPUT")
     return curr_rel_dir, last_rel_dir, output_dir
 
+# 从文件名中提取 ECU 名称的正则 (取第一个分组)，用于配对 CURR_REL 和 LAST_REL 中同一个 ECU 的文件
+# 例如 CDC_Diag_Spec_V2.xlsx 和 CDC_Test_Param.xlsx 的 ECU 名称都是 CDC
+# 同一目录中所有文件名开头相同的段 (如 NIO_XXX_CDC_Diag.xlsx 中的 NIO_XXX_) 先去掉，再匹配这个正则
+ECU_NAME_PATTERN = r"^([A-Za-z0-9]+)"
+
+# 输出文件名后缀：OUTPUT/<模板文件名>_更新后.xlsx
+OUTPUT_FILE_SUFFIX = "_更新后"
+
+def get_vehicle_types(data_dir=None):
+    """获取数据目录下所有车辆类型 (同时包含 CURR_REL 和 LAST_REL 目录的子目录)
+    Args:
+        data_dir: 数据目录，默认为 DATA_DIR
+    Returns:
+        list: 按名称排序的车辆类型
+    """
+    data_dir = data_dir or DATA_DIR
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(data_dir)
+        if os.path.isdir(os.path.join(data_dir, name, "CURR_REL"))
+        and os.path.isdir(os.path.join(data_dir, name, "LAST_REL"))
+    )
+
+# 解析缓存配置：按文件内容哈希和工作表名称缓存预处理后的 DataFrame，文件未修改时不再解析 xlsx
+CACHE_DIR = os.path.join(BASE_DIR, "parse_diag_table", ".cache")
+# 缓存目录的大小上限 (字节)，超出时删除最久未使用的缓存文件
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Excel 读取后端 (见 readers.py)：auto 时优先使用 calamine (需要安装 python-calamine)，
+# 没有安装或读取失败时依次改用 openpyxl-stream、openpyxl；也可以用命令行参数 --reader 指定
+EXCEL_READER = "auto"
+# 可选的读取后端，auto 时按此顺序使用第一个可用的后端
+EXCEL_READERS = ["calamine", "openpyxl-stream", "openpyxl"]
+
+# 是否流式读取 source 的 3.1/3.2/3.3 工作表：逐行解析并只保留列映射中的列，内存占用更小，
+# 适合非常大的诊断表或多个进程并行处理；也可以用命令行参数 --stream 打开
+STREAM_SOURCE_SHEETS = False
+
+# 流水线处理 (pipeline.py)：串行、非交互处理多个文件时 (--batch 且 --jobs 1)，在后台线程中提前读取后面文件的工作表、
+# 写出前面文件的输出文件，与当前文件的计算同时进行；数据目录在网络共享上时效果最明显，也可以用命令行参数 --no-pipeline 关闭
+PIPELINE = True
+# 读取和写出队列的长度上限 (文件对数)，限制同时保留在内存中的工作表
+PIPELINE_DEPTH = 1
+
+# watch 模式 (python main.py watch)：轮询 CURR_REL/LAST_REL 目录的间隔 (秒)，
+# 以及文件最后一次变化后需要保持不变的时间 (秒)，保存过程中写了一半的文件不会被处理
+WATCH_INTERVAL = 0.5
+WATCH_DEBOUNCE = 1.0
+
+# 查询服务 (python main.py serve)：只监听本机的地址和端口，以及检查 OUTPUT 文件是否重新生成的间隔 (秒)；
+# 输出文件最后一次变化后保持 WATCH_DEBOUNCE 秒不变才重新加载
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_RELOAD_INTERVAL = 1.0
+
+# SQLite 导出 (export.py)：run/watch 生成输出文件后，把每个车辆所有 ECU 的 DID/RID 属性导出到
+# OUTPUT 目录中的数据库 (只重新导出重新生成过的 ECU)；也可以用 python main.py export 单独导出
+EXPORT_SQLITE = True
+EXPORT_FILE_NAME = "test_params.sqlite"
+
+# 跨 ECU 的 DID/RID 索引 (python main.py index build/query)：由 CURR_REL 中的标准诊断表建立，保存在车辆目录中
+INDEX_FILE_NAME = "did_rid_index.sqlite"
+
+# 运行报告目录：每次运行的阶段耗时、数量 (JSON) 和 --profile 的 cProfile 数据
+REPORT_DIR = os.path.join(BASE_DIR, "parse_diag_table", "reports")
+
 # 工作表配置
 SOURCE_SHEET1 = "3.1Basic DIDs"
 SOURCE_SHEET2 = "3.2RDBI 0x22 & WDBI 0x2E"
@@ -49,6 +116,13 @@ TARGET_SHEET1 = "22_2E_DID_Library"
 SOURCE_SHEET3 = "3.3RoutineControl 0x31"
 TARGET_SHEET2 = "31_RID_Library"
 
+# 每个文件需要读取的全部工作表（一次打开，一次读取）
+SOURCE_SHEETS = (SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3)
+TARGET_SHEETS = (TARGET_SHEET1, TARGET_SHEET2)
+
+# 每个 RID 在 31_RID_Library 中占三行，依次对应这三个子服务
+SUBSERVICES = ['01', '02', '03']
+
 
 # 列索引映射
 # CURR_REL_DIR 的列映射 - 3.1 Basic DIDs
@@ -135,6 +209,70 @@ RID_LIBRARY_COLUMN_MAP = {
     'K': 10  # ResponseNRC
 }
 
+# 各列的表头名称，用于按表头确定列的实际位置并检查列是否错位 (见 schema.py)
+# 比较时不区分大小写、忽略空白字符；同一列有多种写法时写成元组
+BASIC_DID_COLUMN_HEADERS = {
+    'A': 'DID Number(hex)', 'B': 'DID Name (English)', 'C': 'DID Name(Chinese)', 'E': 'Support',
+    'F': 'Byte Length(Dec)', 'H': 'Read.APP.Support', 'I': 'Read.APP.Access_Level',
+    'J': 'Read.APP.Session', 'K': 'Read.Booloader.Supprt', 'L': 'Read.Bootloader.Access_Level',
+    'M': 'Read.Bootloader.Session', 'N': 'Write.APP.Support', 'O': 'Write.APP.Access_Level',
+    'P': 'Write.APP.Session', 'R': 'Write.Booloader.Supprt', 'S': 'Write.Bootloader.Access_Level',
+    'T': 'Write.Bootloader.Session', 'AB': 'Formula',
+}
+RDBI_WDBI_COLUMN_HEADERS = {
+    'A': 'DID Number(hex)', 'B': 'DID Name (English)', 'C': 'DID Name(Chinese)', 'D': 'Byte Length(Dec)',
+    'E': 'Storage', 'F': 'Read.APP.Support', 'G': 'Read.APP.Access_Level', 'H': 'Read.APP.Session',
+    'I': 'Read.Booloader.Supprt', 'J': 'Read.Bootloader.Access_Level', 'K': 'Read.Bootloader.Session',
+    'L': 'Write.APP.Support', 'M': 'Write.APP.Access_Level', 'N': 'Write.APP.Session',
+    'P': 'Write.Booloader.Supprt', 'Q': 'Write.Bootloader.Access_Level', 'R': 'Write.Bootloader.Session',
+    'Z': 'Formula',
+}
+ROUTINE_CONTROL_COLUMN_HEADERS = {
+    'A': 'RID Number(hex)', 'B': 'RID Name(English)', 'C': 'RID Name(Chinese)', 'D': 'Access Level',
+    'E': 'Session', 'F': 'Routine Condition', 'G': 'Subfunction', 'H': 'Req/Resp', 'M': 'BitLength',
+}
+DID_LIBRARY_COLUMN_HEADERS = {
+    'A': 'DID', 'B': 'Description', 'C': 'Format', 'D': 'Length', 'E': 'APP', 'F': 'Boot',
+    'G': 'Security Level(2E)', 'H': 'Security Level(22)',
+}
+RID_LIBRARY_COLUMN_HEADERS = {
+    'A': 'RID', 'B': 'Description', 'C': 'APP', 'D': 'Boot', 'E': 'SubService', 'F': 'LockLevel',
+    'G': 'Session', 'H': 'RequestData', 'I': 'ResponseLength', 'J': 'ResponseData', 'K': 'ResponseNRC',
+}
+
+# 某一列的表头在表头中找不到、配置中的位置上又是其他表头 (写法不同、多行表头等) 时：
+# False 时与按列字母读取时一样使用配置中的位置并打印警告；True 时报错 (ColumnDriftError)，该 ECU 不生成输出
+STRICT_COLUMN_HEADERS = False
+
+# 表格类型 (sheet_type) 对应的列映射和表头名称
+COLUMN_MAPS = {
+    'basic_did': BASIC_DID_COLUMN_MAP,
+    'rdbi_wdbi': RDBI_WDBI_COLUMN_MAP,
+    'routine_control': ROUTINE_CONTROL_COLUMN_MAP,
+    'did_library': DID_LIBRARY_COLUMN_MAP,
+    'rid_library': RID_LIBRARY_COLUMN_MAP,
+}
+COLUMN_HEADERS = {
+    'basic_did': BASIC_DID_COLUMN_HEADERS,
+    'rdbi_wdbi': RDBI_WDBI_COLUMN_HEADERS,
+    'routine_control': ROUTINE_CONTROL_COLUMN_HEADERS,
+    'did_library': DID_LIBRARY_COLUMN_HEADERS,
+    'rid_library': RID_LIBRARY_COLUMN_HEADERS,
+}
+
+# 工作表名称对应的表格类型
+SHEET_TYPES = {
+    SOURCE_SHEET1: 'basic_did',
+    SOURCE_SHEET2: 'rdbi_wdbi',
+    SOURCE_SHEET3: 'routine_control',
+    TARGET_SHEET1: 'did_library',
+    TARGET_SHEET2: 'rid_library',
+}
+
+# 流式读取 (--stream) 的工作表：只保留列映射中的列 (按表头确定位置)，其余列读取为空值
+STREAM_SHEETS = (SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3)
+
+
 # 反向映射，用于调试
 BASIC_DID_COLUMN_LETTERS = {v: k for k, v in BASIC_DID_COLUMN_MAP.items()}
 RDBI_WDBI_COLUMN_LETTERS = {v: k for k, v in RDBI_WDBI_COLUMN_MAP.items()}
@@ -143,7 +281,8 @@ DID_LIBRARY_COLUMN_LETTERS = {v: k for k, v in DID_LIBRARY_COLUMN_MAP.items()}
 RID_LIBRARY_COLUMN_LETTERS = {v: k for k, v in RID_LIBRARY_COLUMN_MAP.items()}
 
 def get_column_index(letter, sheet_type='basic_did'):
-    """获取列字母对应的索引
+    """获取列字母在配置中的固定索引 (不检查实际的表头)
+    处理读取到的工作表时使用 schema.py 按表头编译的 SheetSchema，列错位时直接报错
     Args:
         letter: 列字母
         sheet_type: 表格类型，可选值：
@@ -153,15 +292,7 @@ def get_column_index(letter, sheet_type='basic_did'):
             - 'did_library': 22_2E_DID_Library
             - 'rid_library': 31_RID_Library
     """
-    if sheet_type == 'basic_did':
-        return BASIC_DID_COLUMN_MAP[letter]
-    elif sheet_type == 'rdbi_wdbi':
-        return RDBI_WDBI_COLUMN_MAP[letter]
-    elif sheet_type == 'routine_control':
-        return ROUTINE_CONTROL_COLUMN_MAP[letter]
-    elif sheet_type == 'did_library':
-        return DID_LIBRARY_COLUMN_MAP[letter]
-    elif sheet_type == 'rid_library':
-        return RID_LIBRARY_COLUMN_MAP[letter]
-    else:
+    column_map = COLUMN_MAPS.get(sheet_type)
+    if column_map is None:
         raise ValueError(f"Unknown sheet type: {sheet_type}")
+    return column_map[letter]
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 版本间差异报告：按 ECU 列出新增、删除和属性变化的 DID/RID，不生成 Excel 文件
+# 用法: python main.py diff [--vehicle BLANC_RL201] [--base 旧版本 CURR_REL 目录] [--format json|csv] [--output 文件]
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from parse_diag_table.config import (
+    SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3,
+    TARGET_SHEET1, TARGET_SHEET2,
+    VEHICLE_TYPE, REPORT_DIR, EXCEL_READERS,
+    get_data_dirs,
+)
+from parse_diag_table.schema import compile_schemas
+from parse_diag_table.records import RecordTable, DidRecord, RidRecord, pool_scope
+from parse_diag_table.batch import get_excel_files, pair_excel_files
+from parse_diag_table.cache import read_excel_sheets_cached
+from parse_diag_table.main_process_22_2E import (
+    build_did_index, build_did_source_table, compute_did_columns,
+    get_source_did_list, get_target_dids,
+)
+from parse_diag_table.main_process_31 import (
+    SUBSERVICES, build_rid_segments, build_rid_source_table, aggregate_rid_responses,
+    build_rid_row_values, get_source_rid_list,
+)
+
+# 参与比较的属性 {列字母: 属性名}，与 22_2E_DID_Library / 31_RID_Library 的列一致
+DID_FIELDS = {
+    'B': 'Description', 'C': 'Format', 'D': 'Length', 'E': 'APP', 'F': 'Boot',
+    'G': 'Security Level(2E)', 'H': 'Security Level(22)',
+}
+RID_FIELDS = {
+    'B': 'Description', 'C': 'APP', 'D': 'Boot', 'E': 'SubService', 'F': 'LockLevel', 'G': 'Session',
+    'H': 'RequestData', 'I': 'ResponseLength', 'J': 'ResponseData', 'K': 'ResponseNRC',
+}
+CSV_COLUMNS = ['ecu', 'kind', 'change', 'id', 'subservice', 'field', 'old', 'new']
+
+def normalize_value(value):
+    """比较前统一取值：空值为空字符串，整数形式的浮点数 (4.0) 与整数 (4) 相同，字符串去除前后空格"""
+    if value is None or value is pd.NA or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def source_did_table(source_sheets, schemas):
+    """按工具的处理规则，由标准诊断表计算每个 DID 在 22_2E_DID_Library 中的属性
+    Returns:
+        RecordTable: 键为 DID (不带 0x)，字段为 DID_FIELDS 中的属性，记录类型为 DidRecord
+    """
+    source_df1 = source_sheets[SOURCE_SHEET1]
+    source_df2 = source_sheets[SOURCE_SHEET2]
+    did_index = build_did_index(source_df1, source_df2, schemas)
+    dids = list(dict.fromkeys(get_source_did_list(source_df1, source_df2, did_index, schemas)))
+    source_table = build_did_source_table(source_df1, source_df2, did_index, schemas)
+    columns = compute_did_columns(source_table, [source_table.positions[did] for did in dids])
+    codes = np.column_stack([columns[letter] for letter in DID_FIELDS]) if dids else np.empty((0, len(DID_FIELDS)))
+    return RecordTable(dids, DID_FIELDS.values(), codes, DidRecord)
+
+def target_did_table(target_sheets, schemas):
+    """读取模板诊断表中每个 DID 当前的属性 (同一个 DID 取第一次出现的行)"""
+    target_df = target_sheets[TARGET_SHEET1]
+    schema = schemas[TARGET_SHEET1]
+    dids = get_target_dids(target_df, schema)
+    dids = dids[~dids.duplicated().to_numpy(dtype=bool)]
+    rows = target_df.loc[dids.index]
+    return RecordTable.from_columns(dids.tolist(),
+                                    {name: rows.iloc[:, schema[letter]] for letter, name in DID_FIELDS.items()},
+                                    DidRecord)
+
+def source_rid_table(source_sheets, schemas):
+    """按工具的处理规则，由标准诊断表计算每个 RID 三个子服务在 31_RID_Library 中的属性
+    Returns:
+        RecordTable: 键为 (RID, subservice)，字段为 RID_FIELDS 中的属性，记录类型为 RidRecord
+    """
+    source_df = source_sheets[SOURCE_SHEET3]
+    schema = schemas[SOURCE_SHEET3]
+    rid_segments = build_rid_segments(source_df, schema)
+    rid_table = build_rid_source_table(source_df, rid_segments, schema)
+    responses, _ = aggregate_rid_responses(source_df, rid_segments, schema)
+    keys, rows = [], []
+    for rid in dict.fromkeys(get_source_rid_list(source_df, schema)):
+        _, _, segment_rows = rid_segments[rid]
+        rid_source = rid_table.record(rid)
+        for subservice in SUBSERVICES:
+            has_source = bool(segment_rows[subservice])
+            record = build_rid_row_values(subservice, rid_source, has_source)
+            if has_source:
+                record.response_length, record.response_nrc = responses[(rid, subservice)]
+            values = dict(record.items())
+            keys.append((rid, subservice))
+            rows.append([values.get(letter) for letter in RID_FIELDS])
+    return RecordTable.from_rows(keys, RID_FIELDS.values(), rows, RidRecord)
+
+def target_rid_table(target_sheets, schemas):
+    """读取模板诊断表中每个 RID 三个子服务当前的属性
+    每个 RID 占三行，依次对应 SUBSERVICES (与 pre_process_31 的分组方式相同)
+    """
+    target_df = target_sheets[TARGET_SHEET2]
+    schema = schemas[TARGET_SHEET2]
+    rid_column = target_df.iloc[:, schema['A']]
+    rid_text = rid_column.astype(str).str.strip().str.upper()
+    is_rid_row = (rid_column.notna() & ~rid_text.isin(['NAN', 'NA'])).to_numpy(dtype=bool)
+
+    field_cols = schema.indices(RID_FIELDS)
+    values = target_df.iloc[:, field_cols].to_numpy(dtype=object)
+    keys, rows = [], []
+    seen = set()
+    for idx in np.flatnonzero(is_rid_row):
+        rid = str(rid_column.iat[idx])
+        block_start = idx - idx % 3
+        for offset, subservice in enumerate(SUBSERVICES):
+            row = block_start + offset
+            if (rid, subservice) in seen or row >= len(target_df):
+                continue
+            seen.add((rid, subservice))
+            keys.append((rid, subservice))
+            row_values = values[row].tolist()
+            if not is_rid_row[row]:
+                # 与 pre_process_31 相同：组内其余行的 Description 取 RID 所在行的值 (模板中通常是合并单元格)
+                row_values[0] = values[idx][0]
+            rows.append(row_values)
+    return RecordTable.from_rows(keys, RID_FIELDS.values(), rows, RidRecord)
+
+def diff_tables(old, new):
+    """比较两张属性表 (RecordTable)，同一个键出现多次时取第一行
+    Returns:
+        list: 新增的键
+        list: 删除的键
+        list: [(键, 属性, 旧值, 新值)]，只比较两边都有的键
+    """
+    old_positions = old.positions
+    new_positions = new.positions
+    added = [key for key in new_positions if key not in old_positions]
+    removed = [key for key in old_positions if key not in new_positions]
+    common = [key for key in new_positions if key in old_positions]
+    if not common:
+        return added, removed, []
+
+    # 两张表的编码来自同一个取值表，规范化 (按取值缓存) 后直接比较整数，只对有差异的单元格生成记录
+    pool = new.pool
+    if old.pool is not pool:
+        raise ValueError("两张表的编码来自不同的取值表，不能直接比较")
+    old_codes = pool.map(old.codes([old_positions[key] for key in common]), normalize_value)
+    new_codes = pool.map(new.codes([new_positions[key] for key in common]), normalize_value)
+    rows, cols = (old_codes != new_codes).nonzero()
+    changed = list(zip([common[row] for row in rows.tolist()], [new.fields[col] for col in cols.tolist()],
+                       pool.decode(old_codes[rows, cols]).tolist(), pool.decode(new_codes[rows, cols]).tolist()))
+    return added, removed, changed
+
+def diff_ecu(ecu, source_file, base_file, base_is_source=False, reader=None, stream=None):
+    """比较一个 ECU 的两个版本
+    Args:
+        ecu: ECU 名称
+        source_file: 新版本标准诊断表 (CURR_REL)
+        base_file: 基准文件：模板诊断表 (LAST_REL)，或 base_is_source 为 True 时的旧版本标准诊断表
+        reader: Excel 读取后端，None 时使用 config.EXCEL_READER
+        stream: 是否流式读取标准诊断表的工作表，None 时使用 config.STREAM_SOURCE_SHEETS
+    Returns:
+        dict: {ecu, source_file, base_file, status, error, did: {added, removed, changed}, rid: {...}}
+    """
+    result = {'ecu': ecu, 'source_file': source_file, 'base_file': base_file, 'status': 'ok', 'error': None}
+    try:
+        # 两个版本的表使用同一个取值表，比较结束后 (只保留解码后的值) 一起释放
+        with pool_scope():
+            source_sheets = read_excel_sheets_cached(source_file, (SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3),
+                                                     reader=reader, stream=stream)
+            # 每个文件只编译一次工作表结构，表头与配置对不上时直接报错
+            source_schemas = compile_schemas(source_sheets)
+            if base_is_source:
+                base_sheets = read_excel_sheets_cached(base_file, (SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3),
+                                                       reader=reader, stream=stream)
+                base_schemas = compile_schemas(base_sheets)
+                old_dids = source_did_table(base_sheets, base_schemas)
+                old_rids = source_rid_table(base_sheets, base_schemas)
+            else:
+                base_sheets = read_excel_sheets_cached(base_file, (TARGET_SHEET1, TARGET_SHEET2), reader=reader)
+                base_schemas = compile_schemas(base_sheets)
+                old_dids = target_did_table(base_sheets, base_schemas)
+                old_rids = target_rid_table(base_sheets, base_schemas)
+
+            added, removed, changed = diff_tables(old_dids, source_did_table(source_sheets, source_schemas))
+            result['did'] = {
+                'added': added,
+                'removed': removed,
+                'changed': [{'did': did, 'field': field, 'old': old, 'new': new}
+                            for did, field, old, new in changed],
+            }
+
+            new_rids = source_rid_table(source_sheets, source_schemas)
+            added, removed, changed = diff_tables(old_rids, new_rids)
+            # RID 的新增/删除按 RID 统计，属性变化按 (RID, 子服务) 统计
+            result['rid'] = {
+                'added': list(dict.fromkeys(rid for rid, _ in added)),
+                'removed': list(dict.fromkeys(rid for rid, _ in removed)),
+                'changed': [{'rid': rid, 'subservice': subservice, 'field': field, 'old': old, 'new': new}
+                            for (rid, subservice), field, old, new in changed],
+            }
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        print(f"错误: 比较 {ecu} 时出错\n{traceback.format_exc()}")
+    return result
+
+def collect_diff_pairs(vehicle_type, base_dir=None):
+    """按 ECU 配对需要比较的文件
+    Args:
+        vehicle_type: 车辆类型
+        base_dir: 旧版本 CURR_REL 目录；为空时与 LAST_REL 中的模板诊断表比较
+    Returns:
+        list: [(ECU 名称, 新版本标准诊断表, 基准文件)]
+        list: [(ECU 名称, 错误信息)]
+    """
+    curr_rel_dir, last_rel_dir, _ = get_data_dirs(vehicle_type)
+    base_dir = base_dir or last_rel_dir
+    for directory in (curr_rel_dir, base_dir):
+        if not os.path.exists(directory):
+            raise FileNotFoundError(f"目录不存在: {directory}")
+    return pair_excel_files(get_excel_files(curr_rel_dir), get_excel_files(base_dir))
+
+def to_csv_rows(results):
+    """把差异报告展开为一行一条差异的表格"""
+    rows = []
+    for result in results:
+        if result['status'] != 'ok':
+            rows.append({'ecu': result['ecu'], 'change': 'error', 'new': result['error']})
+            continue
+        for kind, id_key in (('did', 'did'), ('rid', 'rid')):
+            section = result[kind]
+            for change in ('added', 'removed'):
+                rows.extend({'ecu': result['ecu'], 'kind': kind.upper(), 'change': change, 'id': key}
+                            for key in section[change])
+            for item in section['changed']:
+                rows.append({'ecu': result['ecu'], 'kind': kind.upper(), 'change': 'changed', 'id': item[id_key],
+                             'subservice': item.get('subservice'), 'field': item['field'],
+                             'old': item['old'], 'new': item['new']})
+    return rows
+
+def write_diff_report(output_file, results, report_format='json'):
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    if report_format == 'csv':
+        with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(to_csv_rows(results))
+    else:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+def print_diff_summary(results, pair_errors=()):
+    print(f"\n{'ECU':<16} {'DID 新增':>8} {'DID 删除':>8} {'DID 变化':>8} {'RID 新增':>8} {'RID 删除':>8} {'RID 变化':>8}")
+    for result in results:
+        if result['status'] != 'ok':
+            print(f"{result['ecu']:<16} 失败: {result['error']}")
+            continue
+        counts = [len(result[kind][change]) for kind in ('did', 'rid') for change in ('added', 'removed', 'changed')]
+        print(f"{result['ecu']:<16} " + " ".join(f"{count:>10}" for count in counts))
+    for ecu, message in pair_errors:
+        print(f"{ecu:<16} 跳过: {message}")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='比较诊断表版本差异 (不生成 Excel 文件)')
+    parser.add_argument('--vehicle', type=str, default=VEHICLE_TYPE, help='车辆类型 (例如: BLANC_RL201, CETUS_RL201)')
+    parser.add_argument('--base', type=str, help='旧版本标准诊断表所在目录；不指定时与 LAST_REL 中的模板诊断表比较')
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', help='报告格式')
+    parser.add_argument('--output', type=str, help='报告保存路径，默认为 reports/diff_<时间>.<格式>')
+    parser.add_argument('--jobs', type=int, default=1, help='并行处理的进程数')
+    parser.add_argument('--reader', choices=['auto'] + EXCEL_READERS,
+                        help='Excel 读取后端，默认使用 config.EXCEL_READER')
+    parser.add_argument('--stream', action='store_const', const=True,
+                        help='流式读取标准诊断表的 3.1/3.2/3.3 工作表，减少内存占用 (默认使用 config.STREAM_SOURCE_SHEETS)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    pairs, pair_errors = collect_diff_pairs(args.vehicle, args.base)
+    tasks = [(ecu, source_file, base_file, bool(args.base), args.reader, args.stream) for ecu, source_file, base_file in pairs]
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(tasks))) as executor:
+            results = list(executor.map(diff_ecu, *zip(*tasks)))
+    else:
+        results = [diff_ecu(*task) for task in tasks]
+
+    output_file = args.output or os.path.join(REPORT_DIR, time.strftime(f'diff_%Y%m%d_%H%M%S.{args.format}'))
+    write_diff_report(output_file, results, args.format)
+    print_diff_summary(results, pair_errors)
+    print(f"\n差异报告已保存到: {output_file} (耗时 {time.perf_counter() - start:.2f}s)")
+    return 1 if pair_errors or any(r['status'] != 'ok' for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# SQLite 导出：每个车辆的 OUTPUT 目录中一个数据库 (config.EXPORT_FILE_NAME)，包含所有 ECU 输出文件中的
+# 22_2E_DID_Library 和 31_RID_Library，测试工具按索引查询属性，不需要打开每个 Excel 文件
+# - did: 每个 (ECU, DID) 一行；rid: 31 表中每个 RID 的三行展开为每个 (ECU, RID, subservice) 一行
+# - DID/RID 统一为不带 0x 的大写十六进制，子服务为 01/02/03 (与查询服务相同)
+# - ecus 表记录导出时输出文件的文件名、大小和修改时间，只有重新生成过的 ECU 才重新读取和写入，run/watch 每次生成后都会导出
+# - 使用默认的回滚日志 (不使用 WAL)，数据目录在网络共享上时也可以使用
+# 用法: python main.py export [--vehicle all] [--full]
+
+import os
+import time
+import sqlite3
+
+from parse_diag_table.config import EXPORT_FILE_NAME, SUBSERVICES, get_data_dirs
+from parse_diag_table.batch import get_ecu_name, get_vehicle_prefixes
+
+# 表结构变化时加 1，旧版本的数据库会重新创建
+SCHEMA_VERSION = 2
+
+DID_COLUMNS = ['description', 'format', 'length', 'app', 'boot', 'security_2e', 'security_22']
+# 子服务所在行的 subservice 列 (0x01 等) 与键中的子服务相同，不再单独保存
+RID_COLUMNS = ['description', 'app', 'boot', 'lock_level', 'session',
+               'request_data', 'response_length', 'response_data', 'response_nrc']
+
+SCHEMA = f"""
+CREATE TABLE ecus (
+    ecu TEXT PRIMARY KEY, file TEXT NOT NULL, size INTEGER, mtime_ns INTEGER, exported_at TEXT
+);
+CREATE TABLE did (
+    ecu TEXT NOT NULL, did TEXT NOT NULL, {', '.join(DID_COLUMNS)},
+    PRIMARY KEY (ecu, did)
+) WITHOUT ROWID;
+CREATE INDEX did_by_id ON did (did);
+CREATE TABLE rid (
+    ecu TEXT NOT NULL, rid TEXT NOT NULL, subservice TEXT NOT NULL, {', '.join(RID_COLUMNS)},
+    PRIMARY KEY (ecu, rid, subservice)
+) WITHOUT ROWID;
+CREATE INDEX rid_by_id ON rid (rid, subservice);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+def normalize_id(value):
+    """DID/RID 统一为不带 0x 的大写十六进制字符串：F190、0xf190 和 0xF190 是同一个 DID"""
+    text = str(value).strip().upper()
+    return text[2:] if text.startswith('0X') else text
+
+def normalize_subservice(value):
+    """子服务统一为两位：1、01、0x01 都是 01"""
+    text = normalize_id(value)
+    if text not in SUBSERVICES:
+        text = text.zfill(2)
+    if text not in SUBSERVICES:
+        raise ValueError(f"未知的子服务: {value} (可选: {', '.join(SUBSERVICES)})")
+    return text
+
+def get_export_file(vehicle_type):
+    """车辆的导出文件：OUTPUT/<EXPORT_FILE_NAME>"""
+    _, _, output_dir = get_data_dirs(vehicle_type)
+    return os.path.join(output_dir, EXPORT_FILE_NAME)
+
+def table_rows(table, columns, key_columns):
+    """RecordTable 的每一行 (键, 各列的值)
+    columns 为记录类型 (DidRecord/RidRecord) 的字段名，表的列与记录类型的字段顺序相同；key_columns 为键的列数
+    单元格的值转换为 SQLite 可以保存的类型：空值和空字符串为 NULL，numpy 标量转换为 Python 类型，其余转换为字符串
+    """
+    from parse_diag_table.service import json_default
+    fields = dict(zip(table.record_type.__slots__, table.fields))
+    values = [[(value if value.strip() else None) if isinstance(value, str)
+               else value if isinstance(value, (int, float)) else json_default(value)
+               for value in table.column(fields[name])] for name in columns]
+    keys = [(key,) if key_columns == 1 else key for key in table.keys]
+    return [tuple(key) + row for key, row in zip(keys, zip(*values))]
+
+def open_database(db_path):
+    """打开数据库，不存在或版本不同时重新建表"""
+    connection = sqlite3.connect(db_path, timeout=30)
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with connection:
+            for name in ('did', 'rid', 'ecus'):
+                connection.execute(f"DROP TABLE IF EXISTS {name}")
+        connection.executescript(SCHEMA)
+    return connection
+
+def library_rows(library):
+    """一个 ECU 的 did 表和 rid 表的行 (不含 ecu 列)"""
+    return table_rows(library.dids, DID_COLUMNS, 1), table_rows(library.rids, RID_COLUMNS, 2)
+
+def write_ecu(connection, ecu, file_path, signature, did_rows, rid_rows):
+    """替换一个 ECU 的所有行 (在调用者的事务中)，同一个键出现多次时与查询服务一样取第一行
+    Args:
+        file_path: 数据来源的文件，与 signature (大小, 修改时间) 一起记录在 ecus 表中
+        did_rows/rid_rows: library_rows 返回的行
+    """
+    connection.execute("DELETE FROM did WHERE ecu = ?", (ecu,))
+    connection.execute("DELETE FROM rid WHERE ecu = ?", (ecu,))
+    connection.executemany(
+        f"INSERT OR IGNORE INTO did VALUES ({', '.join(['?'] * (len(DID_COLUMNS) + 2))})",
+        [(ecu,) + row for row in did_rows])
+    connection.executemany(
+        f"INSERT OR IGNORE INTO rid VALUES ({', '.join(['?'] * (len(RID_COLUMNS) + 3))})",
+        [(ecu,) + row for row in rid_rows])
+    size, mtime_ns = signature
+    connection.execute("INSERT OR REPLACE INTO ecus VALUES (?, ?, ?, ?, ?)",
+                       (ecu, os.path.basename(file_path), size, mtime_ns, time.strftime('%Y-%m-%dT%H:%M:%S')))
+
+def delete_ecu(connection, ecu):
+    for name in ('did', 'rid', 'ecus'):
+        connection.execute(f"DELETE FROM {name} WHERE ecu = ?", (ecu,))
+
+def exported_files(connection):
+    """{ECU: (文件名, (大小, 修改时间))}"""
+    return {row[0]: (row[1], (row[2], row[3])) for row in connection.execute("SELECT ecu, file, size, mtime_ns FROM ecus")}
+
+def export_vehicle(vehicle_type, db_path=None, full=False, use_cache=True, reader=None):
+    """把一个车辆 OUTPUT 目录中的所有输出文件导出到 SQLite 数据库
+    Args:
+        vehicle_type: 车辆类型
+        db_path: 数据库路径，None 时为 OUTPUT/<EXPORT_FILE_NAME>
+        full: 是否重新导出所有 ECU；否则只导出输出文件大小或修改时间与上一次导出时不同的 ECU
+        use_cache: 读取输出文件时是否使用解析缓存
+        reader: Excel 读取后端，None 时使用 config.EXCEL_READER
+    Returns:
+        dict: {db_path, exported, removed, unchanged, errors: [(输出文件, 错误信息)], elapsed}
+    """
+    # 查询服务的读取函数依赖 pandas，在这里才导入；index query 等只查询数据库的命令不需要加载
+    from parse_diag_table.service import load_library, scan_outputs
+    start = time.perf_counter()
+    db_path = db_path or get_export_file(vehicle_type)
+    outputs = scan_outputs([vehicle_type])
+    summary = {'db_path': db_path, 'exported': 0, 'removed': 0, 'unchanged': 0, 'errors': []}
+    if not outputs and not os.path.exists(db_path):
+        summary['elapsed'] = time.perf_counter() - start
+        return summary
+
+    connection = open_database(db_path)
+    try:
+        exported = exported_files(connection)
+        prefixes = get_vehicle_prefixes(vehicle_type)
+        current = {get_ecu_name(file_path, prefixes): (file_path, signature)
+                   for file_path, (_, signature) in outputs.items()}
+
+        # 先读取所有需要更新的文件，再在一个事务中写入，读取失败的 ECU 保留上一次导出的数据
+        libraries = []
+        for ecu, (file_path, signature) in sorted(current.items()):
+            if not full and exported.get(ecu) == (os.path.basename(file_path), signature):
+                summary['unchanged'] += 1
+                continue
+            try:
+                library = load_library(vehicle_type, file_path, use_cache, reader)
+                if library is None:
+                    raise RuntimeError("读取过程中文件被修改")
+            except Exception as e:
+                summary['errors'].append((file_path, f"{type(e).__name__}: {e}"))
+                continue
+            libraries.append(library)
+
+        removed = [ecu for ecu in exported if ecu not in current]
+        with connection:
+            for library in libraries:
+                write_ecu(connection, library.ecu, library.output_file, library.signature, *library_rows(library))
+            for ecu in removed:
+                delete_ecu(connection, ecu)
+        summary['exported'] = len(libraries)
+        summary['removed'] = len(removed)
+    finally:
+        connection.close()
+    summary['elapsed'] = time.perf_counter() - start
+    return summary
+
+def print_export_summary(vehicle_type, summary):
+    print(f"[{vehicle_type}] 已导出到 {summary['db_path']}: 更新 {summary['exported']} 个 ECU，"
+          f"未变化 {summary['unchanged']}，移除 {summary['removed']} ({summary['elapsed']:.2f}s)", flush=True)
+    for file_path, message in summary['errors']:
+        print(f"  导出失败: {os.path.basename(file_path)}: {message}", flush=True)
+
+def export_vehicles(vehicle_types, full=False, use_cache=True, reader=None):
+    """导出多个车辆，打印每个车辆的结果
+    Returns:
+        int: 导出失败的文件数
+    """
+    failed = 0
+    for vehicle_type in vehicle_types:
+        try:
+            summary = export_vehicle(vehicle_type, full=full, use_cache=use_cache, reader=reader)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[{vehicle_type}] 导出失败: {type(e).__name__}: {e}", flush=True)
+            failed += 1
+            continue
+        print_export_summary(vehicle_type, summary)
+        failed += len(summary['errors'])
+    return failed
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 跨 ECU 的 DID/RID 索引：并行解析一个车辆 CURR_REL 中所有标准诊断表的 3.1/3.2/3.3 工作表，
+# 按工具的处理规则 (与 pre_process_22_2E/pre_process_31 相同，见 diff_report.source_did_table/source_rid_table)
+# 计算每个 DID/RID 的属性，保存为 DID/RID -> (ECU, 属性) 的倒排索引，回答例如
+# "CETUS_RL201 上哪些 ECU 的 DID F190 在 Boot 中支持 2E" 这样的问题
+# - 索引保存在车辆目录中 (config.INDEX_FILE_NAME)，表结构与 SQLite 导出相同 (见 export.py)，
+#   did_by_id/rid_by_id 索引即倒排索引；重新建立时只解析修改过的文件
+# 用法: python main.py index build --vehicle CETUS_RL201 [--jobs 8] [--full]
+#       python main.py index query --vehicle CETUS_RL201 --did F190 --match boot=2E
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from parse_diag_table.config import VEHICLE_TYPE, SOURCE_SHEETS, INDEX_FILE_NAME, EXCEL_READERS, get_data_dirs
+from parse_diag_table.batch import get_excel_files, get_ecu_name, get_vehicle_prefixes
+from parse_diag_table.watch import file_signature
+from parse_diag_table.export import (
+    DID_COLUMNS, RID_COLUMNS, normalize_id, normalize_subservice, open_database, table_rows, write_ecu, delete_ecu,
+    exported_files,
+)
+
+def connect_readonly(index_file):
+    return sqlite3.connect(Path(os.path.abspath(index_file)).as_uri() + '?mode=ro', uri=True)
+
+def get_index_file(vehicle_type):
+    """车辆的索引文件：<车辆目录>/<INDEX_FILE_NAME>"""
+    curr_rel_dir, _, _ = get_data_dirs(vehicle_type)
+    return os.path.join(os.path.dirname(curr_rel_dir), INDEX_FILE_NAME)
+
+def collect_sources(vehicle_type):
+    """CURR_REL 中的标准诊断表
+    Returns:
+        dict: {ECU 名称: 标准诊断表}
+        list: [(ECU 名称, 错误信息)]，ECU 名称重复的文件
+    """
+    curr_rel_dir, _, _ = get_data_dirs(vehicle_type)
+    if not os.path.exists(curr_rel_dir):
+        raise FileNotFoundError(f"目录不存在: {curr_rel_dir}")
+    grouped = {}
+    prefixes = get_vehicle_prefixes(vehicle_type)
+    for file_path in get_excel_files(curr_rel_dir):
+        grouped.setdefault(get_ecu_name(file_path, prefixes), []).append(file_path)
+    sources, errors = {}, []
+    for ecu, files in sorted(grouped.items()):
+        if len(files) > 1:
+            errors.append((ecu, f"ECU 名称重复: {', '.join(os.path.basename(f) for f in files)}"))
+        else:
+            sources[ecu] = files[0]
+    return sources, errors
+
+def index_ecu(ecu, source_file, reader=None, stream=None):
+    """解析一个标准诊断表 (在子进程中运行)
+    Returns:
+        dict: {ecu, source_file, signature, status, error, did_rows, rid_rows}，行的格式与 export.library_rows 相同
+    """
+    # pandas 和处理模块在这里才导入，query 只读取索引，不需要加载它们
+    from parse_diag_table.cache import read_excel_sheets_cached
+    from parse_diag_table.schema import compile_schemas
+    from parse_diag_table.diff_report import source_did_table, source_rid_table
+    from parse_diag_table.service import rekey
+    from parse_diag_table.records import pool_scope
+
+    result = {'ecu': ecu, 'source_file': source_file, 'status': 'ok', 'error': None}
+    try:
+        signature = file_signature(source_file)
+        sheets = read_excel_sheets_cached(source_file, SOURCE_SHEETS, reader=reader, stream=stream)
+        if file_signature(source_file) != signature:
+            raise RuntimeError("读取过程中文件被修改")
+        schemas = compile_schemas(sheets)
+        # 取值表的编码只在本进程中有效，返回解码后的行；每个 ECU 使用单独的取值表，解码后释放
+        with pool_scope():
+            dids = source_did_table(sheets, schemas)
+            rids = source_rid_table(sheets, schemas)
+            dids = rekey(dids, [normalize_id(did) for did in dids.keys])
+            rids = rekey(rids, [(normalize_id(rid), subservice) for rid, subservice in rids.keys])
+            result['did_rows'] = table_rows(dids, DID_COLUMNS, 1)
+            result['rid_rows'] = table_rows(rids, RID_COLUMNS, 2)
+        result['signature'] = signature
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        print(f"错误: 解析 {ecu} 时出错\n{traceback.format_exc()}")
+    return result
+
+def build_index(vehicle_type, jobs=None, full=False, reader=None, stream=None):
+    """建立或更新一个车辆的索引
+    Args:
+        vehicle_type: 车辆类型
+        jobs: 并行解析的进程数，None 时使用 CPU 核数
+        full: 是否重新解析所有文件；否则只解析大小或修改时间与上一次建立索引时不同的文件
+        reader: Excel 读取后端，None 时使用 config.EXCEL_READER
+        stream: 是否流式读取 3.1/3.2/3.3 工作表，None 时使用 config.STREAM_SOURCE_SHEETS
+    Returns:
+        dict: {index_file, indexed, removed, unchanged, errors: [(ECU 名称, 错误信息)], elapsed}
+    """
+    start = time.perf_counter()
+    index_file = get_index_file(vehicle_type)
+    sources, errors = collect_sources(vehicle_type)
+    connection = open_database(index_file)
+    try:
+        indexed = exported_files(connection)
+        tasks = []
+        unchanged = 0
+        for ecu, source_file in sources.items():
+            if not full and indexed.get(ecu) == (os.path.basename(source_file), file_signature(source_file)):
+                unchanged += 1
+            else:
+                tasks.append((ecu, source_file, reader, stream))
+
+        jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(index_ecu, *zip(*tasks)))
+        else:
+            results = [index_ecu(*task) for task in tasks]
+
+        # 解析失败的 ECU 保留上一次的索引；CURR_REL 中已经没有的 ECU 从索引中删除
+        removed = [ecu for ecu in indexed if ecu not in sources]
+        with connection:
+            for result in results:
+                if result['status'] == 'ok':
+                    write_ecu(connection, result['ecu'], result['source_file'], result['signature'],
+                              result['did_rows'], result['rid_rows'])
+                else:
+                    errors.append((result['ecu'], result['error']))
+            for ecu in removed:
+                delete_ecu(connection, ecu)
+    finally:
+        connection.close()
+    return {'index_file': index_file, 'indexed': sum(1 for r in results if r['status'] == 'ok'),
+            'removed': len(removed), 'unchanged': unchanged, 'errors': errors,
+            'elapsed': time.perf_counter() - start}
+
+def parse_matches(items):
+    """--match 字段=值 列表转换为 {字段: 值}"""
+    matches = {}
+    for item in items or ():
+        field, sep, value = item.partition('=')
+        if not sep or not field.strip():
+            raise ValueError(f"--match 的格式应为 字段=值: {item}")
+        matches[field.strip().lower()] = value.strip()
+    return matches
+
+def value_matches(value, expected):
+    """属性是否包含 expected：整体相同，或按 / , 空白分隔后的某一项相同 (不区分大小写)
+    例如 boot=2E 匹配 '22/2E'，lock_level=Lock 匹配 'Lock/L2'
+    """
+    if value is None:
+        return expected == ''
+    text = str(value).strip().casefold()
+    expected = expected.casefold()
+    return text == expected or expected in re.split(r"[/,\s]+", text)
+
+def query_index(index_file, kind, key=None, subservice=None, matches=None, ecu=None):
+    """查询索引
+    Args:
+        kind: 'did' 或 'rid'
+        key: DID/RID (不区分大小写，0x 可选)，None 时查询所有
+        subservice: 只查询 RID 的一个子服务
+        matches: {字段: 值}，见 value_matches
+        ecu: 只查询一个 ECU
+    Returns:
+        list: 匹配的记录 {ecu, did/rid, [subservice], 属性...}，按 ECU 和键排序
+    """
+    columns = ['ecu', 'did'] + DID_COLUMNS if kind == 'did' else ['ecu', 'rid', 'subservice'] + RID_COLUMNS
+    matches = matches or {}
+    unknown = [field for field in matches if field not in columns]
+    if unknown:
+        raise ValueError(f"未知的字段: {', '.join(unknown)} (可选: {', '.join(columns)})")
+
+    conditions, params = [], []
+    if key is not None:
+        conditions.append(f"{kind} = ?")
+        params.append(normalize_id(key))
+    if subservice is not None:
+        conditions.append("subservice = ?")
+        params.append(normalize_subservice(subservice))
+    if ecu is not None:
+        conditions.append("ecu = ?")
+        params.append(str(ecu).strip().upper())
+    sql = f"SELECT {', '.join(columns)} FROM {kind}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(columns[:3 if kind == 'rid' else 2])
+
+    connection = connect_readonly(index_file)
+    try:
+        rows = connection.execute(sql, params).fetchall()
+    finally:
+        connection.close()
+    records = [dict(zip(columns, row)) for row in rows]
+    return [record for record in records
+            if all(value_matches(record[field], expected) for field, expected in matches.items())]
+
+def stale_sources(vehicle_type, index_file):
+    """建立索引之后新增、修改或删除的标准诊断表 (只比较文件大小和修改时间，不读取文件)"""
+    try:
+        sources, _ = collect_sources(vehicle_type)
+    except FileNotFoundError:
+        return []
+    connection = connect_readonly(index_file)
+    try:
+        indexed = exported_files(connection)
+    finally:
+        connection.close()
+    stale = [ecu for ecu, source_file in sources.items()
+             if indexed.get(ecu) != (os.path.basename(source_file), file_signature(source_file))]
+    return sorted(stale + [ecu for ecu in indexed if ecu not in sources])
+
+def format_record(record, kind):
+    key = record[kind] if kind == 'did' else f"{record['rid']}/{record['subservice']}"
+    fields = DID_COLUMNS if kind == 'did' else RID_COLUMNS
+    details = '  '.join(f"{field}={'' if record[field] is None else record[field]}" for field in fields
+                        if field != 'description')
+    return f"{record['ecu']:<12} {key:<10} {details}  ({record['description']})"
+
+def build_command(args):
+    summary = build_index(args.vehicle, jobs=args.jobs, full=args.full, reader=args.reader, stream=args.stream)
+    print(f"[{args.vehicle}] 索引已保存到 {summary['index_file']}: 解析 {summary['indexed']} 个 ECU，"
+          f"未变化 {summary['unchanged']}，移除 {summary['removed']} ({summary['elapsed']:.2f}s)")
+    for ecu, message in summary['errors']:
+        print(f"  {ecu:<12} 失败: {message}")
+    return 1 if summary['errors'] else 0
+
+def query_command(args):
+    index_file = get_index_file(args.vehicle)
+    if not os.path.exists(index_file):
+        print(f"索引不存在: {index_file}，请先运行 index build --vehicle {args.vehicle}")
+        return 1
+    kind, key = ('did', args.did) if args.did is not None else ('rid', args.rid)
+    start = time.perf_counter()
+    try:
+        records = query_index(index_file, kind, None if key == '*' else key, args.subservice,
+                              parse_matches(args.match), args.ecu)
+    except ValueError as e:
+        print(f"错误: {e}")
+        return 2
+    elapsed = time.perf_counter() - start
+
+    stale = stale_sources(args.vehicle, index_file)
+    if args.json:
+        print(json.dumps(records, ensure_ascii=False, indent=2))
+    else:
+        for record in records:
+            print(format_record(record, kind))
+        ecus = sorted({record['ecu'] for record in records})
+        print(f"\n共 {len(records)} 条记录，{len(ecus)} 个 ECU: {', '.join(ecus)} (查询 {elapsed * 1000:.1f} ms)")
+    if stale:
+        print(f"警告: {len(stale)} 个 ECU 的标准诊断表在建立索引后有变化 ({', '.join(stale[:5])}"
+              f"{' 等' if len(stale) > 5 else ''})，运行 index build 更新索引", file=sys.stderr)
+    return 0
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='跨 ECU 的 DID/RID 索引')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    build_parser = subparsers.add_parser('build', help='解析 CURR_REL 中所有标准诊断表，建立或更新索引')
+    build_parser.add_argument('--vehicle', type=str, default=VEHICLE_TYPE, help='车辆类型 (例如: BLANC_RL201, CETUS_RL201)')
+    build_parser.add_argument('--jobs', type=int, help='并行解析的进程数，默认为 CPU 核数')
+    build_parser.add_argument('--full', action='store_true', help='重新解析所有文件，不跳过未修改的文件')
+    build_parser.add_argument('--reader', choices=['auto'] + EXCEL_READERS,
+                              help='Excel 读取后端，默认使用 config.EXCEL_READER')
+    build_parser.add_argument('--stream', action='store_const', const=True,
+                              help='流式读取 3.1/3.2/3.3 工作表，减少内存占用 (默认使用 config.STREAM_SOURCE_SHEETS)')
+
+    query_parser = subparsers.add_parser('query', help='按 DID/RID 查询所有 ECU 的属性')
+    query_parser.add_argument('--vehicle', type=str, default=VEHICLE_TYPE, help='车辆类型 (例如: BLANC_RL201, CETUS_RL201)')
+    target = query_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--did', type=str, help='DID (例如 F190 或 0xF190)，* 表示所有 DID')
+    target.add_argument('--rid', type=str, help='RID (例如 0x0203)，* 表示所有 RID')
+    query_parser.add_argument('--subservice', type=str, help='只查询 RID 的一个子服务 (01/02/03)')
+    query_parser.add_argument('--ecu', type=str, help='只查询一个 ECU')
+    query_parser.add_argument('--match', action='append', metavar='字段=值',
+                              help='只保留属性包含该值的记录 (按 / 分隔后比较，不区分大小写)，可以指定多次；'
+                                   '例如 --match boot=2E、--match lock_level=Lock')
+    query_parser.add_argument('--json', action='store_true', help='以 JSON 格式输出')
+    args = parser.parse_args(argv)
+
+    if args.action == 'build':
+        return build_command(args)
+    if args.subservice is not None and args.did is not None:
+        parser.error("--subservice 只能与 --rid 一起使用")
+    return query_command(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+from parse_diag_table.profiling import timed, record_count
+from parse_diag_table.config import SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3, TARGET_SHEET1, TARGET_SHEET2
+from parse_diag_table.schema import compile_schemas
+from parse_diag_table.main_process_22_2E import pre_process_22_2E, main_process_22_2E
+from parse_diag_table.main_process_31 import (
+    pre_process_31, build_target_rid_blocks, aggregate_rid_responses,
+    check_rid_responses, merge_rid_responses, main_process_31,
+)
+
+# 处理规则或清单格式变化时修改版本号，旧的清单自动失效 (全部重新计算)
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+# 22_2E_DID_Library 中由 source 计算得到的列
+DID_COMPUTED_LETTERS = ['B', 'C', 'D', 'E', 'F', 'G', 'H']
+
+def get_manifest_file(output_file):
+    """清单文件与输出文件放在一起：OUTPUT/<输出文件名>.manifest.json"""
+    return os.path.splitext(output_file)[0] + MANIFEST_SUFFIX
+
+def load_manifest(output_file):
+    """读取上一次生成时的清单，输出文件或清单不存在、版本不一致、文件损坏时返回 None"""
+    manifest_file = get_manifest_file(output_file)
+    if not os.path.exists(output_file) or not os.path.exists(manifest_file):
+        return None
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def save_manifest(output_file, manifest):
+    """先写临时文件再替换，避免中断时留下不完整的清单"""
+    manifest_file = get_manifest_file(output_file)
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(manifest_file) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dict(manifest, version=MANIFEST_VERSION), f, ensure_ascii=False)
+        os.replace(tmp_file, manifest_file)
+    except Exception:
+        os.remove(tmp_file)
+        raise
+
+def fingerprint(values):
+    """对一组单元格的值计算指纹，repr 中包含类型，1 和 '1' 的指纹不同"""
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+def to_json_value(value):
+    """单元格的值转换为 JSON 可以原样保存的类型，无法保存时抛出 TypeError"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    raise TypeError(f"无法保存到清单的值: {value!r}")
+
+def to_json_rows(rows):
+    """转换一组行的值，有无法保存的值时返回 None (该实体下次总是重新计算)"""
+    try:
+        return [[to_json_value(value) for value in row] for row in rows]
+    except TypeError:
+        return None
+
+def get_section(manifest, name, columns):
+    """取出清单中的一个工作表，表头与当前模板不一致时不沿用"""
+    section = (manifest or {}).get(name)
+    if not section or section.get('columns') != columns:
+        return {}
+    return section.get('entities', {})
+
+def build_did_fingerprints(source_df1, source_df2, did_index):
+    """每个 DID 的指纹覆盖 source 中该 DID 所在的整行
+    Returns:
+        dict: {DID (不带 0x): 指纹}
+    """
+    source_values = {
+        'source_sheet1': source_df1.to_numpy(dtype=object),
+        'source_sheet2': source_df2.to_numpy(dtype=object),
+    }
+    return {did: fingerprint([source_flag] + source_values[source_flag][row_pos].tolist())
+            for did, (source_flag, row_pos) in did_index.items()}
+
+def process_22_2E_incremental(source_sheets, target_sheets, manifest=None, schemas=None):
+    """与 process_22_2E 结果相同，但只重新计算指纹有变化的 DID，其余 DID 沿用上一次的结果
+    schemas 为按表头编译的工作表结构，没有传入时在这里编译
+    Returns:
+        DataFrame: 处理后的 22_2E_DID_Library
+        dict: 新的清单 {columns, entities: {DID: {fingerprint, values}}}
+        tuple: (重新计算的行数, 沿用的行数)
+    """
+    print(f"Begin to process 22 and 2E sheet (incremental)")
+    schemas = schemas or compile_schemas({**source_sheets, **target_sheets})
+    with timed('pre_process_22_2E'):
+        target_df, did_index, source_table = pre_process_22_2E(source_sheets, target_sheets, schemas)
+    columns = [str(col) for col in target_df.columns]
+    previous = get_section(manifest, 'did', columns)
+    with timed('did_fingerprints'):
+        fingerprints = build_did_fingerprints(source_sheets[SOURCE_SHEET1], source_sheets[SOURCE_SHEET2], did_index)
+    record_count('source_dids', len(did_index))
+    record_count('did_rows', len(target_df))
+
+    target_schema = schemas[TARGET_SHEET1]
+    dids = target_df.iloc[:, target_schema['A']].astype(str).str.strip().str.removeprefix("0x").tolist()
+    col_indices = target_schema.indices(DID_COMPUTED_LETTERS)
+    values = np.empty((len(target_df), len(col_indices)), dtype=object)
+
+    # 指纹相同的 DID 直接沿用清单中的值，source 中找不到的 DID 总是重新计算 (与完整计算时一样报错)
+    reused = np.zeros(len(target_df), dtype=bool)
+    for pos, did in enumerate(dids):
+        entry = previous.get(did)
+        if entry is not None and did in fingerprints and entry['fingerprint'] == fingerprints[did]:
+            values[pos] = entry['values'][0]
+            reused[pos] = True
+
+    changed = np.flatnonzero(~reused)
+    if len(changed):
+        with timed('process_22_2E_rows'):
+            changed_df = target_df.iloc[changed].reset_index(drop=True)
+            main_process_22_2E(changed_df, source_table, schemas)
+            values[changed] = changed_df.iloc[:, col_indices].to_numpy(dtype=object)
+    record_count('did_rows_recomputed', len(changed))
+    record_count('did_rows_reused', int(reused.sum()))
+
+    for i, col_index in enumerate(col_indices):
+        target_df.isetitem(col_index, pd.Series(values[:, i], index=target_df.index, dtype=object))
+
+    entities = {}
+    for pos, did in enumerate(dids):
+        rows = to_json_rows([values[pos]])
+        if did in fingerprints and rows is not None:
+            entities.setdefault(did, {'fingerprint': fingerprints[did], 'values': rows})
+
+    print(f"Finished process 22 and 2E sheet: 重新计算 {len(changed)} 行，沿用 {int(reused.sum())} 行")
+    return target_df, {'columns': columns, 'entities': entities}, (len(changed), int(reused.sum()))
+
+def process_31_incremental(source_sheets, target_sheets, manifest=None, schemas=None):
+    """与 process_31 结果相同，但只重新计算指纹有变化的 RID，其余 RID 沿用上一次的结果
+    每个 RID 的指纹覆盖 source 中该 RID 的整个分段，以及模板中该 RID 三行里不会被覆盖的列
+    schemas 为按表头编译的工作表结构，没有传入时在这里编译
+    Returns:
+        DataFrame: 处理后的 31_RID_Library
+        dict: 新的清单 {columns, entities: {RID: {fingerprint, values}}}
+        tuple: (重新计算的 RID 数, 沿用的 RID 数)
+    """
+    print(f"Begin to process 31 sheet (incremental)")
+    schemas = schemas or compile_schemas({**source_sheets, **target_sheets})
+    with timed('pre_process_31'):
+        source_df, target_df, rid_segments, rid_table = pre_process_31(source_sheets, target_sheets, schemas)
+    columns = [str(col) for col in target_df.columns]
+    previous = get_section(manifest, 'rid', columns)
+    target_schema = schemas[TARGET_SHEET2]
+    target_blocks = build_target_rid_blocks(target_df, target_schema)
+    with timed('aggregate_rid_responses'):
+        responses, zero_bit_keys = aggregate_rid_responses(source_df, rid_segments, schemas[SOURCE_SHEET3])
+    check_rid_responses(zero_bit_keys)
+    record_count('source_rids', len(rid_segments))
+    record_count('rid_rows', len(target_df))
+
+    source_values = source_df.to_numpy(dtype=object)
+    # 列映射以外的列在有 source 数据的行中保留模板的值，因此也计入指纹
+    extra_values = target_df.iloc[:, target_schema.extra_positions(len(target_df.columns))].to_numpy(dtype=object)
+
+    fingerprints = {}
+    reused_blocks = []
+    computed = 0
+    rid_col_idx = target_schema['A']
+    with timed('process_31_rid_loop'):
+        for idx in range(0, len(target_df), 3):
+            rid = target_df.iloc[idx, rid_col_idx]
+            if not pd.notna(rid):
+                continue
+            key = str(rid)
+            # 只有三行完整、且是该 RID 第一次出现的分段才能沿用
+            regular = target_blocks.get(key) == idx and idx + 3 <= len(target_df) and key in rid_segments
+            if regular:
+                start_row, end_row, _ = rid_segments[key]
+                fingerprints[idx] = fingerprint([source_values[start_row:end_row].tolist(),
+                                                 extra_values[idx:idx + 3].tolist()])
+                entry = previous.get(key)
+                if entry is not None and entry['fingerprint'] == fingerprints[idx]:
+                    reused_blocks.append((idx, entry['values']))
+                    continue
+            main_process_31(rid_table, target_df, rid, rid_segments, target_blocks, schemas)
+            computed += 1
+        merge_rid_responses(target_df, target_blocks, responses, target_schema)
+
+    # 沿用的 RID 整块写回 (A 列以外的列)
+    value_cols = [col for col in range(len(target_df.columns)) if col != rid_col_idx]
+    if reused_blocks:
+        rows = np.concatenate([np.arange(idx, idx + 3) for idx, _ in reused_blocks])
+        values = np.array([row for _, block in reused_blocks for row in block], dtype=object)
+        for i, col_index in enumerate(value_cols):
+            target_df.isetitem(col_index, target_df.iloc[:, col_index].astype(object))
+            target_df.iloc[rows, col_index] = values[:, i]
+
+    entities = {}
+    target_values = target_df.to_numpy(dtype=object)
+    for idx, block_fingerprint in fingerprints.items():
+        rows = to_json_rows(target_values[idx:idx + 3][:, value_cols])
+        if rows is not None:
+            entities[str(target_df.iloc[idx, rid_col_idx])] = {'fingerprint': block_fingerprint, 'values': rows}
+
+    record_count('rids_recomputed', computed)
+    record_count('rids_reused', len(reused_blocks))
+
+    print(f"Finished process 31 sheet: 重新计算 {computed} 个 RID，沿用 {len(reused_blocks)} 个 RID")
+    return target_df, {'columns': columns, 'entities': entities}, (computed, len(reused_blocks))
@@ -18,112 +18,300 @@
 
 import os
 import sys
+import glob
+import time
 import argparse
-import re
-import pandas as pd
+import importlib
+from contextlib import nullcontext
+# 启动计时：main.py 只导入标准库和 config，pandas/openpyxl 等由需要它们的命令按需导入
+STARTED = time.perf_counter()
 # 添加项目根目录到 Python 路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from parse_diag_table.config import (
-    VEHICLE_TYPE,
-    SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3,
-    TARGET_SHEET1, TARGET_SHEET2,
-    get_data_dirs
+    VEHICLE_TYPE, DATA_DIR, REPORT_DIR, EXCEL_READER, EXCEL_READERS, STREAM_SOURCE_SHEETS, EXPORT_SQLITE,
+    get_vehicle_types
 )
-from parse_diag_table.utils import read_excel, save_excel
-from parse_diag_table.main_process_22_2E import main_process_22_2E,pre_process_22_2E
-from parse_diag_table.main_process_31 import main_process_31,pre_process_31,save_excel_with_merged_cells
-import numpy as np
-
-
-# 主函数
-def process_22_2E(source_file, target_file):
-    print(f"Begin to process 22 and 2E sheet")
-    source_df1, source_df2, target_df = pre_process_22_2E(source_file, target_file)
-
-    for idx, row in target_df.iterrows():
-        # print(row.iloc[0])
-        main_process_22_2E(row.iloc[0], source_df1, source_df2, target_df, idx)
-    
-    print(f"Finished process 22 and 2E sheet")
-    return target_df
-
-def process_31(source_file, target_file):
-    print(f"Begin to process 31 sheet")
-    source_df, target_df = pre_process_31(source_file, target_file)
-    # 处理每个 Routine Control ID 的具体数据
-    for idx in range(0, len(target_df), 3):  # 每三行处理一次
-        rid = target_df.iloc[idx, 0]  # A列 Routine Control ID
-        if pd.notna(rid):  # 确保不是空值
-            main_process_31(source_df, target_df, rid)
-    
-    # 保存处理后的数据到 Excel，并合并单元格
-    save_excel_with_merged_cells(target_df, target_file, TARGET_SHEET2)
-    
-    print(f"Finished process 31 sheet")
-    return target_df
-
-def get_excel_files(directory):
-    """ 获取目录下所有 Excel 文件（忽略临时文件 `~$` 开头的文件） """
-    return [os.path.join(directory, f) for f in os.listdir(directory) 
-            if f.endswith(".xlsx") and not f.startswith("~$")]
-
-def main():
+
+# 子命令；第一个参数不是子命令时按 run 处理 (兼容 python main.py --vehicle X --batch 的用法)
+COMMANDS = ['run', 'list', 'watch', 'serve', 'export', 'index', 'diff', 'generate', 'bench']
+# bench 子命令可以运行的基准测试：benchmarks/bench_<名称>.py
+BENCHMARKS = ['scaling', 'normalize', 'readers', 'startup', 'memory']
+
+# 命令中按需导入模块的累计耗时 (--timing)
+_import_seconds = 0.0
+
+def import_module(name):
+    """按需导入命令用到的模块，并记录导入耗时"""
+    global _import_seconds
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_seconds += time.perf_counter() - start
+    return module
+
+def resolve_vehicle_types(vehicle_arg):
+    """解析 --vehicle 参数
+    - 不指定：使用 config.VEHICLE_TYPE
+    - all：数据目录下的所有车辆类型
+    - 逗号分隔的列表：例如 BLANC_RL201,CETUS_RL201
+    """
+    if not vehicle_arg:
+        return [VEHICLE_TYPE]
+    if vehicle_arg.strip().lower() == 'all':
+        vehicle_types = get_vehicle_types()
+        if not vehicle_types:
+            raise FileNotFoundError(f"数据目录下没有找到任何车辆类型: {DATA_DIR}")
+        return vehicle_types
+    return [v.strip() for v in vehicle_arg.split(',') if v.strip()]
+
+def collect_tasks(vehicle_types):
+    """收集所有车辆类型的文件，统一调度"""
+    batch = import_module('parse_diag_table.batch')
+    tasks, errors = [], []
+    for vehicle_type in vehicle_types:
+        try:
+            vehicle_tasks, vehicle_errors = batch.collect_vehicle_tasks(vehicle_type)
+        except FileNotFoundError as e:
+            # 只处理一个车辆类型时直接报错，多个车辆类型时记录错误后继续处理其余车辆
+            if len(vehicle_types) == 1:
+                raise
+            vehicle_tasks, vehicle_errors = [], [(vehicle_type, '-', str(e))]
+        tasks.extend(vehicle_tasks)
+        errors.extend(vehicle_errors)
+    return tasks, errors
+
+def build_report(args, vehicle_types, results, errors, started, wall_time):
+    """本次运行的 JSON 报告：每个 ECU 的阶段耗时和数量，以及所有 ECU 按阶段累加的耗时"""
+    sum_stages = import_module('parse_diag_table.profiling').sum_stages
+    return {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+        'argv': sys.argv[1:],
+        'jobs': max(1, args.jobs),
+        'use_cache': not args.no_cache,
+        'incremental': not args.full,
+        'reader': args.reader or EXCEL_READER,
+        'stream': STREAM_SOURCE_SHEETS if args.stream is None else args.stream,
+        'vehicles': vehicle_types,
+        'wall_time': round(wall_time, 6),
+        'ecus': len(results) + len(errors),
+        'failed': sum(1 for r in results if r['status'] != 'ok') + len(errors),
+        'stage_totals': sum_stages([r['timings'] for r in results]),
+        'results': results,
+        'errors': [{'vehicle': vehicle, 'ecu': ecu, 'error': message} for vehicle, ecu, message in errors],
+    }
+
+def run_command(args):
     """ 处理多个 Excel 文件 """
-    # 设置命令行参数
-    parser = argparse.ArgumentParser(description='NIO PIT UDS 自动化工具')
-    parser.add_argument('--vehicle', type=str, help='车辆类型 (例如: BLANC_RL201, CETUS_RL201)')
-    args = parser.parse_args()
-    
+    batch = import_module('parse_diag_table.batch')
+    profiling = import_module('parse_diag_table.profiling')
+
     # 确定使用的车辆类型
-    vehicle_type = args.vehicle if args.vehicle else VEHICLE_TYPE
-    print(f"使用车辆类型: {vehicle_type}")
-    
-    # 获取数据目录路径
-    curr_rel_dir, last_rel_dir, output_dir = get_data_dirs(vehicle_type)
-    
-    # 确保输出目录存在
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 检查源目录和目标目录是否存在
-    if not os.path.exists(curr_rel_dir):
-        raise FileNotFoundError(f"源目录不存在: {curr_rel_dir}")
-    if not os.path.exists(last_rel_dir):
-        raise FileNotFoundError(f"目标目录不存在: {last_rel_dir}")
-    
-    source_files = get_excel_files(curr_rel_dir)
-    target_files = get_excel_files(last_rel_dir)
-
-    if len(source_files) != len(target_files):
-        raise ValueError("错误：新版本和旧版本文件数量不匹配，请检查文件夹内容。")
-
-    output_files = [os.path.join(output_dir, os.path.basename(f).replace(".xlsx", "_更新后.xlsx")) for f in target_files]
-
-    for i in range(len(source_files)):
-        print(f"####开始处理### \n标准诊断表：{source_files[i]} \n模板诊断表：{target_files[i]}")
-        source_file = source_files[i]
-        target_file = target_files[i]
-        output_file = output_files[i]
-
-        # 处理 22 和 2E 相关的内容
-        target_df_22_2E = process_22_2E(source_file, target_file)
-        
-        # 处理 RoutineControl 0x31 相关的内容
-        target_df_31 = process_31(source_file, target_file)
-        
-        # 保存所有处理结果
-        save_excel(target_df_22_2E, output_file, sheet_name=TARGET_SHEET1, mode="w")
-        # save_excel(target_df_31, output_file, sheet_name=TARGET_SHEET2, mode="a")
-        save_excel_with_merged_cells(target_df_31, output_file, TARGET_SHEET2)
-        print(f"处理完毕, 所有处理结果已保存到: {output_file}")
-
-        # 处理完当前文件后，提示用户是否继续
-        user_input = input(f"文件 {source_file} 处理完毕，是否继续处理下一个文件？(y/n): ").strip().lower()
-        if user_input == 'n':
-            print("用户选择退出，程序终止。")
-            sys.exit(0)  # 退出程序
+    vehicle_types = resolve_vehicle_types(args.vehicle)
+    print(f"使用车辆类型: {', '.join(vehicle_types)}")
+
+    report_file = args.report or os.path.join(REPORT_DIR, time.strftime('run_%Y%m%d_%H%M%S.json'))
+    profile_base = os.path.splitext(report_file)[0]
+    # cProfile 数据先分别保存到 profile_dir，结束后合并为一个文件：
+    # 串行处理时记录整个主进程；使用进程池时由各个子进程分别记录 (子进程会继承主进程的 profiler，不能嵌套)
+    profile_dir = f"{profile_base}_profile" if args.profile else None
+    if profile_dir:
+        # 删除同名报告上一次运行留下的数据，避免合并到本次结果中
+        for old_file in glob.glob(os.path.join(profile_dir, '*.prof')):
+            os.remove(old_file)
 
+    jobs = max(1, args.jobs)
+    interactive = not args.batch and jobs == 1
+    # cProfile 只记录主线程，--profile 时不使用流水线，读取和写出也记录在主进程的数据中
+    pipeline = False if args.no_pipeline or args.profile else None
+    started = time.time()
+    start = time.perf_counter()
+    with profiling.profile_to(os.path.join(profile_dir, 'main.prof')) if args.profile and jobs == 1 else nullcontext():
+        tasks, errors = collect_tasks(vehicle_types)
+        results = batch.run_tasks(tasks, jobs=jobs, interactive=interactive, use_cache=not args.no_cache,
+                                  incremental=not args.full, profile_dir=profile_dir if jobs > 1 else None,
+                                  reader=args.reader, stream=args.stream, pipeline=pipeline)
+    wall_time = time.perf_counter() - start
+
+    failed = batch.print_summary(results, errors, wall_time=wall_time)
+    if EXPORT_SQLITE and not args.no_export:
+        # 只重新导出本次重新生成的 ECU
+        failed += import_module('parse_diag_table.export').export_vehicles(
+            vehicle_types, use_cache=not args.no_cache, reader=args.reader)
+    profiling.write_json_report(report_file, build_report(args, vehicle_types, results, errors, started, wall_time))
+    print(f"运行报告已保存到: {report_file}")
+    if args.profile:
+        profile_file = f"{profile_base}.prof"
+        print(profiling.merge_profiles(profile_file, sorted(glob.glob(os.path.join(profile_dir, '*.prof')))))
+        print(f"cProfile 数据已保存到: {profile_file} (可用 python -m pstats {profile_file} 查看)")
     print("所有文件处理完毕。")
+    return 1 if failed else 0
+
+def list_command(args):
+    """列出每个车辆类型下配对的 ECU 文件和输出文件，不读取 Excel 内容"""
+    batch = import_module('parse_diag_table.batch')
+    failed = 0
+    for vehicle_type in resolve_vehicle_types(args.vehicle):
+        print(f"车辆类型: {vehicle_type}")
+        try:
+            pairs, pair_errors, output_dir = batch.get_vehicle_pairs(vehicle_type)
+        except FileNotFoundError as e:
+            print(f"  {e}")
+            failed += 1
+            continue
+        for ecu, source_file, target_file in pairs:
+            output_file = batch.get_output_file(output_dir, target_file)
+            status = '已生成' if os.path.exists(output_file) else '未生成'
+            print(f"  {ecu:<12} {os.path.basename(source_file)}  ->  {os.path.basename(target_file)}  [{status}]")
+        for ecu, message in pair_errors:
+            print(f"  {ecu:<12} 无法配对: {message}")
+        failed += len(pair_errors)
+    return 1 if failed else 0
+
+def watch_command(args):
+    """监视 CURR_REL/LAST_REL 目录，文件修改后只重新生成对应 ECU 的输出文件"""
+    watch = import_module('parse_diag_table.watch')
+    vehicle_types = resolve_vehicle_types(args.vehicle)
+    return watch.watch(vehicle_types, interval=args.interval, debounce=args.debounce, use_cache=not args.no_cache,
+                       incremental=not args.full, reader=args.reader, stream=args.stream,
+                       export=EXPORT_SQLITE and not args.no_export)
+
+def serve_command(args):
+    """加载所有 ECU 的输出文件，在本机提供 DID/RID 属性的查询服务"""
+    service = import_module('parse_diag_table.service')
+    vehicle_types = resolve_vehicle_types(args.vehicle)
+    return service.serve(vehicle_types, host=args.host, port=args.port, socket_path=args.socket,
+                         interval=args.interval, debounce=args.debounce, use_cache=not args.no_cache,
+                         reader=args.reader)
+
+def export_command(args):
+    """把输出文件中的 DID/RID 属性导出到每个车辆的 SQLite 数据库"""
+    export = import_module('parse_diag_table.export')
+    vehicle_types = resolve_vehicle_types(args.vehicle)
+    return 1 if export.export_vehicles(vehicle_types, full=args.full, use_cache=not args.no_cache,
+                                       reader=args.reader) else 0
+
+def forward_command(args):
+    """index/diff/generate/bench 的参数由对应模块自己的 main(argv) 解析"""
+    module = import_module(FORWARDED_MODULES[args.command].format(name=getattr(args, 'name', '')))
+    prog = ' '.join([os.path.basename(sys.argv[0]), args.command] + ([args.name] if args.command == 'bench' else []))
+    return module.main(args.extra, prog=prog) or 0
+
+# 参数原样转交的命令及其模块
+FORWARDED_MODULES = {
+    'index': 'parse_diag_table.global_index',
+    'diff': 'parse_diag_table.diff_report',
+    'generate': 'parse_diag_table.synthetic',
+    'bench': 'parse_diag_table.benchmarks.bench_{name}',
+}
+
+COMMAND_HANDLERS = {
+    'run': run_command,
+    'list': list_command,
+    'watch': watch_command,
+    'serve': serve_command,
+    'export': export_command,
+    'index': forward_command,
+    'diff': forward_command,
+    'generate': forward_command,
+    'bench': forward_command,
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='NIO PIT UDS 自动化工具')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--timing', action='store_true', help='结束时打印启动、导入和执行耗时')
+    subparsers = parser.add_subparsers(dest='command', metavar='{' + ','.join(COMMANDS) + '}')
+
+    run_parser = subparsers.add_parser('run', parents=[common], help='生成新版本的测试参数表 (默认命令)')
+    run_parser.add_argument('--vehicle', type=str,
+                            help='车辆类型 (例如: BLANC_RL201, CETUS_RL201)；多个用逗号分隔，all 表示数据目录下的所有车辆')
+    run_parser.add_argument('--batch', action='store_true', help='非交互模式，处理完每个文件后不询问是否继续')
+    run_parser.add_argument('--jobs', type=int, default=1, help='并行处理的进程数 (大于 1 时自动使用非交互模式)')
+    run_parser.add_argument('--no-cache', action='store_true', help='不使用解析缓存，每次都重新解析 Excel 文件')
+    run_parser.add_argument('--full', action='store_true', help='全部重新计算，不沿用上一次输出中未变化的 DID/RID')
+    run_parser.add_argument('--report', type=str, help='运行报告 (JSON) 的保存路径，默认为 reports/run_<时间>.json')
+    run_parser.add_argument('--profile', action='store_true', help='用 cProfile 记录整个运行过程，保存为与报告同名的 .prof 文件')
+    run_parser.add_argument('--reader', choices=['auto'] + EXCEL_READERS,
+                            help='Excel 读取后端，默认使用 config.EXCEL_READER；不可用或读取失败时自动改用后面的后端')
+    run_parser.add_argument('--stream', action='store_const', const=True,
+                            help='流式读取 source 的 3.1/3.2/3.3 工作表，只保留列映射中的列，减少内存占用 '
+                                 '(默认使用 config.STREAM_SOURCE_SHEETS)')
+    run_parser.add_argument('--no-export', action='store_true',
+                            help='生成后不导出 SQLite 数据库 (默认按 config.EXPORT_SQLITE 导出)')
+    run_parser.add_argument('--no-pipeline', action='store_true',
+                            help='串行处理时不在后台线程中预读和写出文件 (默认按 config.PIPELINE 使用流水线)')
+
+    list_parser = subparsers.add_parser('list', parents=[common], help='列出配对的 ECU 文件，不读取 Excel 内容')
+    list_parser.add_argument('--vehicle', type=str, help='车辆类型；多个用逗号分隔，all 表示数据目录下的所有车辆')
+
+    watch_parser = subparsers.add_parser('watch', parents=[common],
+                                         help='监视 CURR_REL/LAST_REL 目录，文件修改后只重新生成对应 ECU 的输出文件')
+    watch_parser.add_argument('--vehicle', type=str, help='车辆类型；多个用逗号分隔，all 表示数据目录下的所有车辆')
+    watch_parser.add_argument('--interval', type=float, help='轮询间隔 (秒)，默认使用 config.WATCH_INTERVAL')
+    watch_parser.add_argument('--debounce', type=float,
+                              help='文件最后一次变化后保持不变多久才处理 (秒)，默认使用 config.WATCH_DEBOUNCE')
+    watch_parser.add_argument('--no-cache', action='store_true', help='第一次读取文件时不使用解析缓存')
+    watch_parser.add_argument('--full', action='store_true', help='全部重新计算，不沿用上一次输出中未变化的 DID/RID')
+    watch_parser.add_argument('--reader', choices=['auto'] + EXCEL_READERS,
+                              help='Excel 读取后端，默认使用 config.EXCEL_READER')
+    watch_parser.add_argument('--stream', action='store_const', const=True,
+                              help='流式读取 source 的 3.1/3.2/3.3 工作表 (默认使用 config.STREAM_SOURCE_SHEETS)')
+    watch_parser.add_argument('--no-export', action='store_true',
+                              help='重新生成后不导出 SQLite 数据库 (默认按 config.EXPORT_SQLITE 导出)')
+
+    serve_parser = subparsers.add_parser('serve', parents=[common],
+                                         help='在本机提供输出文件中 DID/RID 属性的查询服务 (HTTP)，输出文件重新生成后自动重新加载')
+    serve_parser.add_argument('--vehicle', type=str, help='车辆类型；多个用逗号分隔，all 表示数据目录下的所有车辆')
+    serve_parser.add_argument('--host', type=str, help='监听地址，默认使用 config.SERVICE_HOST (127.0.0.1)')
+    serve_parser.add_argument('--port', type=int, help='端口，默认使用 config.SERVICE_PORT')
+    serve_parser.add_argument('--socket', type=str, help='改为监听 Unix socket (文件路径)')
+    serve_parser.add_argument('--interval', type=float,
+                              help='检查 OUTPUT 目录的间隔 (秒)，默认使用 config.SERVICE_RELOAD_INTERVAL')
+    serve_parser.add_argument('--debounce', type=float,
+                              help='输出文件最后一次变化后保持不变多久才重新加载 (秒)，默认使用 config.WATCH_DEBOUNCE')
+    serve_parser.add_argument('--no-cache', action='store_true', help='读取输出文件时不使用解析缓存')
+    serve_parser.add_argument('--reader', choices=['auto'] + EXCEL_READERS,
+                              help='Excel 读取后端，默认使用 config.EXCEL_READER')
+
+    export_parser = subparsers.add_parser('export', parents=[common],
+                                          help='把输出文件中的 DID/RID 属性导出到每个车辆的 SQLite 数据库')
+    export_parser.add_argument('--vehicle', type=str, help='车辆类型；多个用逗号分隔，all 表示数据目录下的所有车辆')
+    export_parser.add_argument('--full', action='store_true', help='重新导出所有 ECU，不跳过未重新生成的输出文件')
+    export_parser.add_argument('--no-cache', action='store_true', help='读取输出文件时不使用解析缓存')
+    export_parser.add_argument('--reader', choices=['auto'] + EXCEL_READERS,
+                               help='Excel 读取后端，默认使用 config.EXCEL_READER')
+
+    # 其余参数 (包括 -h) 原样交给对应模块解析
+    subparsers.add_parser('index', parents=[common], add_help=False,
+                          help='建立和查询跨 ECU 的 DID/RID 索引 (参数见 index build -h、index query -h)')
+    subparsers.add_parser('diff', parents=[common], add_help=False, help='比较诊断表版本差异 (参数见 diff -h)')
+    subparsers.add_parser('generate', parents=[common], add_help=False, help='生成合成诊断表 (参数见 generate -h)')
+    bench_parser = subparsers.add_parser('bench', parents=[common], add_help=False,
+                                         help='运行基准测试 (参数见 bench <名称> -h)')
+    bench_parser.add_argument('name', choices=BENCHMARKS, help='基准测试名称')
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['run'] + argv
+
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command in ('run', 'list', 'watch', 'serve', 'export'):
+        parser.error(f"无法识别的参数: {' '.join(extra)}")
+    args.extra = extra
+
+    command_start = time.perf_counter()
+    try:
+        return COMMAND_HANDLERS[args.command](args)
+    finally:
+        if args.timing:
+            # 启动: 进入 main.py 到开始执行命令；导入: 命令按需导入模块的耗时；执行: 其余的命令耗时
+            total = time.perf_counter() - command_start
+            print(f"[timing] {args.command}: 启动 {(command_start - STARTED) * 1000:.1f} ms, "
+                  f"导入 {_import_seconds * 1000:.1f} ms, 执行 {(total - _import_seconds) * 1000:.1f} ms",
+                  file=sys.stderr)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -16,116 +16,261 @@
 -------------------------------------------------
 """
 
-import os
-import sys
-import re
 import pandas as pd
 import numpy as np
-# 添加项目根目录到 Python 路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import read_excel, save_excel
-from parse_diag_table.config import get_column_index
-from parse_diag_table.config import (
-    SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3,
-    TARGET_SHEET1, TARGET_SHEET2,
-)
-
-# 读取 Excel 文件并做预处理
-def pre_process_22_2E(source_file, target_file):
-    source_df1 = read_excel(source_file, SOURCE_SHEET1)
-    source_df2 = read_excel(source_file, SOURCE_SHEET2)
-    target_df = read_excel(target_file, TARGET_SHEET1)
+from parse_diag_table.utils import replace_rows
+from parse_diag_table.schema import compile_schemas
+from parse_diag_table.records import NA_CODE, RecordTable, get_pool, is_missing
+from parse_diag_table.config import SOURCE_SHEET1, SOURCE_SHEET2, TARGET_SHEET1
+
+# 对已读取的工作表做预处理
+def pre_process_22_2E(source_sheets, target_sheets, schemas):
+    """
+    Args:
+        source_sheets: CURR_REL 文件中已读取的工作表 {工作表名称: DataFrame}
+        target_sheets: LAST_REL 文件中已读取的工作表 {工作表名称: DataFrame}
+        schemas: 按表头编译的工作表结构 {工作表名称: SheetSchema} (见 schema.compile_schemas)
+    Returns:
+        DataFrame: 预处理后的 22_2E_DID_Library
+        dict: build_did_index 建立的 DID 索引
+        RecordTable: build_did_source_table 建立的 DID 属性表
+    """
+    source_df1 = source_sheets[SOURCE_SHEET1]
+    source_df2 = source_sheets[SOURCE_SHEET2]
+    # target 会被修改，复制一份以免影响调用方持有的工作表
+    target_df = target_sheets[TARGET_SHEET1].copy()
     
+    # 每个 source 文件只建立一次 DID 索引，后续所有查找都通过索引完成
+    did_index = build_did_index(source_df1, source_df2, schemas)
+
     # 提取 source_did_list
+    source_did_list = get_source_did_list(source_df1, source_df2, did_index, schemas)
+
+    print(f'\nsource DID len: {len(source_did_list)}; \nsource DID: {", ".join(source_did_list)}')
+    
+    # 提取 target_did_list
+    target_dids = get_target_dids(target_df, schemas[TARGET_SHEET1])
+    target_did_list = list(dict.fromkeys(target_dids))
+    print(f'target DID len: {len(target_did_list)}; \ntarget DID: {", ".join(target_did_list)}')
+
+    # 进行比对和更新：用集合运算找出新增和删除的 DID
+    source_did_set = set(source_did_list)
+    target_did_set = set(target_did_list)
+
+    new_dids = [value for value in dict.fromkeys(source_did_list) if value not in target_did_set]
+    for value in new_dids:
+        print(f"新增: {value}")
+
+    removed_mask = ~target_dids.isin(source_did_set).to_numpy(dtype=bool)
+    for value in dict.fromkeys(target_dids[removed_mask]):
+        print(f"删除: {value}")
+    removed_indices = target_dids.index[removed_mask]
+
+    # 新行只填充 A 列 也就是 DID，其余为 NaN；删除和追加一次完成
+    sel_col_idx = schemas[TARGET_SHEET1]['A']
+    new_rows = []
+    for value in new_dids:
+        new_row = [np.nan] * len(target_df.columns)
+        new_row[sel_col_idx] = value
+        new_rows.append(new_row)
+    target_df = replace_rows(target_df, removed_indices, new_rows)
+
+    # 3.1 和 3.2 中用到的列合并为一张编码后的属性表，更新时只按 DID 取行
+    source_table = build_did_source_table(source_df1, source_df2, did_index, schemas)
+    
+    return target_df, did_index, source_table
+
+def normalize_support(value):
+    """Support 列的取值规范化为大写文本：空值为 '' (与 Y 一样不跳过)；文本 'nan' 是无效值，返回 None"""
+    if is_missing(value):
+        return ''
+    text = str(value).strip().upper()
+    return None if text == 'NAN' else text
+
+def get_source_did_list(source_df1, source_df2, did_index, schemas):
+    """按顺序提取 source 中需要处理的 DID (不带 0x)
+    3.1Basic DIDs 中 Support 为 N 的 DID 跳过，3.2RDBI 0x22 & WDBI 0x2E 中的 DID 全部保留
+    """
     source_did_list = []
+    schema1 = schemas[SOURCE_SHEET1]
+    pool = get_pool()
+    # Support 列只有 Y/N 等少数几种取值，整列编码后每种取值只规范化一次
+    support_codes = pool.encode(source_df1.iloc[:, schema1['E']])
+    support_texts = {code: normalize_support(pool.value(code)) for code in np.unique(support_codes).tolist()}
     # 处理 source_sheet1
-    for idx, value in enumerate(source_df1.iloc[:, get_column_index('A', 'basic_did')].dropna().astype(str)):
-        if value.startswith("0x"):
-            # print(f"\n找到 DID: {value}")
-            # 使用布尔索引找到对应的行
-            matching_rows = source_df1[source_df1.iloc[:, get_column_index('A', 'basic_did')] == value]
-            if len(matching_rows) == 0:
-                print(f"错误: 未找到 DID {value} 的完整数据")
-                continue
-                
-            row_data = matching_rows.iloc[0]
-            # print("该行所有数据:")
-            # for col in source_df1.columns:
-            #     print(f"{col}: {row_data[col]}")
-            
-            # 检查 Support 列的值
-            support_value = str(row_data.iloc[get_column_index('E', 'basic_did')]).strip().upper()
-            if pd.isna(support_value) or support_value == 'NAN':
-                print(f"警告: DID {value} 的 Support 值为空或无效，默认设置为 'N'")
-                support_value = 'N'
-            if support_value != 'N':
-                source_did_list.append(value.replace("0x", ""))
-            else:
-                # print(f"DID {value} 的 Support 值为 N，跳过处理")
-                pass
+    for _, value in iter_did_cells(source_df1.iloc[:, schema1['A']]):
+        _, row_pos = did_index[normalize_did(value)]
+        
+        # 检查 Support 列的值
+        support_value = support_texts[int(support_codes[row_pos])]
+        if support_value is None:
+            print(f"警告: DID {value} 的 Support 值无效，默认设置为 'N'")
+            support_value = 'N'
+        if support_value != 'N':
+            source_did_list.append(normalize_did(value))
+        else:
+            # print(f"DID {value} 的 Support 值为 N，跳过处理")
+            pass
 
     # 处理 source_sheet2
-    for value in source_df2.iloc[:, get_column_index('A', 'rdbi_wdbi')].dropna().astype(str):
-        if value.startswith("0x"):
-            source_did_list.append(value.replace("0x", ""))
+    for _, value in iter_did_cells(source_df2.iloc[:, schemas[SOURCE_SHEET2]['A']]):
+        source_did_list.append(normalize_did(value))
+    return source_did_list
 
-    length = source_did_list
+def get_target_dids(target_df, schema):
+    """提取 22_2E_DID_Library 中的 DID (只包含字母和数字的单元格)
+    Args:
+        target_df: 22_2E_DID_Library
+        schema: 22_2E_DID_Library 的 SheetSchema
+    Returns:
+        Series: 以 target_df 的行索引为索引的 DID
+    """
+    did_column = target_df.iloc[:, schema['A']].dropna().astype(str)
+    return did_column[did_column.str.fullmatch(r"[a-zA-Z0-9]+").to_numpy(dtype=bool)]
 
-    print(f'\nsource DID len: {len(source_did_list)}; \nsource DID: {', '.join(source_did_list)}')
-    
-    # 提取 target_did_list
-    target_did_list = {}
-    for idx, value in enumerate(target_df.iloc[:, get_column_index('A', 'did_library')].dropna().astype(str)):
-       if re.fullmatch(r"[a-zA-Z0-9]+", value):
-         target_did_list[value] = idx
-    print(f'target DID len: {len(target_did_list)}; \ntarget DID: {', '.join(target_did_list.keys())}')
+def normalize_did(value):
+    """DID 统一去掉 0x 前缀作为索引的键，带不带 0x 都可以查找"""
+    value = str(value).strip()
+    return value[2:] if value.startswith("0x") else value
 
-    # 进行比对和更新
-    new_rows = []
-    removed_indices = []
-    
-    for value in source_did_list:
-        if value not in target_did_list:
-            print(f"新增: {value}")
-            new_rows.append(value)
-    
-    for value, idx in list(target_did_list.items()):
-        if value not in source_did_list:
-            print(f"删除: {value}")
-            removed_indices.append(idx)
-    
-    # 添加新行
-    sel_col = "A"
-    sel_col_idx = get_column_index('A', 'did_library')
-
-    for value in new_rows:
-        new_row = [np.nan] * len(target_df.columns)  # 生成全 NaN 行
-        new_row[sel_col_idx] = value  # 只填充 A 列 也就是 DID
-        target_df.loc[len(target_df)] = new_row  # 追加新行
-
-    # 删除不存在的行
-    target_df.drop(removed_indices, inplace=True)
-    target_df.reset_index(drop=True, inplace=True)
-    
-    return source_df1, source_df2, target_df
+def iter_did_cells(column):
+    """按顺序返回列中以 0x 开头的单元格 (行号, 值)"""
+    values = column.dropna().astype(str)
+    mask = values.str.startswith("0x").to_numpy(dtype=bool)
+    for row_pos, value in zip(values.index[mask], values[mask]):
+        yield row_pos, value
+
+def build_did_index(source_df1, source_df2, schemas):
+    """为 source 中的 DID 建立哈希索引
+    Args:
+        source_df1: 3.1Basic DIDs
+        source_df2: 3.2RDBI 0x22 & WDBI 0x2E
+        schemas: {工作表名称: SheetSchema}
+    Returns:
+        dict: {DID (不带 0x): (source_flag, 行号)}
+        同一个 DID 以 source_sheet1 优先，同一工作表内取第一次出现的行
+    """
+    did_index = {}
+    for source_flag, source_df, schema in (('source_sheet1', source_df1, schemas[SOURCE_SHEET1]),
+                                           ('source_sheet2', source_df2, schemas[SOURCE_SHEET2])):
+        for row_pos, value in iter_did_cells(source_df.iloc[:, schema['A']]):
+            did_index.setdefault(normalize_did(value), (source_flag, row_pos))
+    return did_index
 
-def main_process_22_2E(data, source_df1, source_df2, target_df, target_row_index):
-    source_row1 = source_df1.iloc[:, get_column_index('A', 'basic_did')]
-    source_row2 = source_df2.iloc[:, get_column_index('A', 'rdbi_wdbi')]
-    data_prefixed = f"0x{data}"  # 添加 0x 前缀
+# 22_2E_DID_Library 各字段在 source 中对应的列 {字段: (3.1Basic DIDs 列, 3.2RDBI 0x22 & WDBI 0x2E 列)}
+DID_SOURCE_FIELDS = {
+    'description': ('B', 'B'),     # DID Name (English)
+    'format': ('AB', 'Z'),         # Formula
+    'length': ('F', 'D'),          # Byte Length(Dec)
+    'read_app': ('H', 'F'),        # Read.APP.Support
+    'write_app': ('N', 'L'),       # Write.APP.Support
+    'read_boot': ('K', 'I'),       # Read.Booloader.Supprt
+    'write_boot': ('R', 'P'),      # Write.Booloader.Supprt
+    'write_app_level': ('O', 'M'), # Write.APP.Access_Level
+    'write_boot_level': ('S', 'Q'),# Write.Bootloader.Access_Level
+    'read_app_level': ('I', 'G'),  # Read.APP.Access_Level
+    'read_boot_level': ('L', 'J'), # Read.Bootloader.Access_Level
+}
+
+# Format 列只保留这几种，其余 (包括空值) 都按 HEX 处理
+DID_FORMATS = ['Bytefield', 'ASCII', 'BCD']
+
+def build_did_source_table(source_df1, source_df2, did_index, schemas):
+    """按 DID 索引把 3.1 和 3.2 中用到的列合并成一张编码后的属性表
+    Returns:
+        RecordTable: 键为 DID (不带 0x)，字段为 DID_SOURCE_FIELDS 中的字段
+    """
+    pool = get_pool()
+    keys = []
+    parts = []
+    for pos, (source_flag, source_df, schema) in enumerate((('source_sheet1', source_df1, schemas[SOURCE_SHEET1]),
+                                                            ('source_sheet2', source_df2, schemas[SOURCE_SHEET2]))):
+        entries = [(did, row_pos) for did, (flag, row_pos) in did_index.items() if flag == source_flag]
+        rows = [row_pos for _, row_pos in entries]
+        cols = schema.indices(letters[pos] for letters in DID_SOURCE_FIELDS.values())
+        part = np.empty((len(rows), len(cols)), dtype=np.int32)
+        for i, col in enumerate(cols):
+            part[:, i] = pool.encode(source_df.iloc[rows, col])
+        keys.extend(did for did, _ in entries)
+        parts.append(part)
+    return RecordTable(keys, DID_SOURCE_FIELDS, np.concatenate(parts))
+
+def lookup_codes(left, right, func):
+    """对两列编码的取值组合建立查找表，每种组合只调用一次 func (空值传入 None)，再按组合映射回每一行
+    Returns:
+        ndarray: func 返回值的编码
+    """
+    pool = get_pool()
+    width = len(pool)
+    pair_keys, inverse = np.unique(left.astype(np.int64) * width + right, return_inverse=True)
+    table = np.empty(len(pair_keys), dtype=np.int32)
+    for i, key in enumerate(pair_keys.tolist()):
+        left_code, right_code = divmod(key, width)
+        table[i] = pool.code(func(None if left_code == NA_CODE else pool.value(left_code),
+                                  None if right_code == NA_CODE else pool.value(right_code)))
+    return table[inverse.ravel()]
+
+def compute_did_columns(source_table, rows):
+    """由 source 中的字段计算 22_2E_DID_Library 的 B~H 列
+    Args:
+        source_table: build_did_source_table 建立的 DID 属性表
+        rows: 需要计算的 DID 在 source_table 中的行号
+    Returns:
+        dict: {列字母: 取值的编码 (source_table 的取值表)}，顺序与 rows 一致
+    """
+    def field(name):
+        return source_table.field_codes(name, rows)
+
+    # 如果 Format 为空或不在支持的格式中，则设置为 'HEX'
+    pool = source_table.pool
+    format_codes = field('format')
+    format_codes = np.where(np.isin(format_codes, [pool.code(value) for value in DID_FORMATS]),
+                            format_codes, pool.code('HEX'))
+
+    return {
+        'B': field('description'),
+        'C': format_codes,
+        'D': field('length'),
+        'E': lookup_codes(field('read_app'), field('write_app'), compute_app),
+        'F': lookup_codes(field('read_boot'), field('write_boot'), compute_app),
+        'G': lookup_codes(field('write_app_level'), field('write_boot_level'), format_security_level),
+        'H': lookup_codes(field('read_app_level'), field('read_boot_level'), format_security_level),
+    }
+
+def main_process_22_2E(target_df, source_table, schemas):
+    """整表计算 22_2E_DID_Library 的 Description/Format/Length/APP/Boot/Security Level 列
+    Args:
+        target_df: 预处理后的 22_2E_DID_Library，直接在上面更新
+        source_table: build_did_source_table 建立的 DID 属性表
+        schemas: {工作表名称: SheetSchema}
+    """
+    if target_df.empty:
+        return
+
+    # target 的 DID 列与 3.1/3.2 合并后的属性表做连接
+    target_schema = schemas[TARGET_SHEET1]
+    target_dids = target_df.iloc[:, target_schema['A']].astype(str).str.strip().str.removeprefix("0x")
+    positions = source_table.positions
+    missing = ~target_dids.isin(source_table.keys)
+    if missing.any():
+        raise ValueError(f"数据 '0x{target_dids[missing].iloc[0]}' 未在 source_sheet1 或 source_sheet2 中找到，程序退出。")
+    updates = compute_did_columns(source_table, [positions[did] for did in target_dids])
+    # 整列替换为 object 类型，模板中原来是数字类型的列也可以写入字符串
+    for letter, codes in updates.items():
+        target_df.isetitem(target_schema[letter],
+                           pd.Series(source_table.pool.decode(codes), index=target_df.index, dtype=object))
+
+def process_22_2E(source_sheets, target_sheets, schemas=None):
+    print(f"Begin to process 22 and 2E sheet")
+    # 没有传入时按表头编译工作表结构，表头与配置对不上时直接报错
+    schemas = schemas or compile_schemas({**source_sheets, **target_sheets})
+    target_df, _, source_table = pre_process_22_2E(source_sheets, target_sheets, schemas)
+
+    # 整表计算所有 DID 的各列
+    main_process_22_2E(target_df, source_table, schemas)
     
-    # print(data_prefixed)
-    # print(source_row1.values)
-    # 过滤掉 NA 值
-    filtered_values = [val for val in source_row1.values if pd.notna(val)]
-    filtered_values2 = [val for val in source_row2.values if pd.notna(val)]
-
-    if data_prefixed in filtered_values:
-        process_updates(source_df1[source_df1.iloc[:, get_column_index('A', 'basic_did')] == data_prefixed].iloc[0], target_df, target_row_index, source_flag='source_sheet1')
-    elif data_prefixed in filtered_values2:
-        process_updates(source_df2[source_df2.iloc[:, get_column_index('A', 'rdbi_wdbi')] == data_prefixed].iloc[0], target_df, target_row_index, source_flag='source_sheet2')
-    else:
-        raise ValueError(f"数据 '{data_prefixed}' 未在 source_sheet1 或 source_sheet2 中找到，程序退出。")
+    print(f"Finished process 22 and 2E sheet")
+    return target_df
 
 def compute_app(update1, update2):
     if update1 == 'yes' and update2 == 'yes':
@@ -150,72 +295,3 @@ def format_security_level(update1, update2):
     levels = [lvl for lvl in levels if lvl in ['Locked', 'L1', 'L2', 'L3', 'L4', 'L5']]
     sorted_levels = sorted(set(levels), key=lambda x: ['Locked', 'L1', 'L2', 'L3', 'L4', 'L5'].index(x))
     return '/'.join(sorted_levels).replace('Locked', 'Lock')
-
-
-def process_updates(source_row, target_df, target_row_index, source_flag):
-    update_description(source_row, target_df, target_row_index, source_flag)
-    update_format(source_row, target_df, target_row_index, source_flag)
-    update_length(source_row, target_df, target_row_index, source_flag)
-    update_app(source_row, target_df, target_row_index, source_flag)
-    update_boot(source_row, target_df, target_row_index, source_flag)
-    update_security_2E(source_row, target_df, target_row_index, source_flag)
-    update_security_22(source_row, target_df, target_row_index, source_flag)
-
-def update_description(source_row, target_df, target_row_index, source_flag):
-    update_column(target_df, target_row_index, get_column_index('B', 'did_library'), source_row.iloc[get_column_index('B', 'basic_did')], "Description")
-
-def update_format(source_row, target_df, target_row_index, source_flag):
-    col_index = get_column_index('AB', 'basic_did') if source_flag=="source_sheet1" else get_column_index('Z', 'rdbi_wdbi')
-    format_value = source_row.iloc[col_index]
-    # 如果 format_value 为空，则设置为 'HEX'
-    if pd.isna(format_value) or format_value == 'nan':
-        format_value = 'HEX'
-    else:
-        format_value = format_value if format_value in ['Bytefield', 'ASCII', 'BCD'] else 'HEX'
-    update_column(target_df, target_row_index, get_column_index('C', 'did_library'), format_value, "Format")
-
-def update_length(source_row, target_df, target_row_index, source_flag):
-    col_index = get_column_index('F', 'basic_did') if source_flag=="source_sheet1" else get_column_index('D', 'rdbi_wdbi')
-    update_column(target_df, target_row_index, get_column_index('D', 'did_library'), source_row.iloc[col_index], "Length")
-
-def update_app(source_row, target_df, target_row_index, source_flag):
-    if source_flag=="source_sheet1":
-        cols = [get_column_index('H', 'basic_did'), get_column_index('N', 'basic_did')]
-    else:
-        cols = [get_column_index('F', 'rdbi_wdbi'), get_column_index('L', 'rdbi_wdbi')]
-    update1, update2 = source_row.iloc[cols[0]], source_row.iloc[cols[1]]
-    update_final = compute_app(update1, update2)
-    update_column(target_df, target_row_index, get_column_index('E', 'did_library'), update_final, "APP")
-
-def update_boot(source_row, target_df, target_row_index, source_flag):
-    if source_flag=="source_sheet1":
-        cols = [get_column_index('K', 'basic_did'), get_column_index('R', 'basic_did')]
-    else:
-        cols = [get_column_index('I', 'rdbi_wdbi'), get_column_index('P', 'rdbi_wdbi')]
-    update1, update2 = source_row.iloc[cols[0]], source_row.iloc[cols[1]]
-    update_final = compute_app(update1, update2)
-    update_column(target_df, target_row_index, get_column_index('F', 'did_library'), update_final, "Boot")
-
-def update_security_2E(source_row, target_df, target_row_index, source_flag):
-    if source_flag=="source_sheet1":
-        cols = [get_column_index('O', 'basic_did'), get_column_index('S', 'basic_did')]
-    else:
-        cols = [get_column_index('M', 'rdbi_wdbi'), get_column_index('Q', 'rdbi_wdbi')]
-    update1, update2 = source_row.iloc[cols[0]], source_row.iloc[cols[1]]
-    update_final = format_security_level(update1, update2)
-    update_column(target_df, target_row_index, get_column_index('G', 'did_library'), update_final, "Security Level 2E")
-
-def update_security_22(source_row, target_df, target_row_index, source_flag):
-    if source_flag=="source_sheet1":
-        cols = [get_column_index('I', 'basic_did'), get_column_index('L', 'basic_did')]
-    else:
-        cols = [get_column_index('G', 'rdbi_wdbi'), get_column_index('J', 'rdbi_wdbi')]
-    update1, update2 = source_row.iloc[cols[0]], source_row.iloc[cols[1]]
-    update_final = format_security_level(update1, update2)
-    update_column(target_df, target_row_index, get_column_index('H', 'did_library'), update_final, "Security Level 22")
-
-def update_column(target_df, row_index, col_index, new_value, column_name):
-    if target_df.iloc[row_index, col_index] != new_value:
-        # print(f"Updating {column_name}[{row_index}]: {target_df.iloc[row_index, col_index]} -> {new_value}")
-        target_df.iloc[row_index, col_index] = new_value
-
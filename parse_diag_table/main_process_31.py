@@ -16,35 +16,41 @@
 -------------------------------------------------
 """
 
-import os
-import sys
-import re
 import pandas as pd
 import numpy as np
-# 添加项目根目录到 Python 路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import read_excel, save_excel
-from parse_diag_table.config import get_column_index
+from parse_diag_table.utils import replace_rows
+from parse_diag_table.schema import compile_schemas
+from parse_diag_table.records import RecordTable, RidRecord, RidSource, get_pool
 from parse_diag_table.config import (
     SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3,
-    TARGET_SHEET1, TARGET_SHEET2,
+    TARGET_SHEET1, TARGET_SHEET2, SUBSERVICES,
 )
 
-# 读取 Excel 文件并做预处理
-def pre_process_31(source_file, target_file):
+# 对已读取的工作表做预处理
+def pre_process_31(source_sheets, target_sheets, schemas):
+    """
+    Args:
+        source_sheets: CURR_REL 文件中已读取的工作表 {工作表名称: DataFrame}
+        target_sheets: LAST_REL 文件中已读取的工作表 {工作表名称: DataFrame}
+        schemas: 按表头编译的工作表结构 {工作表名称: SheetSchema} (见 schema.compile_schemas)
+    Returns:
+        DataFrame: 3.3RoutineControl 0x31
+        DataFrame: 预处理后的 31_RID_Library
+        dict: build_rid_segments 建立的 RID 分段表
+        RecordTable: build_rid_source_table 建立的 RID 属性表
+    """
     # # 设置 pandas 显示选项，显示所有列
     # pd.set_option('display.max_columns', None)  # 显示所有列
     # pd.set_option('display.width', None)        # 加宽显示宽度
     # pd.set_option('display.max_colwidth', None) # 显示完整的列内容
     
-    # print(f"Processing source file: {source_file}, sheet: {SOURCE_SHEET3}")
-    source_df = read_excel(source_file, SOURCE_SHEET3)
+    source_df = source_sheets[SOURCE_SHEET3]
     # print(f"\nSource DataFrame:")
     # print(f"总行数: {len(source_df)}")
     # print(source_df)
     
-    # print(f"\nProcessing target file: {target_file}, sheet: {TARGET_SHEET2}")
-    target_df = read_excel(target_file, TARGET_SHEET2)
+    # target 会被修改，复制一份以免影响调用方持有的工作表
+    target_df = target_sheets[TARGET_SHEET2].copy()
     # print("\nTarget DataFrame:")
     # print(f"总行数: {len(target_df)}")
     # print(target_df)
@@ -52,30 +58,31 @@ def pre_process_31(source_file, target_file):
     # print(target_df.info())
     
     # 提取 source_rid_list
-    source_rid_list = []
-    for value in source_df.iloc[:, get_column_index('A', 'routine_control')].dropna().astype(str):
-        if value.startswith("0x"):
-            source_rid_list.append(value)
-    print(f'source RID len: {len(source_rid_list)}; \nsource RID: {', '.join(source_rid_list)}')
+    source_rid_list = get_source_rid_list(source_df, schemas[SOURCE_SHEET3])
+    print(f'source RID len: {len(source_rid_list)}; \nsource RID: {", ".join(source_rid_list)}')
     
     # 提取 target_rid_list，每三行为一组
+    rid_col_idx = schemas[TARGET_SHEET2]['A']
+    desc_col_idx = schemas[TARGET_SHEET2]['B']
+    rid_column = target_df.iloc[:, rid_col_idx]
+    desc_column = target_df.iloc[:, desc_col_idx]
+
+    # 检查是否为有效的 RID 值（不是空值且不是特殊字符串）
+    rid_text = rid_column.astype(str).str.strip().str.upper()
+    is_rid_row = (rid_column.notna() & ~rid_text.isin(['NAN', 'NA'])).to_numpy(dtype=bool)
+    rid_rows = np.flatnonzero(is_rid_row)
     target_rid_list = {}
-    current_rid = None
-    current_description = None
-    
-    for idx, row in target_df.iterrows():
-        rid_value = row.iloc[get_column_index('A', 'rid_library')]
-        desc_value = row.iloc[get_column_index('B', 'rid_library')]
-        
-        # 检查是否为有效的 RID 值（不是空值且不是特殊字符串）
-        if not pd.isna(rid_value) and str(rid_value).strip().upper() not in ['NAN', 'NA']:
-            current_rid = rid_value
-            current_description = desc_value
-            target_rid_list[current_rid] = idx - (idx % 3)
-        else:
-            # 将前两列的值设置为与组内第一行相同
-            target_df.iloc[idx, get_column_index('A', 'rid_library')] = current_rid
-            target_df.iloc[idx, get_column_index('B', 'rid_library')] = current_description
+    for idx in rid_rows:
+        target_rid_list[rid_column.iat[idx]] = int(idx - (idx % 3))
+
+    # 将组内其余行前两列的值设置为与组内第一行相同 (第一个 RID 之前的行设置为 None)
+    fill_rows = np.flatnonzero(~is_rid_row)
+    if len(fill_rows):
+        group_ids = np.cumsum(is_rid_row)[fill_rows]
+        group_rids = np.insert(rid_column.to_numpy(dtype=object)[rid_rows], 0, None)
+        group_descriptions = np.insert(desc_column.to_numpy(dtype=object)[rid_rows], 0, None)
+        target_df.iloc[fill_rows, rid_col_idx] = group_rids[group_ids]
+        target_df.iloc[fill_rows, desc_col_idx] = group_descriptions[group_ids]
     
     print(f'target RID len: {len(target_rid_list)}; \ntarget RID: {", ".join([f"{k}: {v}" for k, v in target_rid_list.items()])}')
 
@@ -85,243 +92,283 @@ def pre_process_31(source_file, target_file):
     #         row_data = target_df.iloc[start_idx + i]
     #         print(f"行 {start_idx + i} 数据: {row_data.to_dict()}")
 
-    # 进行比对和更新
-    new_rids = []
-    removed_indices = []
-    
+    # 进行比对和更新：用集合运算找出新增和删除的 RID
+    source_rid_set = set(source_rid_list)
+
     # 找出需要新增的 RID
-    for value in source_rid_list:
-        if value not in target_rid_list:
-            print(f"新增: {value}")
-            new_rids.append(value)
+    new_rids = [value for value in dict.fromkeys(source_rid_list) if value not in target_rid_list]
+    for value in new_rids:
+        print(f"新增: {value}")
     
-    # 找出需要删除的 RID
+    # 找出需要删除的 RID，每个 RID 删除三行
+    removed_indices = []
     for value, start_idx in sorted(target_rid_list.items(), key=lambda x: x[1], reverse=True):
-        if value not in source_rid_list:
+        if value not in source_rid_set:
             print(f"删除: {value}")
-            # 记录三行的索引
-            removed_indices.extend([start_idx, start_idx + 1, start_idx + 2])
-    
-
-    # print("\n删除前的 DataFrame:")
-    # print(f"总行数: {len(target_df)}")
-    # print(target_df)
+            removed_indices.extend(i for i in range(start_idx, start_idx + 3) if i < len(target_df))
 
-    # 删除不存在的 RID（每次删除三行）
-    if removed_indices:
-        # 按照索引从大到小排序，这样删除时不会影响其他行的索引
-        removed_indices.sort(reverse=True)
-        target_df.drop(removed_indices, inplace=True)
-        target_df.reset_index(drop=True, inplace=True)
-        
-    # print("\n删除后的 DataFrame:")
-    # print(f"总行数: {len(target_df)}")
-    # print(target_df)
-    
-    # 添加新的 RID（每次添加三行）
+    # 添加新的 RID（每个 RID 三行，所有列初始化为 'NA'，三行都设置相同的 RID），删除和追加一次完成
+    new_rows = []
     for rid in new_rids:
-        # 创建三行新数据
-        for i in range(3):
-            new_row = ['NA'] * len(target_df.columns)  # 初始化所有列为 'NA'
-            # 在所有三行中都设置相同的 RID 和 Description
-            new_row[get_column_index('A', 'rid_library')] = rid
-            target_df.loc[len(target_df)] = new_row
+        new_row = ['NA'] * len(target_df.columns)
+        new_row[rid_col_idx] = rid
+        new_rows.extend([list(new_row) for _ in range(3)])
+    target_df = replace_rows(target_df, removed_indices, new_rows)
 
     # print("\n预处理后的 DataFrame:")
     # print(f"总行数: {len(target_df)}")
     # print(target_df)
+
+    # 一次遍历 source 建立 RID 分段表，后续每个 subservice 直接查表
+    rid_segments = build_rid_segments(source_df, schemas[SOURCE_SHEET3])
+    rid_table = build_rid_source_table(source_df, rid_segments, schemas[SOURCE_SHEET3])
     
-    return source_df, target_df
+    return source_df, target_df, rid_segments, rid_table
 
-def save_excel_with_merged_cells(df, file_path, sheet_name):
+def get_source_rid_list(source_df, schema):
+    """按顺序提取 3.3RoutineControl 0x31 中 A 列以 0x 开头的 RID"""
+    return [value for value in source_df.iloc[:, schema['A']].dropna().astype(str)
+            if value.startswith("0x")]
+
+def build_rid_segments(source_df, schema):
+    """一次遍历 3.3RoutineControl 0x31，建立每个 RID 的分段表
+    每个 RID 从所在行开始，到下一个以 0x 开头的 RID 所在行 (或文件末尾) 结束
+    Args:
+        source_df: 源数据框
+        schema: 3.3RoutineControl 0x31 的 SheetSchema
+    Returns:
+        dict: {RID: (起始行, 结束行 (不含), {subservice: [分段内 G 列包含该 subservice 的行号]})}
+        同一个 RID 出现多次时取第一次出现的分段
     """
-    保存 DataFrame 到 Excel 文件，并调整列宽。
-    如果 sheet 已存在，则覆盖该 sheet，保留其他 sheet。
+    rid_column = source_df.iloc[:, schema['A']]
+    rid_values = rid_column.astype(str)
+    is_rid_row = (rid_column.notna() & rid_values.str.startswith('0x')).to_numpy(dtype=bool)
+    start_rows = np.flatnonzero(is_rid_row)
+    end_rows = np.append(start_rows[1:], len(source_df))
+
+    # 每个 subservice 在整张表中匹配的行号 (有序)，再按分段切片
+    subfunction_values = source_df.iloc[:, schema['G']].astype(str)
+    subservice_rows = {
+        subservice: np.flatnonzero(subfunction_values.str.contains(subservice, regex=False).to_numpy(dtype=bool))
+        for subservice in SUBSERVICES
+    }
+
+    rid_segments = {}
+    for start_row, end_row in zip(start_rows, end_rows):
+        rid = rid_values.iat[start_row]
+        if rid in rid_segments:
+            continue
+        matching_rows = {}
+        for subservice, rows in subservice_rows.items():
+            lo, hi = np.searchsorted(rows, [start_row, end_row])
+            matching_rows[subservice] = rows[lo:hi].tolist()
+        rid_segments[rid] = (int(start_row), int(end_row), matching_rows)
+    return rid_segments
+
+def build_rid_source_table(source_df, rid_segments, schema):
+    """取出每个 RID 起始行中更新 31_RID_Library 时用到的列，编码后保存为一张属性表
+    Args:
+        source_df: 源数据框
+        rid_segments: build_rid_segments 建立的 RID 分段表
+        schema: 3.3RoutineControl 0x31 的 SheetSchema
+    Returns:
+        RecordTable: 键为 RID，记录类型为 RidSource
     """
-    try:
-        # 第一步：使用 pandas 保存 DataFrame
-        if os.path.exists(file_path):
-            with pd.ExcelWriter(file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-        else:
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-        
-        # 第二步：使用 openpyxl 打开文件进行单元格合并
-        from openpyxl import load_workbook
-        wb = load_workbook(file_path)
-        ws = wb[sheet_name]
-        
-        # 调整列宽
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).apply(len).max(),
-                len(str(col))
-            )
-            ws.column_dimensions[chr(65 + idx)].width = max_length + 2
-        
-        # 合并 A 列和 B 列的单元格
-        current_rid = None
-        merge_start = 2  # Excel 行号从 1 开始，第 1 行是标题
-        
-        for row in range(2, len(df) + 2):  # +2 是因为 Excel 行号从 1 开始，且第 1 行是标题
-            rid = df.iloc[row-2, get_column_index('A', 'rid_library')]
-            if current_rid != rid:
-                if current_rid is not None:
-                    # 合并前一个 RID 的三行
-                    ws.merge_cells(f'A{merge_start}:A{row-1}')
-                    ws.merge_cells(f'B{merge_start}:B{row-1}')
-                current_rid = rid
-                merge_start = row
-        
-        # 处理最后一个 RID
-        if current_rid is not None:
-            ws.merge_cells(f'A{merge_start}:A{len(df)+1}')
-            ws.merge_cells(f'B{merge_start}:B{len(df)+1}')
-        
-        # 保存修改后的文件
-        wb.save(file_path)
-        
-    except Exception as e:
-        print(f"保存 Excel 文件时出错: {str(e)}")
-        raise
-
-def update_target_with_source_data(subservice,source_df, target_df, target_row_idx, matching_rows, rid_start_row):
-    """当 source 中有匹配数据时，更新 target 数据
+    start_rows = [start_row for start_row, _, _ in rid_segments.values()]
+    return RecordTable.from_columns(
+        rid_segments,
+        {name: source_df.iloc[start_rows, schema[letter]] for name, letter in zip(RidSource.__slots__, RidSource.LETTERS)},
+        RidSource)
+
+def build_target_rid_blocks(target_df, schema):
+    """建立 RID 到 target 中该 RID 三行起始行号的索引 (按 RID 精确匹配)
+    Args:
+        target_df: 预处理后的目标数据框，每个 RID 的三行 A 列都已填充
+        schema: 31_RID_Library 的 SheetSchema
+    Returns:
+        dict: {RID: 起始行号}
+    """
+    target_blocks = {}
+    for idx, rid in enumerate(target_df.iloc[:, schema['A']].astype(str)):
+        target_blocks.setdefault(rid, idx)
+    return target_blocks
+
+def aggregate_rid_responses(source_df, rid_segments, schema):
+    """按 (RID, subservice, Req/Resp) 分组，一次计算所有 RID 的 ResponseLength 和 ResponseNRC
+    - ResponseLength: Resp 行 M 列 BitLength 之和除以 8；
+      只要有一个 Resp 行的 BitLength 是字符串，结果为 NA；BitLength 之和为 0 时报错
+    - ResponseNRC: 只要有一个 Req 行的 BitLength 不为空，结果为 0x13，否则为 NA
     Args:
         source_df: 源数据框
-        target_df: 目标数据框
-        target_row_idx: 目标行索引
-        matching_rows: 源数据中匹配的行索引列表 (非空)
-        rid_start_row: RID 在 source 中的起始行索引
+        rid_segments: build_rid_segments 建立的 RID 分段表
+        schema: 3.3RoutineControl 0x31 的 SheetSchema
+    Returns:
+        dict: {(RID, subservice): (ResponseLength, ResponseNRC)}，只包含 source 中有匹配行的子服务
+        list: BitLength 之和为 0 的 (RID, subservice)
     """
-    # 更新 B 列 Description (使用 RID 起始行的 B 列值)
-    target_df.iloc[target_row_idx, get_column_index('B', 'rid_library')] = \
-        source_df.iloc[rid_start_row, get_column_index('B', 'routine_control')]
-        
-    # 更新 F 列 LockLevel (使用 RID 起始行的 D 列值)
-    target_df.iloc[target_row_idx, get_column_index('F', 'rid_library')] = \
-        source_df.iloc[rid_start_row, get_column_index('D', 'routine_control')]
-    
-    # 更新 G 列 Session (使用 RID 起始行的 E 列 Session 的值)
-    target_df.iloc[target_row_idx, get_column_index('G', 'rid_library')] = \
-        f"0x{source_df.iloc[rid_start_row, get_column_index('E', 'routine_control')]}"
-    
-    # 根据 source 的 E 列 Session 的值更新 C 列 APP 和 D 列 Boot
-    session_value = str(source_df.iloc[rid_start_row, get_column_index('E', 'routine_control')])
+    # 展开成长表：每个 RID 的每个子服务匹配的每一行 (同一行可以同时属于多个子服务)
+    keys, rows = [], []
+    for rid, (_, _, segment_rows) in rid_segments.items():
+        for subservice, matching_rows in segment_rows.items():
+            keys.extend([(rid, subservice)] * len(matching_rows))
+            rows.extend(matching_rows)
+    if not rows:
+        return {}, []
+
+    # Req/Resp 只有两种取值，按编码分组
+    pool = get_pool()
+    req_resp = pool.encode(source_df.iloc[rows, schema['H']])
+    bit_lengths = source_df.iloc[rows, schema['M']].to_numpy(dtype=object)
+
+    # 按去重后的取值判断 BitLength 是否为字符串，避免逐行判断
+    codes, uniques = pd.factorize(bit_lengths)
+    unique_is_str = np.append([isinstance(value, str) for value in uniques], False).astype(bool)
+    has_bits = codes != -1
+    is_str = unique_is_str[codes]
+    numeric_bits = np.zeros(len(rows), dtype=float)
+    numeric_mask = has_bits & ~is_str
+    numeric_bits[numeric_mask] = bit_lengths[numeric_mask].astype(float)
+
+    long_df = pd.DataFrame({
+        'rid': [rid for rid, _ in keys],
+        'subservice': [subservice for _, subservice in keys],
+        'req_resp': req_resp,
+        'has_bits': has_bits,
+        'is_str': is_str & has_bits,
+        'bits': numeric_bits,
+    })
+    grouped = long_df.groupby(['rid', 'subservice', 'req_resp'], sort=False).agg(
+        has_bits=('has_bits', 'any'),
+        has_str=('is_str', 'any'),
+        total_bits=('bits', 'sum'),
+    )
+
+    group_stats = grouped.to_dict('index')
+
+    responses = {}
+    zero_bit_keys = []
+    resp_code, req_code = pool.code('Resp'), pool.code('Req')
+    for key in dict.fromkeys(keys):
+        resp = group_stats.get(key + (resp_code,))
+        req = group_stats.get(key + (req_code,))
+
+        if resp is not None and resp['has_str']:
+            response_length = "NA"
+        elif resp is not None and resp['total_bits'] > 0:
+            response_length = int(resp['total_bits'] / 8)
+        else:
+            response_length = "NA"
+            zero_bit_keys.append(key)
+
+        response_nrc = "0x13" if req is not None and req['has_bits'] else "NA"
+        responses[key] = (response_length, response_nrc)
+    return responses, zero_bit_keys
+
+def merge_rid_responses(target_df, target_blocks, responses, schema):
+    """把 aggregate_rid_responses 的结果批量写入 target 的 I 列 ResponseLength 和 K 列 ResponseNRC"""
+    if not responses:
+        return
+    target_rows = []
+    response_lengths = []
+    response_nrcs = []
+    for (rid, subservice), (response_length, response_nrc) in responses.items():
+        if rid not in target_blocks:
+            continue
+        target_rows.append(target_blocks[rid] + int(subservice) - 1)
+        response_lengths.append(response_length)
+        response_nrcs.append(response_nrc)
+
+    for letter, values in (('I', response_lengths), ('K', response_nrcs)):
+        col_index = schema[letter]
+        # 模板中可能是数字类型的列，先转换为 object 再写入 'NA' 等字符串
+        target_df.isetitem(col_index, target_df.iloc[:, col_index].astype(object))
+        target_df.iloc[target_rows, col_index] = pd.Series(values, dtype=object).to_numpy()
+
+def check_rid_responses(zero_bit_keys):
+    """BitLength 之和为 0 时按 RID 报告所有出错的子服务"""
+    if zero_bit_keys:
+        details = '; '.join(f"RID {rid} subservice {subservice}" for rid, subservice in zero_bit_keys)
+        raise ValueError(f"total_bits is 0, please check the source data: {details}")
+
+def build_rid_row_values(subservice, rid_source, has_source):
+    """计算 31_RID_Library 中一个子服务所在行的值
+    Args:
+        subservice: 子服务类型 ('01', '02', '03')
+        rid_source: RID 起始行的属性 (RidSource，见 build_rid_source_table)
+        has_source: source 中是否有这个子服务的数据
+    Returns:
+        RidRecord: 有 source 数据时不设置 I 列 ResponseLength 和 K 列 ResponseNRC
+        (由 aggregate_rid_responses 统一计算)
+    """
+    # B 列 Description (使用 RID 起始行的 B 列值)
+    # E 列 SubService 为当前 subservice 的值，前面加个 0x
+    if not has_source:
+        # APP 和 Boot 都为 N，SubService 之后的列都设置为 NA
+        return RidRecord(rid_source.description, "N", "N", f"0x{subservice}",
+                         "NA", "NA", "NA", "NA", "NA", "NA")
+
+    # 根据 source 的 E 列 Session 的值确定 C 列 APP 和 D 列 Boot
+    session = rid_source.session
+    session_value = str(session)
     if session_value == '02':
-        target_df.iloc[target_row_idx, get_column_index('C', 'rid_library')] = "N"
-        target_df.iloc[target_row_idx, get_column_index('D', 'rid_library')] = "Y"
+        app, boot = "N", "Y"
     elif session_value == '03':
-        target_df.iloc[target_row_idx, get_column_index('C', 'rid_library')] = "Y"
-        target_df.iloc[target_row_idx, get_column_index('D', 'rid_library')] = "N"
+        app, boot = "Y", "N"
     else:
         raise ValueError(f"Session 值 {session_value} 无效")
-    
-    # 根据 当前 subservice 的值更新 E 列 SubService 的值，前面加个 0x
-    target_df.iloc[target_row_idx, get_column_index('E', 'rid_library')] = f"0x{subservice}"
-
-    # H 列的值 RequestData 直接更新为 NA
-    target_df.iloc[target_row_idx, get_column_index('H', 'rid_library')] = "NA"
-
-    # I 列的值 ResponseLength 比较复杂，需要根据 source H列的 Req/Resp 和 M 列的 BitLength 一起来考虑
-    # 如果 H 列的值为 Resp, 则 M列的值相加处于8 就是 ResponseLength 的值
-    # 如果 H 列的值为 Req，则忽略这行
-    total_bits = 0
-    resp_length_str = False
-    for row in matching_rows:
-        req_resp = str(source_df.iloc[row, get_column_index('H', 'routine_control')])
-        if req_resp == 'Resp':
-            bit_length = source_df.iloc[row, get_column_index('M', 'routine_control')]
-            if pd.notna(bit_length):
-                if isinstance(bit_length, str):
-                    resp_length_str = True
-                    break
-                total_bits += bit_length
-    # 计算 ResponseLength
-    if resp_length_str:
-        target_df.iloc[target_row_idx, get_column_index('I', 'rid_library')] = "NA"
-    else:
-        if total_bits > 0:
-            target_df.iloc[target_row_idx, get_column_index('I', 'rid_library')] = int(total_bits / 8)
-        else:
-            target_df.iloc[target_row_idx, get_column_index('I', 'rid_library')] = "NA"
-            raise ValueError(f"total_bits is 0, please check the source data")
-    
-    # J 列的值 ResponseData 直接更新为 NA
-    target_df.iloc[target_row_idx, get_column_index('J', 'rid_library')] = "NA"
-
-    # K 列的值 ResponseNRC 根据 source H列的 Req/Resp 和 M 列的 BitLength 一起来考虑
-    # 如果 H 列的值为 Req，则 查看 M 列的 Bit length，只要有一个 Req 对应的 Bit length 不为 NA，则 K 列的值为 0x13，否则为 NA
-    # 如果 H 列的值为 Resp，则 忽略
-    target_df.iloc[target_row_idx, get_column_index('K', 'rid_library')] = "NA"
-    for row in matching_rows:
-        req_resp = str(source_df.iloc[row, get_column_index('H', 'routine_control')])
-        if req_resp == 'Req':
-            bit_length = source_df.iloc[row, get_column_index('M', 'routine_control')]
-            if pd.notna(bit_length):
-                target_df.iloc[target_row_idx, get_column_index('K', 'rid_library')] = "0x13"
-                break
-
-def update_target_without_source(subservice, target_df, target_row_idx, source_df, rid_start_row):
+
+    # F 列 LockLevel (使用 RID 起始行的 D 列值)，G 列 Session (使用 RID 起始行的 E 列 Session 的值)
+    # H 列 RequestData 和 J 列 ResponseData 直接更新为 NA
+    return RidRecord(description=rid_source.description, app=app, boot=boot, subservice=f"0x{subservice}",
+                     lock_level=rid_source.lock_level, session=f"0x{session}",
+                     request_data="NA", response_data="NA")
+
+def update_target_with_source_data(subservice, rid_source, target_df, target_row_idx, schemas):
+    """当 source 中有匹配数据时，更新 target 数据
+    I 列 ResponseLength 和 K 列 ResponseNRC 由 aggregate_rid_responses 统一计算后批量写入
+    Args:
+        rid_source: RID 起始行的属性 (RidSource)
+        target_df: 目标数据框
+        target_row_idx: 目标行索引
+        schemas: {工作表名称: SheetSchema}
+    """
+    target_schema = schemas[TARGET_SHEET2]
+    for letter, value in build_rid_row_values(subservice, rid_source, True).items():
+        target_df.iloc[target_row_idx, target_schema[letter]] = value
+
+def update_target_without_source(subservice, target_df, target_row_idx, rid_source, schemas):
     """当 source 中没有匹配数据时，更新 target 数据
     Args:
         target_df: 目标数据框
         target_row_idx: 目标行索引
         subservice: 子服务类型 ('01', '02', '03')
-        source_df: 源数据框
-        rid_start_row: RID 在 source 中的起始行索引
+        rid_source: RID 起始行的属性 (RidSource)
+        schemas: {工作表名称: SheetSchema}
     """
-    # 更新 B 列 Description
-    target_df.iloc[target_row_idx, get_column_index('B', 'rid_library')] = \
-        source_df.iloc[rid_start_row, get_column_index('B', 'routine_control')]
-    
-    # 更新 C 列 APP 为 N
-    target_df.iloc[target_row_idx, get_column_index('C', 'rid_library')] = "N"
-    
-    # 更新 D 列 Boot 为 N
-    target_df.iloc[target_row_idx, get_column_index('D', 'rid_library')] = "N"
-    
-    # 更新 E 列 SubService
-    target_df.iloc[target_row_idx, get_column_index('E', 'rid_library')] = f"0x{subservice}"
-    
-    # 其他列设置为 NA
-    for col in range(get_column_index('F', 'rid_library'), len(target_df.columns)):
+    target_schema = schemas[TARGET_SHEET2]
+    for letter, value in build_rid_row_values(subservice, rid_source, False).items():
+        target_df.iloc[target_row_idx, target_schema[letter]] = value
+
+    # 模板中列映射以外的其他列 (超出 K 列的列) 也设置为 NA
+    for col in target_schema.extra_positions(len(target_df.columns)):
         target_df.iloc[target_row_idx, col] = "NA"
 
-def process_subservice(source_df, target_df, rid, subservice):
+def process_subservice(rid_source, target_df, rid, subservice, rid_segments, target_blocks, schemas):
     """处理单个 subservice 的数据"""
     # print(f"{'='*50}")
     # print(f"处理 RID {rid} 的 subservice {subservice}")
     # print(f"{'='*50}")
 
     # 1. 处理 target 数据
-    target_row = target_df[
-        target_df.iloc[:, get_column_index('A', 'routine_control')].astype(str).str.contains(rid, na=False)
-    ]
-    target_row_idx = target_row.index[0] + int(subservice) - 1
+    target_row_idx = target_blocks[str(rid)] + int(subservice) - 1
     
     # print(f"\nTarget 数据:")
     # print(target_df.iloc[target_row_idx])
 
     # 2. 处理 source 数据
-    # 找到 RID 所在的行
-    rid_start_row = source_df[source_df.iloc[:, get_column_index('A', 'routine_control')].astype(str) == rid].index[0]
-    
-    # 找到下一个 RID 的位置或文件末尾
-    next_rid_row = len(source_df)
-    for i in range(rid_start_row + 1, len(source_df)):
-        if pd.notna(source_df.iloc[i, get_column_index('A', 'routine_control')]) and \
-           str(source_df.iloc[i, get_column_index('A', 'routine_control')]).startswith('0x'):
-            next_rid_row = i
-            break
-
-    # 在这个范围内查找匹配的子服务行
-    matching_rows = []
-    for row in range(rid_start_row, next_rid_row):
-        g_value = str(source_df.iloc[row, get_column_index('G', 'routine_control')])
-        if subservice in g_value:
-            matching_rows.append(row)
+    # 从分段表中取出这个子服务匹配的行
+    _, _, segment_rows = rid_segments[str(rid)]
+    matching_rows = segment_rows[subservice]
 
     # # 3. 输出结果
     # if matching_rows:
@@ -338,9 +385,9 @@ def process_subservice(source_df, target_df, rid, subservice):
 
     # 4. 更新 target 数据
     if matching_rows:
-        update_target_with_source_data(subservice,source_df, target_df, target_row_idx, matching_rows, rid_start_row)
+        update_target_with_source_data(subservice, rid_source, target_df, target_row_idx, schemas)
     else:
-        update_target_without_source(subservice, target_df, target_row_idx, source_df, rid_start_row)
+        update_target_without_source(subservice, target_df, target_row_idx, rid_source, schemas)
 
     # # 打印更新后的 target 数据
     # print(f"\n更新后的 target 数据:")
@@ -348,29 +395,47 @@ def process_subservice(source_df, target_df, rid, subservice):
 
     return
 
-def main_process_31(source_df, target_df, rid):
-    """处理单个 Routine Control ID 的数据"""
+def main_process_31(rid_table, target_df, rid, rid_segments, target_blocks, schemas):
+    """处理单个 Routine Control ID 的数据
+    Args:
+        rid_table: build_rid_source_table 建立的 RID 属性表
+    """
     
     # print(f"\nBegin to process {rid}")
 
+    # 每个 RID 只取出一次起始行的属性，三个子服务共用
+    rid_source = rid_table.record(str(rid))
+
     # 处理每个子服务
-    for subservice in ['01', '02', '03']:
+    for subservice in SUBSERVICES:
         process_subservice(
-            source_df, 
+            rid_source, 
             target_df, 
             rid, 
-            subservice
+            subservice,
+            rid_segments,
+            target_blocks,
+            schemas
         )
     
     
-def process_31(source_file, target_file):
+def process_31(source_sheets, target_sheets, schemas=None):
     print(f"Begin to process 31 sheet")
-    source_df, target_df = pre_process_31(source_file, target_file)
+    # 没有传入时按表头编译工作表结构，表头与配置对不上时直接报错
+    schemas = schemas or compile_schemas({**source_sheets, **target_sheets})
+    source_df, target_df, rid_segments, rid_table = pre_process_31(source_sheets, target_sheets, schemas)
+    target_schema = schemas[TARGET_SHEET2]
+    target_blocks = build_target_rid_blocks(target_df, target_schema)
+    # 分组统计所有 RID 的 ResponseLength 和 ResponseNRC
+    responses, zero_bit_keys = aggregate_rid_responses(source_df, rid_segments, schemas[SOURCE_SHEET3])
+    check_rid_responses(zero_bit_keys)
     # 处理每个 Routine Control ID 的具体数据
+    rid_col_idx = target_schema['A']
     for idx in range(0, len(target_df), 3):  # 每三行处理一次
-        rid = target_df.iloc[idx, 0]  # A列 Routine Control ID
+        rid = target_df.iloc[idx, rid_col_idx]  # A列 Routine Control ID
         if pd.notna(rid):  # 确保不是空值
-            main_process_31(source_df, target_df, rid)
+            main_process_31(rid_table, target_df, rid, rid_segments, target_blocks, schemas)
+    merge_rid_responses(target_df, target_blocks, responses, target_schema)
     
     print(f"Finished process 31 sheet")
     return target_df
\ No newline at end of file
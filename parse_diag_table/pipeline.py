@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 流水线处理：串行、非交互处理多个文件时，读取、计算和写出在三个线程中同时进行
+# - 读取线程：提前读取后面几对文件的工作表 (解压、解析 xlsx 或从解析缓存加载)
+# - 主线程：按顺序对当前文件进行 22/2E 和 31 处理 (process_file_pair)
+# - 写出线程：保存前面文件的输出文件和清单
+# 读取和写出大部分时间在等待磁盘或网络 (等待时不占用 GIL)，数据目录在网络共享上时效果最明显
+# 两个队列的长度上限都是 config.PIPELINE_DEPTH，同时在内存中的文件对最多为 2 * PIPELINE_DEPTH + 3 对
+# 每对文件的计算顺序与串行处理相同，各文件的输出文件和清单互不依赖，输出与串行处理完全相同
+
+import time
+import queue
+import threading
+import traceback
+
+from parse_diag_table.config import PIPELINE_DEPTH
+from parse_diag_table.batch import read_pair_sheets, save_outputs, process_file_pair
+from parse_diag_table.profiling import StageTimer, timed
+
+# 队列结束标记
+_DONE = object()
+
+class Prefetched:
+    """读取线程读取的一对文件：工作表或读取时的异常，以及读取的耗时"""
+    __slots__ = ('sheets', 'error', 'started', 'elapsed', 'timings')
+
+    def __init__(self, sheets, error, started, elapsed, timings):
+        self.sheets = sheets
+        self.error = error
+        self.started = started
+        self.elapsed = elapsed
+        self.timings = timings
+
+    def load(self, file_path, sheet_names):
+        """作为 process_file_pair 的 loader：返回已读取的工作表，读取出错时在这里抛出原来的异常"""
+        if self.error is not None:
+            raise self.error
+        return self.sheets[file_path]
+
+def prefetch(task, use_cache, reader, stream):
+    """读取一个任务的 source 和 target 工作表，出错时不抛出异常，留到计算时处理"""
+    _, _, source_file, target_file, _ = task
+    sheets, error = {}, None
+    started = time.time()
+    start = time.perf_counter()
+    with StageTimer() as timer:
+        try:
+            sheets[source_file], sheets[target_file] = read_pair_sheets(
+                source_file, target_file, use_cache, reader, stream)
+        except Exception as e:
+            error = e
+    return Prefetched(sheets, error, started, time.perf_counter() - start, timer.to_dict())
+
+def merge_timings(result, timings, before=False):
+    """把另一个线程记录的阶段耗时和数量合并到结果中"""
+    stages = result['timings']['stages']
+    result['timings']['stages'] = timings['stages'] + stages if before else stages + timings['stages']
+    counts = result['timings']['counts']
+    for name, value in timings['counts'].items():
+        counts[name] = counts.get(name, 0) + value
+
+def put(items, item, stop=None, consumer=None):
+    """放入有长度上限的队列，stop 被设置或消费线程 consumer 已经退出时放弃并返回 False，不会一直等待"""
+    while not (stop is not None and stop.is_set()) and (consumer is None or consumer.is_alive()):
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def get(items, producer):
+    """从队列中取出一项，生产线程意外退出时抛出 RuntimeError，不会一直等待"""
+    while True:
+        try:
+            return items.get(timeout=0.1)
+        except queue.Empty:
+            if not producer.is_alive() and items.empty():
+                raise RuntimeError(f"{producer.name} 线程意外退出")
+
+def read_loop(tasks, loaded, stop, use_cache, reader, stream):
+    for task in tasks:
+        if not put(loaded, prefetch(task, use_cache, reader, stream), stop):
+            return
+
+def write_loop(pending, written, failures):
+    """写出线程：保存每个结果，把耗时和错误追加到 written，由主线程在结束时合并 (不在这里修改结果)
+    保存单个文件出错时记录在结果中并继续；其他异常使写出线程退出，异常追加到 failures，由主线程重新抛出
+    """
+    try:
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                return
+            result, sheets, manifest = item
+            error = None
+            start = time.perf_counter()
+            with StageTimer() as timer:
+                try:
+                    save_outputs(result['output_file'], sheets, manifest)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    print(f"错误: 保存 [{result['vehicle']}] {result['ecu']} 的处理结果时出错\n{traceback.format_exc()}")
+            written.append((result, time.perf_counter() - start, timer.to_dict(), error))
+    except BaseException as e:
+        failures.append(e)
+
+def run_pipelined(tasks, use_cache=True, incremental=True, reader=None, stream=None, depth=None):
+    """流水线处理所有任务 (单进程)，参数与 batch.run_tasks 相同
+    Args:
+        depth: 读取和写出队列的长度上限，None 时使用 config.PIPELINE_DEPTH
+    Returns:
+        list: 每个任务的处理结果，顺序与 tasks 一致；elapsed 为读取、计算和写出的耗时之和，
+              timings 中的 pipeline_wait_read/pipeline_wait_write 为主线程等待读取线程和写出线程的时间
+    Raises:
+        RuntimeError: 写出线程意外退出时停止处理并抛出，写出线程中的原始异常在 __cause__ 中
+    """
+    depth = max(1, depth or PIPELINE_DEPTH)
+    loaded = queue.Queue(maxsize=depth)
+    pending = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    written, failures = [], []
+    threads = [
+        threading.Thread(target=read_loop, args=(tasks, loaded, stop, use_cache, reader, stream),
+                         name='pipeline-read', daemon=True),
+        threading.Thread(target=write_loop, args=(pending, written, failures), name='pipeline-write', daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    def saver(result, sheets, manifest):
+        # 写出线程已经退出时不再等待队列，这个文件记为失败，主循环随后停止
+        with timed('pipeline_wait_write'):
+            if not put(pending, (result, sheets, manifest), consumer=threads[1]):
+                raise RuntimeError(f"{threads[1].name} 线程意外退出")
+
+    results = []
+    try:
+        for task in tasks:
+            wait_start = time.perf_counter()
+            prefetched = get(loaded, threads[0])
+            wait = time.perf_counter() - wait_start
+            result = process_file_pair(*task, incremental=incremental, loader=prefetched.load, saver=saver)
+            result['started'] = prefetched.started
+            result['elapsed'] += prefetched.elapsed
+            merge_timings(result, prefetched.timings, before=True)
+            result['timings']['stages'].insert(0, {'stage': 'pipeline_wait_read', 'seconds': round(wait, 6)})
+            results.append(result)
+            if not threads[1].is_alive():
+                break
+    finally:
+        # 中途退出 (如 Ctrl+C) 时停止读取，已经计算完的文件仍然写出
+        stop.set()
+        put(pending, _DONE, consumer=threads[1])
+        for thread in threads:
+            thread.join()
+    if failures:
+        raise RuntimeError(f"{threads[1].name} 线程意外退出") from failures[0]
+    for result, elapsed, timings, error in written:
+        result['elapsed'] += elapsed
+        merge_timings(result, timings)
+        if error is not None:
+            result['status'] = 'failed'
+            result['error'] = error
+    return results
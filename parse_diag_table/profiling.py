@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import os
+import io
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# 当前线程正在记录的 StageTimer，没有时 timed/record_count 不做任何事
+# 按线程分别记录：流水线处理 (pipeline.py) 中读取、计算和写出在不同线程中同时进行，各自记录到自己的 StageTimer
+_local = threading.local()
+
+def get_active_timer():
+    return getattr(_local, 'timer', None)
+
+class StageTimer:
+    """记录一次文件处理中各阶段的耗时和数量
+    用法:
+        with StageTimer() as timer:
+            ...                               # 其间调用的 timed()/record_count() 都记录到 timer
+        timer.to_dict()
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.counts = {}
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = get_active_timer()
+        _local.timer = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        _local.timer = self._previous
+        return False
+
+    def add_stage(self, name, seconds, detail=None):
+        stage = {'stage': name, 'seconds': round(seconds, 6)}
+        if detail is not None:
+            stage['detail'] = detail
+        self.stages.append(stage)
+
+    def to_dict(self):
+        return {'stages': list(self.stages), 'counts': dict(self.counts)}
+
+@contextmanager
+def timed(name, detail=None):
+    """记录一个阶段的耗时 (没有 StageTimer 时只执行代码块)
+    Args:
+        name: 阶段名称，例如 'read_sheet', 'pre_process_22_2E'
+        detail: 附加信息，例如工作表名称
+    """
+    timer = get_active_timer()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add_stage(name, time.perf_counter() - start, detail)
+
+def record_count(name, value):
+    """记录数量 (DID 数、RID 数、行数等)，同名数量累加"""
+    timer = get_active_timer()
+    if timer is not None:
+        timer.counts[name] = timer.counts.get(name, 0) + int(value)
+
+def sum_stages(timings_list):
+    """按阶段名称累加多个文件的耗时
+    Args:
+        timings_list: StageTimer.to_dict() 的列表
+    Returns:
+        dict: {阶段名称: 总耗时 (秒)}，按耗时从大到小排序
+    """
+    totals = {}
+    for timings in timings_list:
+        for stage in timings.get('stages', []):
+            totals[stage['stage']] = totals.get(stage['stage'], 0.0) + stage['seconds']
+    return {name: round(seconds, 6) for name, seconds in sorted(totals.items(), key=lambda x: -x[1])}
+
+def write_json_report(report_file, report):
+    """写出 JSON 格式的运行报告"""
+    os.makedirs(os.path.dirname(report_file) or '.', exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+@contextmanager
+def profile_to(profile_file):
+    """用 cProfile 记录代码块，结束时把 pstats 数据保存到 profile_file"""
+    # 只在 --profile 时导入，不影响其他命令的启动耗时
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(profile_file) or '.', exist_ok=True)
+        profiler.dump_stats(profile_file)
+
+def merge_profiles(profile_file, part_files, top=25):
+    """把主进程和各个子进程的 pstats 数据合并到 profile_file，返回按累计耗时排序的前 top 项文本"""
+    import pstats
+    part_files = [f for f in part_files if os.path.exists(f)]
+    if not part_files:
+        return ''
+    stream = io.StringIO()
+    stats = pstats.Stats(part_files[0], stream=stream)
+    for part_file in part_files[1:]:
+        stats.add(part_file)
+    stats.dump_stats(profile_file)
+    stats.sort_stats('cumulative').print_stats(top)
+    return stream.getvalue()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# Excel 读取后端：
+# - openpyxl:        pd.read_excel 默认的 openpyxl 引擎，最早的读取方式，作为其他后端的参照
+# - openpyxl-stream: openpyxl 只读模式逐行读取，不经过 pd.ExcelFile
+# - calamine:        python-calamine (Rust 实现)，需要另外安装，速度最快
+# 三个后端读取到的单元格按 pandas openpyxl 引擎的规则转换，再用同一个 TextParser 生成 DataFrame，
+# 因此列名、列类型和单元格的值都与 openpyxl 后端相同
+
+import os
+import datetime
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from parse_diag_table.config import EXCEL_READER, EXCEL_READERS
+from parse_diag_table.profiling import timed
+
+READER_AUTO = 'auto'
+
+class SheetNotFoundError(ValueError):
+    """工作表不存在：换用其他后端读取也一样，不再尝试"""
+
+def check_sheet_name(sheet_name, sheet_names):
+    if sheet_name not in sheet_names:
+        # 与 pd.read_excel 的错误信息一致
+        raise SheetNotFoundError(f"Worksheet named '{sheet_name}' not found")
+
+def rows_to_frame(rows):
+    """把逐行读取的单元格转换为 DataFrame，规则与 pandas 读取 Excel 时相同:
+    去掉每行末尾的空单元格和末尾的空行，按最长的行补齐，第一行作为表头，不把 'NA' 等转换为空值
+    """
+    data = []
+    last_row_with_data = -1
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = len(data)
+        data.append(row)
+    data = data[:last_row_with_data + 1]
+    if not data:
+        return pd.DataFrame()
+
+    max_width = max(len(row) for row in data)
+    data = [row + [""] * (max_width - len(row)) for row in data]
+    return TextParser(data, header=0, skip_blank_lines=False, na_filter=False).read()
+
+class OpenpyxlReader:
+    """pd.ExcelFile + openpyxl 引擎"""
+    name = 'openpyxl'
+
+    def __init__(self, file_path):
+        self.excel_file = pd.ExcelFile(file_path, engine='openpyxl')
+
+    def read_sheet(self, sheet_name):
+        check_sheet_name(sheet_name, self.excel_file.sheet_names)
+        return self.excel_file.parse(sheet_name, na_filter=False)
+
+    def close(self):
+        self.excel_file.close()
+
+class OpenpyxlStreamReader:
+    """openpyxl 只读模式：逐行解析工作表 XML，不创建完整的工作表对象"""
+    name = 'openpyxl-stream'
+
+    def __init__(self, file_path):
+        from openpyxl import load_workbook
+        self.workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+
+    def iter_rows(self, sheet_name):
+        from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+        check_sheet_name(sheet_name, self.workbook.sheetnames)
+        sheet = self.workbook[sheet_name]
+        # 文件中记录的工作表范围可能不准确，重新按实际的单元格计算
+        sheet.reset_dimensions()
+        for row in sheet.iter_rows():
+            values = []
+            for cell in row:
+                value = cell.value
+                if value is None:
+                    value = ""
+                elif cell.data_type == TYPE_ERROR:
+                    value = np.nan
+                elif cell.data_type == TYPE_NUMERIC and int(value) == value:
+                    value = int(value)
+                values.append(value)
+            yield values
+
+    def read_sheet(self, sheet_name):
+        return rows_to_frame(self.iter_rows(sheet_name))
+
+    def close(self):
+        self.workbook.close()
+
+class CalamineReader:
+    """python-calamine：没有安装时抛出 ImportError"""
+    name = 'calamine'
+
+    def __init__(self, file_path):
+        from python_calamine import load_workbook
+        self.workbook = load_workbook(file_path)
+
+    def iter_rows(self, sheet_name):
+        check_sheet_name(sheet_name, self.workbook.sheet_names)
+        sheet = self.workbook.get_sheet_by_name(sheet_name)
+        # skip_empty_area=False: 从 A1 开始读取，前面的空行、空列与 openpyxl 一样保留
+        for row in sheet.to_python(skip_empty_area=False):
+            values = []
+            for value in row:
+                # calamine 的数字都是 float，日期单元格可能是 date；转换为与 openpyxl 相同的类型
+                # 错误单元格 (#N/A 等) calamine 读取为空字符串，预处理后与 openpyxl 的 NaN 一样是空值
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                elif type(value) is datetime.date:
+                    value = datetime.datetime.combine(value, datetime.time())
+                values.append(value)
+            yield values
+
+    def read_sheet(self, sheet_name):
+        return rows_to_frame(self.iter_rows(sheet_name))
+
+    def close(self):
+        self.workbook.close()
+
+def is_blank_value(value):
+    """单元格预处理后是否为空值，规则与 normalize_df 相同 (字符串 'NA' 不是空值)"""
+    if isinstance(value, str):
+        return value.strip() == ''
+    return value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value))
+
+def infer_column(name, values):
+    """按 pandas 读取整个工作表时的规则推断一列的类型 (例如整列都是数字字符串时转换为整数)"""
+    data = [[name]] + [[value] for value in values]
+    return TextParser(data, header=0, skip_blank_lines=False, na_filter=False).read().iloc[:, 0]
+
+def iter_sheet_columns(rows, positions):
+    """流式处理的中间一步：逐行只保留 positions 中的列，整行预处理后为空的行直接跳过
+    Yields:
+        tuple: (保留的列的值, 跳过的空行是否会参与完整读取时的类型推断)
+    """
+    pending_blank = False
+    for row in rows:
+        if all(is_blank_value(value) for value in row):
+            # 完全没有内容的行只有在后面还有数据时才参与推断 (末尾的空行在读取时就被去掉)，
+            # 只有空格的行总是参与推断
+            if any(value != "" for value in row):
+                yield None, True
+            pending_blank = True
+            continue
+        yield [row[pos] if pos < len(row) else "" for pos in positions], pending_blank
+        pending_blank = False
+
+def header_names(header, width):
+    """与 pandas 相同的列名：空的表头为 'Unnamed: 列号'，重复的表头依次加上 .1, .2 ..."""
+    names = []
+    counts = {}
+    for pos in range(width):
+        name = header[pos] if pos < len(header) and header[pos] != "" else f"Unnamed: {pos}"
+        if name in counts:
+            base = name
+            while name in counts:
+                counts[base] += 1
+                name = f"{base}.{counts[base]}"
+        counts[name] = 0
+        names.append(name)
+    return names
+
+def read_sheet_columns(file_path, sheet_name, positions, normalize=None):
+    """流式读取一个工作表中的指定列，内存占用只与保留的列有关
+    逐行解析工作表 XML，每一行只保留 positions 中的列，整行为空的行不保存；
+    各列的类型按完整读取整个工作表时的规则推断，逐列预处理后立即释放原始值
+    Args:
+        file_path: Excel 文件路径
+        sheet_name: 工作表名称
+        positions: 需要保留的列的位置 (从 0 开始)，或由表头 (pandas 规则的列名列表) 计算这些位置的函数
+        normalize: 预处理函数，参数和返回值都是只有一列的 DataFrame，不删除空行 (例如 normalize_df)
+    Returns:
+        DataFrame: 列的位置与工作表相同 (到 positions 中最大的位置为止)，未保留的列全部为 pd.NA
+    """
+    reader = OpenpyxlStreamReader(file_path)
+    try:
+        rows = reader.iter_rows(sheet_name)
+        header = next(rows, [])
+        if callable(positions):
+            positions = positions(header_names(header, len(header)))
+        positions = sorted(set(positions))
+        columns = {pos: [] for pos in positions}
+        blocked = False
+        for values, blank_before in iter_sheet_columns(rows, positions):
+            blocked = blocked or blank_before
+            if values is None:
+                continue
+            for pos, value in zip(positions, values):
+                columns[pos].append(value)
+    finally:
+        reader.close()
+
+    nrows = len(columns[positions[0]]) if positions else 0
+    names = header_names(header, positions[-1] + 1 if positions else 0)
+    data = {}
+    for pos, name in enumerate(names):
+        if pos not in columns:
+            data[pos] = pd.Series(pd.NA, index=pd.RangeIndex(nrows), dtype=object)
+            continue
+        values = columns.pop(pos)
+        # 完整读取时跳过的空行也参与类型推断和预处理，用末尾的一个空行代替，处理完再去掉
+        if blocked:
+            values.append("")
+        series = infer_column(name, values)
+        del values
+        if normalize is not None:
+            series = normalize(series.to_frame()).iloc[:, 0]
+        data[pos] = series.iloc[:nrows]
+    df = pd.DataFrame(data, index=pd.RangeIndex(nrows))
+    df.columns = names
+    return df
+
+READER_CLASSES = {reader.name: reader for reader in (CalamineReader, OpenpyxlStreamReader, OpenpyxlReader)}
+
+def is_reader_available(name):
+    """后端依赖的库是否已安装"""
+    if name == 'calamine':
+        try:
+            import python_calamine  # noqa: F401
+        except ImportError:
+            return False
+    return name in READER_CLASSES
+
+def get_reader_chain(reader=None):
+    """按顺序需要尝试的后端
+    auto 时按 EXCEL_READERS 的顺序使用第一个可用的后端；指定后端时从该后端开始，失败时依次改用后面的后端
+    Args:
+        reader: 后端名称，None 时使用 config.EXCEL_READER
+    """
+    reader = reader or EXCEL_READER
+    if reader == READER_AUTO:
+        return list(EXCEL_READERS)
+    if reader not in EXCEL_READERS:
+        raise ValueError(f"未知的 Excel 读取后端: {reader} (可选: {READER_AUTO}, {', '.join(EXCEL_READERS)})")
+    return EXCEL_READERS[EXCEL_READERS.index(reader):]
+
+def open_workbook(file_path, chain):
+    """按顺序尝试 chain 中的后端打开 Excel 文件，返回第一个成功打开的后端
+    未安装的后端直接跳过；打开失败时打印警告并改用下一个后端，最后一个后端仍然失败时抛出异常
+    """
+    for i, name in enumerate(chain):
+        try:
+            return READER_CLASSES[name](file_path)
+        except ImportError:
+            continue
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            if i == len(chain) - 1:
+                raise
+            print(f"警告: 读取后端 {name} 无法打开 {os.path.basename(file_path)} ({e})，改用 {chain[i + 1]}")
+    raise ImportError(f"没有可用的 Excel 读取后端: {', '.join(chain)}")
+
+def read_raw_sheets(file_path, sheet_names, reader=None):
+    """用选定的后端读取多个工作表 (未预处理)
+    读取某个工作表失败时 (工作表不存在除外)，用下一个后端重新读取整个文件
+    Returns:
+        dict: {工作表名称: DataFrame}
+        str: 实际使用的后端名称
+    """
+    chain = get_reader_chain(reader)
+    while True:
+        with timed('open_workbook', os.path.basename(file_path)):
+            workbook = open_workbook(file_path, chain)
+        try:
+            sheets = {}
+            for name in sheet_names:
+                with timed('read_sheet', f"{name} [{workbook.name}]"):
+                    sheets[name] = workbook.read_sheet(name)
+            return sheets, workbook.name
+        except SheetNotFoundError:
+            raise
+        except Exception as e:
+            rest = chain[chain.index(workbook.name) + 1:]
+            if not rest:
+                raise
+            print(f"警告: 读取后端 {workbook.name} 读取 {os.path.basename(file_path)} 失败 ({e})，改用 {rest[0]}")
+            chain = rest
+        finally:
+            workbook.close()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# DID/RID 的紧凑表示：
+# - ValuePool: 取值表，每个不同的值只保存一次，Support/Session/Access_Level/yes/no 等重复出现的取值只保存一次，
+#   表中只保存 int32 编码；每次处理或加载一个 ECU 时使用 pool_scope() 中单独的取值表，
+#   表释放后取值表也随之释放，watch/serve 等长时间运行的进程中取值表不会一直增长
+# - RecordTable: 列式的记录表，每个字段只保存表内去重后的取值 (取值表中的编码) 和每行的序号 (uint8/uint16)，
+#   比较两张表的属性时直接比较整数
+# - DidRecord/RidRecord/RidSource: 使用 __slots__ 的记录类型，按键从 RecordTable 中取出一条记录时使用
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# 空值 (pd.NA、None、NaN、NaT) 的编码，解码为 pd.NA
+NA_CODE = 0
+
+def is_missing(value):
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+class ValuePool:
+    """取值表：值按 (类型, 值) 区分，1、1.0、True 和 '1' 的编码都不同，解码后与原来的值类型相同"""
+
+    def __init__(self):
+        self.values = [pd.NA]
+        self.codes = {}
+        self._array = None
+        self._mapped = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """一个值的编码，第一次出现时加入取值表"""
+        if is_missing(value):
+            return NA_CODE
+        key = (type(value), value)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[key] = code
+        return code
+
+    def encode(self, values):
+        """一组值的编码
+        Returns:
+            ndarray: int32 编码，长度与 values 相同
+        """
+        values = np.asarray(values, dtype=object)
+        if not len(values):
+            return np.empty(0, dtype=np.int32)
+        # 先按去重后的取值编码；factorize 按 == 比较，1、1.0 和 True 会归为一类，这些行再逐个按类型编码
+        codes, uniques = pd.factorize(values)
+        unique_codes = np.array([self.code(value) for value in uniques] + [NA_CODE], dtype=np.int32)
+        result = unique_codes[codes]
+        is_number = np.array([isinstance(value, (int, float, np.number)) for value in uniques] + [False], dtype=bool)
+        for row in np.flatnonzero(is_number[codes]):
+            result[row] = self.code(values[row])
+        return result
+
+    def value(self, code):
+        return self.values[code]
+
+    def decode(self, codes):
+        """编码还原为值 (object 数组)"""
+        if self._array is None or len(self._array) != len(self.values):
+            self._array = np.empty(len(self.values), dtype=object)
+            self._array[:] = self.values
+        return self._array[np.asarray(codes, dtype=np.int64)]
+
+    def map(self, codes, func):
+        """按 func 转换每个取值，返回转换后的值的编码 (形状与 codes 相同)
+        转换结果按取值缓存，同一个取值表中每个取值只调用一次 func
+        """
+        mapped = self._mapped.get(func, np.empty(0, dtype=np.int32))
+        if len(mapped) < len(self.values):
+            start = len(mapped)
+            # func 的返回值可能是新的取值，取值表在转换过程中会变长，只转换调用前已有的取值
+            extra = [self.code(func(value)) for value in self.values[start:len(self.values)]]
+            mapped = np.concatenate([mapped, np.array(extra, dtype=np.int32)])
+            self._mapped[func] = mapped
+        return mapped[np.asarray(codes, dtype=np.int64)]
+
+# 没有 pool_scope 时使用的取值表 (进程内共用)
+POOL = ValuePool()
+# 当前线程 pool_scope 中的取值表
+_local = threading.local()
+
+def get_pool():
+    """当前线程使用的取值表：pool_scope 中为该范围的取值表，否则为进程共用的 POOL"""
+    pool = getattr(_local, 'pool', None)
+    return POOL if pool is None else pool
+
+@contextmanager
+def pool_scope(pool=None):
+    """在代码块中使用单独的取值表 (pool 为 None 时新建一个)，结束后恢复原来的取值表
+    代码块中建立的 RecordTable 保留对取值表的引用，在代码块外仍可以解码；只有同一个取值表中的编码可以直接比较
+    """
+    previous = getattr(_local, 'pool', None)
+    _local.pool = ValuePool() if pool is None else pool
+    try:
+        yield _local.pool
+    finally:
+        _local.pool = previous
+
+class Record:
+    """__slots__ 记录类型的基类，字段和每个字段对应的列字母由子类定义 (__slots__ 和 LETTERS 一一对应)
+    未设置的字段不占用内存，也不包含在 items() 中
+    """
+    __slots__ = ()
+    LETTERS = ()
+
+    def __init__(self, *values, **fields):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def items(self):
+        """已设置的字段 (列字母, 值)"""
+        for name, letter in zip(self.__slots__, self.LETTERS):
+            if hasattr(self, name):
+                yield letter, getattr(self, name)
+
+    def get(self, letter, default=None):
+        return dict(self.items()).get(letter, default)
+
+    def to_dict(self):
+        """已设置的字段 {字段名: 值}"""
+        return {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and list(self.items()) == list(other.items())
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if hasattr(self, name))
+        return f"{type(self).__name__}({fields})"
+
+class DidRecord(Record):
+    """22_2E_DID_Library 中一个 DID 由 source 计算的 B~H 列"""
+    __slots__ = ('description', 'format', 'length', 'app', 'boot', 'security_2e', 'security_22')
+    LETTERS = ('B', 'C', 'D', 'E', 'F', 'G', 'H')
+
+class RidRecord(Record):
+    """31_RID_Library 中一个子服务所在行的 B~K 列"""
+    __slots__ = ('description', 'app', 'boot', 'subservice', 'lock_level', 'session',
+                 'request_data', 'response_length', 'response_data', 'response_nrc')
+    LETTERS = ('B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K')
+
+class RidSource(Record):
+    """3.3RoutineControl 0x31 中一个 RID 起始行的 Description、Access_Level 和 Session"""
+    __slots__ = ('description', 'lock_level', 'session')
+    LETTERS = ('B', 'D', 'E')
+
+def compact_codes(codes):
+    """一列编码压缩为 (每行的序号, 去重后的编码)，序号按取值个数使用 uint8/uint16/int32"""
+    uniques, inverse = np.unique(np.asarray(codes, dtype=np.int32), return_inverse=True)
+    if len(uniques) <= 1 << 8:
+        dtype = np.uint8
+    elif len(uniques) <= 1 << 16:
+        dtype = np.uint16
+    else:
+        dtype = np.int32
+    return inverse.ravel().astype(dtype), uniques
+
+class RecordTable:
+    """列式的记录表：每条记录一行，每个字段一列
+    每列保存表内去重后的取值编码 (见 ValuePool) 和每行取值的序号，Support/Session 等取值很少的列每行只占一个字节
+    Attributes:
+        keys: 每一行的键 (DID、(RID, subservice) 等)
+        fields: 字段名
+        columns: 每个字段一个 (每行的序号, 去重后的编码)
+        record_type: record() 返回的记录类型，字段顺序与 fields 相同
+    """
+    __slots__ = ('keys', 'fields', 'columns', 'record_type', 'pool', '_positions')
+
+    def __init__(self, keys, fields, codes, record_type=None, pool=None):
+        """codes: 编码矩阵，形状为 (行数, 字段数)"""
+        self.keys = list(keys)
+        self.fields = list(fields)
+        codes = np.asarray(codes, dtype=np.int32).reshape(len(self.keys), len(self.fields))
+        self.columns = [compact_codes(codes[:, i]) for i in range(len(self.fields))]
+        self.record_type = record_type
+        self.pool = pool if pool is not None else get_pool()
+        self._positions = None
+
+    @classmethod
+    def from_columns(cls, keys, columns, record_type=None, pool=None):
+        """由 {字段: 一列值} 建立，各列长度与 keys 相同"""
+        pool = pool if pool is not None else get_pool()
+        keys = list(keys)
+        codes = np.empty((len(keys), len(columns)), dtype=np.int32)
+        for i, values in enumerate(columns.values()):
+            codes[:, i] = pool.encode(values)
+        return cls(keys, columns, codes, record_type, pool)
+
+    @classmethod
+    def from_rows(cls, keys, fields, rows, record_type=None, pool=None):
+        """由逐行的值建立，每行的值与 fields 一一对应"""
+        fields = list(fields)
+        columns = list(zip(*rows)) if rows else [()] * len(fields)
+        return cls.from_columns(keys, dict(zip(fields, columns)), record_type, pool)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    @property
+    def positions(self):
+        """{键: 行号}，同一个键出现多次时取第一行"""
+        if self._positions is None:
+            positions = {}
+            for row, key in enumerate(self.keys):
+                positions.setdefault(key, row)
+            self._positions = positions
+        return self._positions
+
+    def field_codes(self, field, rows=None):
+        """一个字段的编码 (int32)，rows 为行号列表时只取这些行"""
+        local, uniques = self.columns[self.fields.index(field)]
+        return uniques[local if rows is None else local[rows]]
+
+    def codes(self, rows=None):
+        """编码矩阵，形状为 (行数, 字段数)"""
+        if not self.fields:
+            return np.empty((len(self.keys) if rows is None else len(rows), 0), dtype=np.int32)
+        return np.column_stack([self.field_codes(field, rows) for field in self.fields])
+
+    def column(self, field):
+        """一个字段解码后的值 (object 数组)"""
+        return self.pool.decode(self.field_codes(field))
+
+    def take(self, keys):
+        """按键取出多行组成新表，顺序与 keys 相同；键不存在时抛出 KeyError"""
+        keys = list(keys)
+        rows = [self.positions[key] for key in keys]
+        return RecordTable(keys, self.fields, self.codes(rows), self.record_type, self.pool)
+
+    def record(self, key):
+        """按键取出一条记录 (record_type 的实例)；键不存在时抛出 KeyError"""
+        row = self.positions[key]
+        return self.record_type(*(self.pool.value(uniques[local[row]]) for local, uniques in self.columns))
+
+    def nbytes(self):
+        """表本身占用的内存 (序号、去重后的编码和键，不包含共享的取值)"""
+        return sum(local.nbytes + uniques.nbytes for local, uniques in self.columns) + 8 * len(self.keys)
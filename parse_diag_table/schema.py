@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 工作表结构：每个工作表读取后按表头编译一次，得到每个列字母实际所在的位置
+# 处理模块直接用 schema['A'] 这样的整数位置访问列，不再在循环中按 sheet_type 查找；
+# 供应商插入或删除列时按表头找到列的实际位置，不会读取错位的列
+#
+# 每一列按以下规则确定位置:
+# - 表头中能找到该列的名称：使用找到的位置 (位置与配置不同时打印警告)
+# - 找不到，且配置中的位置上是空表头 (例如多行表头中合并的单元格)：无法检查，使用配置中的位置
+# - 找不到，且配置中的位置上是其他表头 (写法不同或多行表头)：与以前一样使用配置中的位置并打印警告；
+#   config.STRICT_COLUMN_HEADERS 为 True 时报错
+# - 工作表没有这么多列、同一个表头出现多次或多个列对应到同一列：报错
+
+import re
+
+from parse_diag_table.config import COLUMN_MAPS, COLUMN_HEADERS, SHEET_TYPES, STRICT_COLUMN_HEADERS
+
+class ColumnDriftError(ValueError):
+    """工作表的表头与配置的列映射对不上"""
+
+def normalize_header(label):
+    """比较表头时不区分大小写、忽略所有空白字符 (包括单元格内的换行)"""
+    return re.sub(r"\s+", "", str(label)).casefold()
+
+def is_blank_header(label):
+    """空表头：pandas 读取时命名为 'Unnamed: 列号'"""
+    return label is None or normalize_header(label) == '' or str(label).startswith('Unnamed:')
+
+class SheetSchema:
+    """编译后的工作表结构
+    Attributes:
+        sheet_type: 表格类型 (见 config.COLUMN_MAPS)
+        positions: {列字母: 实际的列位置}
+        labels: {列字母: 实际的列名}
+        moved: {列字母: (配置中的位置, 实际的位置)}，只包含位置与配置不同的列
+        unchecked: {列字母: 配置中的位置上的表头}，表头中找不到、按配置中的位置使用的列
+    """
+
+    def __init__(self, sheet_type, positions, labels, moved=None, unchecked=None):
+        self.sheet_type = sheet_type
+        self.positions = positions
+        self.labels = labels
+        self.moved = moved or {}
+        self.unchecked = unchecked or {}
+        self.mapped = frozenset(positions.values())
+
+    def __getitem__(self, letter):
+        return self.positions[letter]
+
+    def label(self, letter):
+        return self.labels[letter]
+
+    def indices(self, letters):
+        """多个列字母的位置，顺序与 letters 相同"""
+        return [self.positions[letter] for letter in letters]
+
+    def extra_positions(self, width):
+        """列映射以外的列的位置 (例如模板中额外添加的列)"""
+        return [pos for pos in range(width) if pos not in self.mapped]
+
+def compile_schema(columns, sheet_type, sheet_name=None, warn=True, strict=None):
+    """按表头编译一个工作表的结构
+    Args:
+        columns: 工作表的列名 (DataFrame.columns 或表头列表)
+        sheet_type: 表格类型
+        sheet_name: 工作表名称，只用于错误信息
+        warn: 列位置与配置不同、或按配置中的位置使用找不到表头的列时是否打印警告
+        strict: 找不到表头且配置中的位置上是其他表头时是否报错，None 时使用 config.STRICT_COLUMN_HEADERS
+    Returns:
+        SheetSchema
+    Raises:
+        ColumnDriftError: 表头与配置对不上
+    """
+    strict = STRICT_COLUMN_HEADERS if strict is None else strict
+    labels = list(columns)
+    sheet_name = sheet_name or sheet_type
+    found = {}
+    for pos, label in enumerate(labels):
+        if not is_blank_header(label):
+            found.setdefault(normalize_header(label), []).append(pos)
+
+    positions, moved, unchecked = {}, {}, {}
+    for letter, expected_pos in COLUMN_MAPS[sheet_type].items():
+        names = COLUMN_HEADERS[sheet_type][letter]
+        names = (names,) if isinstance(names, str) else tuple(names)
+        matches = sorted({pos for name in names for pos in found.get(normalize_header(name), [])})
+        if expected_pos in matches:
+            pos = expected_pos
+        elif len(matches) == 1:
+            pos = matches[0]
+        elif matches:
+            raise ColumnDriftError(
+                f"工作表 [{sheet_name}] 中表头 '{names[0]}' (列 {letter}) 出现了多次，无法确定列的位置")
+        elif expected_pos >= len(labels):
+            raise ColumnDriftError(
+                f"工作表 [{sheet_name}] 只有 {len(labels)} 列，缺少列 {letter} '{names[0]}'")
+        elif is_blank_header(labels[expected_pos]):
+            pos = expected_pos
+        elif strict:
+            raise ColumnDriftError(
+                f"工作表 [{sheet_name}] 列 {letter} 的表头应为 '{names[0]}'，实际为 '{labels[expected_pos]}'，"
+                f"表头中也找不到 '{names[0]}'，请检查是否插入或删除了列")
+        else:
+            pos = expected_pos
+            unchecked[letter] = labels[expected_pos]
+        positions[letter] = pos
+        if pos != expected_pos:
+            moved[letter] = (expected_pos, pos)
+
+    duplicated = {}
+    for letter, pos in positions.items():
+        duplicated.setdefault(pos, []).append(letter)
+    for pos, letters in duplicated.items():
+        if len(letters) > 1:
+            raise ColumnDriftError(
+                f"工作表 [{sheet_name}] 列 {', '.join(letters)} 对应到了同一列 '{labels[pos]}'，请检查表头")
+
+    if moved and warn:
+        details = ', '.join(f"{letter}: 第 {old + 1} 列 -> 第 {new + 1} 列" for letter, (old, new) in list(moved.items())[:3])
+        more = f" 等 {len(moved)} 列" if len(moved) > 3 else ""
+        print(f"警告: 工作表 [{sheet_name}] 的列位置与配置不同，按表头使用实际位置 ({details}{more})")
+    if unchecked and warn:
+        details = ', '.join(f"{letter}: '{label}'" for letter, label in list(unchecked.items())[:3])
+        more = f" 等 {len(unchecked)} 列" if len(unchecked) > 3 else ""
+        print(f"警告: 工作表 [{sheet_name}] 中找不到配置的表头，按配置中的位置使用 ({details}{more})，"
+              f"请确认列没有错位，或把实际的表头加入 config.py 的表头名称")
+    return SheetSchema(sheet_type, positions, {letter: labels[pos] for letter, pos in positions.items()},
+                       moved, unchecked)
+
+def compile_schemas(sheets):
+    """编译已读取的工作表中所有已知工作表 (config.SHEET_TYPES) 的结构
+    Args:
+        sheets: {工作表名称: DataFrame}，可以同时包含 source 和 target 的工作表
+    Returns:
+        dict: {工作表名称: SheetSchema}
+    """
+    return {name: compile_schema(df.columns, SHEET_TYPES[name], name)
+            for name, df in sheets.items() if name in SHEET_TYPES}
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 查询服务：启动时读取所有 ECU 的输出文件 (OUTPUT/*_更新后.xlsx) 中的 22_2E_DID_Library 和 31_RID_Library，
+# 按 (ECU, DID) 和 (ECU, RID, subservice) 建立索引并保留在内存中 (RecordTable)，HIL 测试不再每次解析 Excel 文件
+# - 只监听本机 (默认 127.0.0.1:8765，也可以使用 Unix socket)，接口见 README 的 Query Service 一节
+# - 后台线程定期检查输出文件，重新生成后 (保持 WATCH_DEBOUNCE 秒不变) 只重新加载该 ECU，加载完成前继续使用旧的数据
+# 用法: python main.py serve [--vehicle all] [--port 8765] [--socket /tmp/diag.sock]
+
+import os
+import json
+import time
+import threading
+import socketserver
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from parse_diag_table.config import (
+    TARGET_SHEETS, OUTPUT_FILE_SUFFIX, WATCH_DEBOUNCE, SERVICE_HOST, SERVICE_PORT, SERVICE_RELOAD_INTERVAL,
+    SUBSERVICES, get_data_dirs,
+)
+from parse_diag_table.batch import get_excel_files, get_ecu_name, get_vehicle_prefixes
+from parse_diag_table.schema import compile_schemas
+from parse_diag_table.records import RecordTable, pool_scope
+from parse_diag_table.incremental import to_json_value
+from parse_diag_table.diff_report import target_did_table, target_rid_table
+from parse_diag_table.watch import file_signature
+from parse_diag_table.export import normalize_id, normalize_subservice
+
+class NotFoundError(LookupError):
+    """查询的 ECU、DID 或 RID 不存在"""
+
+def json_default(value):
+    """json.dumps 无法直接保存的值：numpy 标量和 pd.NA 按清单的规则转换，其余 (例如日期) 转换为字符串"""
+    try:
+        return to_json_value(value)
+    except TypeError:
+        return str(value)
+
+def rekey(table, keys):
+    """换用统一格式的键，键的个数与原表相同"""
+    table = RecordTable(keys, table.fields, table.codes(), table.record_type, table.pool)
+    # 查询线程中不再建立索引
+    table.positions
+    return table
+
+class EcuLibrary:
+    """一个 ECU 的输出文件中的 DID/RID 属性"""
+    __slots__ = ('vehicle_type', 'ecu', 'output_file', 'signature', 'loaded_at', 'dids', 'rids')
+
+    def __init__(self, vehicle_type, ecu, output_file, signature, dids, rids):
+        self.vehicle_type = vehicle_type
+        self.ecu = ecu
+        self.output_file = output_file
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.dids = dids
+        self.rids = rids
+
+    def did(self, did):
+        key = normalize_id(did)
+        if key not in self.dids:
+            raise NotFoundError(f"{self.ecu} 中没有 DID {did}")
+        return {'ecu': self.ecu, 'did': key, **self.dids.record(key).to_dict()}
+
+    def rid(self, rid, subservice=None):
+        """subservice 为 None 时返回三个子服务"""
+        key = normalize_id(rid)
+        subservices = SUBSERVICES if subservice is None else [normalize_subservice(subservice)]
+        records = [self.rids.record((key, s)).to_dict() for s in subservices if (key, s) in self.rids]
+        if not records:
+            raise NotFoundError(f"{self.ecu} 中没有 RID {rid}" + ("" if subservice is None else f" 子服务 {subservice}"))
+        if subservice is not None:
+            return {'ecu': self.ecu, 'rid': key, **records[0]}
+        return {'ecu': self.ecu, 'rid': key, 'subservices': records}
+
+    def summary(self):
+        return {'vehicle': self.vehicle_type, 'ecu': self.ecu, 'output_file': self.output_file,
+                'dids': len(self.dids), 'rids': len({rid for rid, _ in self.rids.keys}),
+                'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at))}
+
+def load_library(vehicle_type, output_file, use_cache=True, reader=None):
+    """读取一个输出文件
+    Returns:
+        EcuLibrary: 读取过程中文件被修改时返回 None (下一次检查时重新读取)
+    """
+    signature = file_signature(output_file)
+    if use_cache:
+        from parse_diag_table.cache import read_excel_sheets_cached
+        sheets = read_excel_sheets_cached(output_file, TARGET_SHEETS, reader=reader)
+    else:
+        from parse_diag_table.utils import read_excel_sheets
+        sheets = read_excel_sheets(output_file, TARGET_SHEETS, reader)
+    if file_signature(output_file) != signature:
+        return None
+    schemas = compile_schemas(sheets)
+    # 每个 ECU 使用单独的取值表，保存在表中；重新加载后旧的表和取值表一起释放，长时间运行时内存不会一直增长
+    with pool_scope():
+        dids = target_did_table(sheets, schemas)
+        rids = target_rid_table(sheets, schemas)
+        dids = rekey(dids, [normalize_id(did) for did in dids.keys])
+        rids = rekey(rids, [(normalize_id(rid), subservice) for rid, subservice in rids.keys])
+    ecu = get_ecu_name(output_file, get_vehicle_prefixes(vehicle_type))
+    return EcuLibrary(vehicle_type, ecu, output_file, signature, dids, rids)
+
+def scan_outputs(vehicle_types):
+    """扫描所有车辆的 OUTPUT 目录
+    Returns:
+        dict: {输出文件路径: (车辆类型, 签名)}
+    """
+    files = {}
+    for vehicle_type in vehicle_types:
+        _, _, output_dir = get_data_dirs(vehicle_type)
+        try:
+            file_paths = get_excel_files(output_dir)
+        except OSError:
+            continue
+        for file_path in file_paths:
+            if not file_path.endswith(f"{OUTPUT_FILE_SUFFIX}.xlsx"):
+                continue
+            signature = file_signature(file_path)
+            if signature is not None:
+                files[file_path] = (vehicle_type, signature)
+    return files
+
+class LibraryStore:
+    """所有 ECU 的 DID/RID 属性
+    查询只读取 self.ecus，重新加载时整体替换，查询线程不需要加锁
+    """
+
+    def __init__(self, vehicle_types, debounce=None, use_cache=True, reader=None):
+        self.vehicle_types = vehicle_types
+        self.debounce = WATCH_DEBOUNCE if debounce is None else debounce
+        self.use_cache = use_cache
+        self.reader = reader
+        # {输出文件路径: EcuLibrary}
+        self.libraries = {}
+        # {ECU 名称: [EcuLibrary]}，多个车辆有同名 ECU 时查询需要指定车辆
+        self.ecus = {}
+        self.files = {}
+        # 有变化、还没有重新加载的文件 {输出文件路径: (车辆类型, 最后一次变化的时间)}
+        self.pending = {}
+        self.reloads = 0
+
+    def load(self, file_path, vehicle_type):
+        """读取一个输出文件，失败时保留原来的数据
+        读取过程中文件被修改时稍后重试；读取失败的文件在下一次修改时再读取
+        Returns:
+            bool: 是否已加载
+        """
+        try:
+            library = load_library(vehicle_type, file_path, self.use_cache, self.reader)
+        except Exception as e:
+            stamp = time.strftime('%H:%M:%S')
+            print(f"[{stamp}] [{vehicle_type}] {os.path.basename(file_path)} 读取失败: {type(e).__name__}: {e}",
+                  flush=True)
+            return False
+        if library is None:
+            self.pending[file_path] = (vehicle_type, time.monotonic())
+            return False
+        self.libraries[file_path] = library
+        return True
+
+    def publish(self):
+        ecus = {}
+        for library in self.libraries.values():
+            ecus.setdefault(library.ecu, []).append(library)
+        self.ecus = ecus
+
+    def start(self):
+        """读取所有输出文件"""
+        self.files = scan_outputs(self.vehicle_types)
+        for file_path, (vehicle_type, _) in self.files.items():
+            self.load(file_path, vehicle_type)
+        self.publish()
+
+    def refresh(self, now=None):
+        """检查一次输出文件，重新加载已经稳定的修改
+        Returns:
+            int: 本次重新加载或移除的文件数
+        """
+        now = time.monotonic() if now is None else now
+        current = scan_outputs(self.vehicle_types)
+        for file_path in set(current) | set(self.files):
+            if current.get(file_path) != self.files.get(file_path):
+                vehicle_type = (current.get(file_path) or self.files.get(file_path))[0]
+                self.pending[file_path] = (vehicle_type, now)
+        self.files = current
+
+        count = 0
+        for file_path, (vehicle_type, changed_at) in list(self.pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            del self.pending[file_path]
+            stamp = time.strftime('%H:%M:%S')
+            if file_path not in current:
+                if self.libraries.pop(file_path, None) is not None:
+                    print(f"[{stamp}] [{vehicle_type}] {os.path.basename(file_path)} 已删除", flush=True)
+                    count += 1
+                continue
+            if self.load(file_path, vehicle_type):
+                library = self.libraries[file_path]
+                print(f"[{stamp}] [{vehicle_type}] {library.ecu} 已重新加载: "
+                      f"{len(library.dids)} 个 DID, {library.summary()['rids']} 个 RID", flush=True)
+                count += 1
+        if count:
+            self.reloads += count
+            self.publish()
+        return count
+
+    def library(self, ecu, vehicle=None):
+        """按 ECU 名称 (不区分大小写) 查找；多个车辆有同名 ECU 时需要指定 vehicle"""
+        if not ecu:
+            raise ValueError("缺少参数 ecu")
+        libraries = self.ecus.get(str(ecu).strip().upper(), [])
+        if vehicle:
+            libraries = [library for library in libraries if library.vehicle_type == vehicle]
+        if not libraries:
+            raise NotFoundError(f"没有 ECU {ecu}" + (f" (车辆 {vehicle})" if vehicle else ""))
+        if len(libraries) > 1:
+            vehicles = ', '.join(library.vehicle_type for library in libraries)
+            raise ValueError(f"ECU {ecu} 在多个车辆中存在 ({vehicles})，请指定 vehicle")
+        return libraries[0]
+
+    def query(self, request):
+        """一次查询：{"ecu", "did"} 或 {"ecu", "rid", "subservice" (可选)}，可以带 "vehicle" """
+        library = self.library(request.get('ecu'), request.get('vehicle'))
+        if request.get('did') is not None:
+            return library.did(request['did'])
+        if request.get('rid') is not None:
+            return library.rid(request['rid'], request.get('subservice'))
+        raise ValueError("缺少参数 did 或 rid")
+
+    def batch(self, requests):
+        """批量查询，每一项的结果为记录或 {"error": 错误信息}，顺序与 requests 相同"""
+        results = []
+        for request in requests:
+            try:
+                if not isinstance(request, dict):
+                    raise ValueError(f"查询应为对象: {request!r}")
+                results.append(self.query(request))
+            except (LookupError, ValueError) as e:
+                results.append({'error': str(e.args[0]) if e.args else str(e)})
+        return results
+
+    def summary(self):
+        return [library.summary() for library in sorted(self.libraries.values(),
+                                                        key=lambda library: (library.vehicle_type, library.ecu))]
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """HTTP 接口 (HTTP/1.1，保持连接，请求和响应都是 JSON):
+    GET  /ecus                                      已加载的 ECU
+    GET  /did?ecu=CDC&did=F190[&vehicle=...]        一个 DID
+    GET  /rid?ecu=CDC&rid=0x0200[&subservice=01]    一个 RID 的一个或三个子服务
+    POST /batch  {"queries": [{"ecu": ..., "did": ...}, {"ecu": ..., "rid": ..., "subservice": ...}]}
+    """
+    protocol_version = 'HTTP/1.1'
+    store = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_query(self, func):
+        try:
+            self.send_json(200, func())
+        except NotFoundError as e:
+            self.send_json(404, {'error': e.args[0]})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == '/ecus':
+            self.handle_query(lambda: {'ecus': self.store.summary()})
+        elif url.path == '/did':
+            self.handle_query(lambda: self.store.query({'ecu': params.get('ecu'), 'vehicle': params.get('vehicle'),
+                                                        'did': params.get('did') or ''}))
+        elif url.path == '/rid':
+            self.handle_query(lambda: self.store.query({'ecu': params.get('ecu'), 'vehicle': params.get('vehicle'),
+                                                        'rid': params.get('rid') or '',
+                                                        'subservice': params.get('subservice')}))
+        else:
+            self.send_json(404, {'error': f"未知的路径: {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if url.path != '/batch':
+            self.send_json(404, {'error': f"未知的路径: {url.path}"})
+            return
+        try:
+            payload = json.loads(body or b'{}')
+            queries = payload.get('queries') if isinstance(payload, dict) else None
+            if not isinstance(queries, list):
+                raise ValueError('请求体应为 {"queries": [...]}')
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(200, {'results': self.store.batch(queries)})
+
+    def log_message(self, format, *args):
+        # 每个请求打印一行会明显拖慢查询，只保留重新加载和错误信息
+        pass
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def create_server(store, host=None, port=None, socket_path=None):
+    """创建 HTTP 服务；指定 socket_path 时监听 Unix socket，否则监听 host:port"""
+    # 响应头和响应体分两次写入，TCP 连接需要关闭 Nagle 算法，否则保持连接时每次查询都要等待约 40 ms 的延迟确认
+    handler = type('BoundQueryHandler', (QueryHandler,), {'store': store, 'disable_nagle_algorithm': not socket_path})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host or SERVICE_HOST, SERVICE_PORT if port is None else port), handler)
+
+def serve(vehicle_types, host=None, port=None, socket_path=None, interval=None, debounce=None, use_cache=True,
+          reader=None):
+    """加载输出文件并提供查询服务，一直运行到 Ctrl+C
+    Args:
+        vehicle_types: 车辆类型列表
+        host: 监听地址，None 时使用 config.SERVICE_HOST
+        port: 端口，None 时使用 config.SERVICE_PORT
+        socket_path: Unix socket 路径，指定时不监听端口
+        interval: 检查输出文件的间隔 (秒)，None 时使用 config.SERVICE_RELOAD_INTERVAL
+        debounce: 输出文件最后一次变化后需要保持不变的时间 (秒)，None 时使用 config.WATCH_DEBOUNCE
+        use_cache: 读取输出文件时是否使用解析缓存
+        reader: Excel 读取后端，None 时使用 config.EXCEL_READER
+    """
+    interval = SERVICE_RELOAD_INTERVAL if interval is None else interval
+    store = LibraryStore(vehicle_types, debounce, use_cache, reader)
+    started = time.perf_counter()
+    store.start()
+    print(f"已加载 {len(store.libraries)} 个 ECU ({time.perf_counter() - started:.2f}s)")
+    for item in store.summary():
+        print(f"  [{item['vehicle']}] {item['ecu']}: {item['dids']} 个 DID, {item['rids']} 个 RID")
+
+    server = create_server(store, host, port, socket_path)
+    stop = threading.Event()
+
+    def reload_loop():
+        while not stop.wait(interval):
+            try:
+                store.refresh()
+            except Exception as e:
+                print(f"检查输出文件失败: {type(e).__name__}: {e}", flush=True)
+
+    reloader = threading.Thread(target=reload_loop, name='reload', daemon=True)
+    reloader.start()
+    address = socket_path or 'http://%s:%d' % server.server_address[:2]
+    print(f"查询服务已启动: {address} (每 {interval}s 检查一次 OUTPUT 目录)，按 Ctrl+C 退出", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+    print(f"\n查询服务已停止: 共重新加载 {store.reloads} 次")
+    return 0
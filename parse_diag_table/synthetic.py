@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# 生成与真实诊断表结构相同的合成数据 (CURR_REL 标准诊断表 + LAST_REL 模板诊断表)，用于性能测试和复现问题
+# 用法: python main.py generate <输出目录> [--dids 1000] [--rids 100] [--churn 0.1] [--ecus CDC,ADCU] [--seed 0]
+#       [--headers canonical|variant|drift|multirow]
+
+import os
+import random
+import argparse
+import pandas as pd
+from parse_diag_table.utils import save_excel_workbook
+from parse_diag_table.config import (
+    SOURCE_SHEET1, SOURCE_SHEET2, SOURCE_SHEET3,
+    TARGET_SHEET1, TARGET_SHEET2,
+    COLUMN_HEADERS, get_column_index,
+)
+
+# 各工作表的列数 (表头名称使用 config.py 中的 COLUMN_HEADERS，没有配置的列为 Column<序号>)
+SHEET_WIDTHS = {
+    'basic_did': 28,
+    'rdbi_wdbi': 26,
+    'routine_control': 13,
+    'did_library': 8,
+    'rid_library': 11,
+}
+
+# 单元格取值范围，包括真实诊断表中常见的空值、'NA' 和多余空格
+ACCESS_LEVELS = ['Locked', 'L1', 'L2', 'L3', 'L1/L2', 'Locked/L1', 'L2/L3', None, 'NA']
+FORMATS = ['ASCII', 'BCD', 'Bytefield', 'HEX', 'Unsigned', None]
+SESSIONS = ['01/03', '03', '02']
+SUPPORT = ['yes', 'no', 'no']
+
+# CURR_REL 标准诊断表的表头形式，用于测试按表头确定列位置 (schema.py) 的各个分支：
+# - canonical: 与 config.py 中的表头名称完全相同
+# - variant: 大小写、空格和单元格内换行与配置不同 (按表头仍能找到)
+# - drift: 在 B 列后插入一列 Remark，后面的列都向右移动一列 (按表头找到新的位置)
+# - multirow: 两行表头，'Read.APP.Support' 这样的表头拆为合并的分组行 'Read.APP' 和第二行 'Support'，
+#   第一行中的分组名称找不到、合并的单元格为空，按配置中的位置读取；第二行读取为第一行数据
+# LAST_REL 模板诊断表由本工具写出，总是使用 canonical
+HEADER_STYLES = ['canonical', 'variant', 'drift', 'multirow']
+# drift 时插入列的位置
+DRIFT_POSITION = 2
+
+def vary_header(name, index):
+    """只改变大小写和空白字符的表头写法 (normalize_header 后与原来相同)"""
+    if index % 3 == 0:
+        return name.upper()
+    if index % 3 == 1:
+        return name.replace('(', '\n(').replace('.', '. ')
+    return f" {name.lower()} "
+
+def split_header(name):
+    """多行表头中一列的 (分组名称, 第二行名称)：按最后一个 '.' 或第一个 '(' 拆分，不能拆分时第二行为空"""
+    if '.' in name:
+        group, sub = name.rsplit('.', 1)
+        return group, sub
+    if '(' in name:
+        index = name.index('(')
+        return name[:index].rstrip(), name[index:]
+    return name, ''
+
+class SheetBuilder:
+    """按列字母填写一行，生成指定工作表的 DataFrame"""
+
+    def __init__(self, sheet_type, headers='canonical'):
+        self.sheet_type = sheet_type
+        self.headers = headers
+        self.columns = [f"Column{i + 1}" for i in range(SHEET_WIDTHS[sheet_type])]
+        for letter, name in COLUMN_HEADERS[sheet_type].items():
+            self.columns[get_column_index(letter, sheet_type)] = name if isinstance(name, str) else name[0]
+        self.rows = []
+
+    def add(self, **cells):
+        row = [None] * len(self.columns)
+        for letter, value in cells.items():
+            row[get_column_index(letter, self.sheet_type)] = value
+        self.rows.append(row)
+
+    def add_blank(self):
+        self.rows.append([None] * len(self.columns))
+
+    def to_frame(self):
+        df = pd.DataFrame(self.rows, columns=self.columns, dtype=object)
+        if self.headers == 'variant':
+            df.columns = [vary_header(name, i) for i, name in enumerate(self.columns)]
+        elif self.headers == 'drift':
+            df.insert(DRIFT_POSITION, 'Remark', [f"remark {i}" if i % 3 == 0 else None for i in range(len(df))])
+        elif self.headers == 'multirow':
+            groups, subs = zip(*(split_header(name) for name in self.columns))
+            # 同一分组的相邻列合并，分组名称只写在第一列
+            groups = [group if i == 0 or group != groups[i - 1] else '' for i, group in enumerate(groups)]
+            df = pd.concat([pd.DataFrame([[sub or None for sub in subs]], columns=self.columns, dtype=object), df],
+                           ignore_index=True)
+            df.columns = groups
+        return df
+
+def make_ids(prefix_value, count):
+    return [f"0x{prefix_value + i:04X}" for i in range(count)]
+
+def build_source_sheets(dids, rids, rnd, headers='canonical'):
+    """生成 CURR_REL 标准诊断表的三个工作表
+    Args:
+        dids: DID 列表 (带 0x)，前三分之二放在 3.1Basic DIDs，其余放在 3.2RDBI 0x22 & WDBI 0x2E
+        rids: RID 列表 (带 0x)
+        rnd: random.Random
+        headers: 表头形式 (见 HEADER_STYLES)
+    Returns:
+        dict: {工作表名称: DataFrame}
+    """
+    split = len(dids) * 2 // 3
+
+    basic = SheetBuilder('basic_did', headers)
+    basic.add(A='Section: Basic DIDs')
+    for i, did in enumerate(dids[:split]):
+        basic.add(
+            A=did, B=f"  Name {did} ", C="名称", E=rnd.choice(['Y', 'Y', 'Y', 'N', None]),
+            F=rnd.choice([1, 2, 4, 17]),
+            H=rnd.choice(SUPPORT), I=rnd.choice(ACCESS_LEVELS), J=rnd.choice(SESSIONS),
+            K=rnd.choice(SUPPORT), L=rnd.choice(ACCESS_LEVELS), M=rnd.choice(SESSIONS),
+            N=rnd.choice(SUPPORT), O=rnd.choice(ACCESS_LEVELS), P=rnd.choice(SESSIONS),
+            R=rnd.choice(SUPPORT), S=rnd.choice(ACCESS_LEVELS), T=rnd.choice(SESSIONS),
+            AB=rnd.choice(FORMATS),
+        )
+        if i % 17 == 5:
+            basic.add_blank()
+
+    rdbi = SheetBuilder('rdbi_wdbi', headers)
+    for did in dids[split:]:
+        rdbi.add(
+            A=did, B=f"Name {did}", D=rnd.choice([1, 3, 8]), E='EEPROM',
+            F=rnd.choice(SUPPORT), G=rnd.choice(ACCESS_LEVELS), I=rnd.choice(SUPPORT), J=rnd.choice(ACCESS_LEVELS),
+            L=rnd.choice(SUPPORT), M=rnd.choice(ACCESS_LEVELS), P=rnd.choice(SUPPORT), Q=rnd.choice(ACCESS_LEVELS),
+            Z=rnd.choice(FORMATS),
+        )
+
+    # 每个 RID 支持一到三个子服务，每个子服务一行 Req 一行 Resp；RID 信息只写在分段的第一行
+    # Subfunction 写成 0x01 的形式：整列都是 '01' 这样的数字字符串时 pandas 会把整列读取为整数
+    routine = SheetBuilder('routine_control', headers)
+    for rid in rids:
+        subservices = rnd.choice([['01'], ['01', '03'], ['01', '02', '03']])
+        first = {'A': rid, 'B': f"Routine {rid}", 'D': rnd.choice(['L1', 'Locked', 'L2']),
+                 'E': rnd.choice(['03', '02'])}
+        for subservice in subservices:
+            routine.add(**first, G=f"0x{subservice}", H='Req', M=rnd.choice([None, 8]))
+            routine.add(G=f"0x{subservice}", H='Resp', M=rnd.choice([8, 16, 24, 'Var', 32]))
+            first = {}
+
+    return {
+        SOURCE_SHEET1: basic.to_frame(),
+        SOURCE_SHEET2: rdbi.to_frame(),
+        SOURCE_SHEET3: routine.to_frame(),
+    }
+
+def build_target_sheets(dids, rids, rnd, churn):
+    """生成 LAST_REL 模板诊断表的两个工作表
+    模板中约 churn 比例的 DID/RID 在 source 中不存在 (会被删除)，source 中约 churn 比例的 DID/RID 不在模板中 (会被新增)
+    """
+    removed_dids = make_ids(0xAA00, int(len(dids) * churn))
+    target_dids = [did for did in dids if rnd.random() >= churn] + removed_dids
+    rnd.shuffle(target_dids)
+    did_library = SheetBuilder('did_library')
+    for did in target_dids:
+        # 模板中的 DID 不带 0x 前缀
+        did_library.add(A=did[2:], B='old', C='HEX', D=1, E='22', F='NA', G='NA', H='Lock')
+
+    removed_rids = make_ids(0x0F00, max(1, int(len(rids) * churn)) if churn else 0)
+    target_rids = [rid for rid in rids if rnd.random() >= churn] + removed_rids
+    rid_library = SheetBuilder('rid_library')
+    for rid in target_rids:
+        for k in range(3):
+            # RID 和 Description 三行合并，写入后只保留第一行的值
+            rid_library.add(A=rid, B='old desc', C='Y', D='N', E=f"0x0{k + 1}", F='L1', G='0x03',
+                            H='NA', I=1, J='NA', K='NA')
+
+    return {
+        TARGET_SHEET1: did_library.to_frame(),
+        TARGET_SHEET2: rid_library.to_frame(),
+    }
+
+def generate_pair(source_file, target_file, n_dids=100, n_rids=10, churn=0.1, seed=0, headers='canonical'):
+    """生成一对标准诊断表和模板诊断表
+    Args:
+        source_file: 标准诊断表 (CURR_REL) 保存路径
+        target_file: 模板诊断表 (LAST_REL) 保存路径
+        n_dids: source 中的 DID 数
+        n_rids: source 中的 RID 数
+        churn: 新增/删除的 DID、RID 占比 (0 ~ 1)
+        seed: 随机数种子，相同参数生成的文件内容相同
+        headers: 标准诊断表的表头形式 (见 HEADER_STYLES)，各种形式的处理结果相同
+    """
+    if headers not in HEADER_STYLES:
+        raise ValueError(f"未知的表头形式: {headers} (可选: {', '.join(HEADER_STYLES)})")
+    rnd = random.Random(seed)
+    dids = make_ids(0xF100, n_dids)
+    rids = make_ids(0x0200, n_rids)
+    source_sheets = build_source_sheets(dids, rids, rnd, headers)
+    target_sheets = build_target_sheets(dids, rids, rnd, churn)
+
+    save_excel_workbook(source_file, [(name, df, []) for name, df in source_sheets.items()])
+    rid_col = get_column_index('A', 'rid_library')
+    desc_col = get_column_index('B', 'rid_library')
+    save_excel_workbook(target_file, [
+        (TARGET_SHEET1, target_sheets[TARGET_SHEET1], []),
+        (TARGET_SHEET2, target_sheets[TARGET_SHEET2], [rid_col, desc_col]),
+    ])
+
+def generate_vehicle(vehicle_dir, ecus=('CDC',), n_dids=100, n_rids=10, churn=0.1, seed=0, headers='canonical'):
+    """按 get_data_dirs 的目录结构生成一个车辆的 CURR_REL/LAST_REL，每个 ECU 一对文件
+    Returns:
+        list: [(标准诊断表, 模板诊断表)]
+    """
+    curr_rel_dir = os.path.join(vehicle_dir, "CURR_REL")
+    last_rel_dir = os.path.join(vehicle_dir, "LAST_REL")
+    for directory in (curr_rel_dir, last_rel_dir, os.path.join(vehicle_dir, "OUTPUT")):
+        os.makedirs(directory, exist_ok=True)
+
+    files = []
+    for i, ecu in enumerate(ecus):
+        source_file = os.path.join(curr_rel_dir, f"{ecu}_Diag_Spec.xlsx")
+        target_file = os.path.join(last_rel_dir, f"{ecu}_Test_Param.xlsx")
+        generate_pair(source_file, target_file, n_dids, n_rids, churn, seed + i, headers)
+        files.append((source_file, target_file))
+    return files
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='生成合成诊断表')
+    parser.add_argument('vehicle_dir', help='输出目录 (生成 CURR_REL/LAST_REL/OUTPUT 子目录)')
+    parser.add_argument('--dids', type=int, default=100, help='每个 ECU 的 DID 数')
+    parser.add_argument('--rids', type=int, default=10, help='每个 ECU 的 RID 数')
+    parser.add_argument('--churn', type=float, default=0.1, help='新增/删除的 DID、RID 占比 (0 ~ 1)')
+    parser.add_argument('--ecus', type=str, default='CDC', help='ECU 名称，多个用逗号分隔')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--headers', choices=HEADER_STYLES, default='canonical',
+                        help='标准诊断表的表头形式：与配置相同、写法不同、插入一列或两行表头')
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.churn <= 1:
+        parser.error('--churn 必须在 0 ~ 1 之间')
+    ecus = [ecu.strip() for ecu in args.ecus.split(',') if ecu.strip()]
+    for source_file, target_file in generate_vehicle(args.vehicle_dir, ecus, args.dids, args.rids,
+                                                     args.churn, args.seed, args.headers):
+        print(f"已生成: {source_file}\n        {target_file}")
+
+if __name__ == "__main__":
+    main()
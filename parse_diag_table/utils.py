@@ -16,92 +16,231 @@
 -------------------------------------------------
 """
 
+import os
 import pandas as pd
 import warnings
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl import Workbook
+from openpyxl.styles import Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
 import numpy as np
+from parse_diag_table.profiling import timed, record_count
 
 # 忽略 openpyxl 的样式警告
 warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl.styles.stylesheet')
 
-def read_excel(file_path, sheet_name):
+def read_excel(file_path, sheet_name, reader=None):
     # 读取 Excel 文件，将 NA 值读取为字符串
-    df = pd.read_excel(file_path, sheet_name=sheet_name, na_filter=False)
-    
-    def process_cell_value(value):
-        """处理单元格的值
-        Args:
-            value: 单元格的值
-        Returns:
-            处理后的值:
-            - 空字符串、纯空格：转换为 pd.NA
-            - 字符串 'NA', 'NAN'：保持原值
-            - pandas.NA：转换为 pd.NA
-            - 其他：保持原值
-        """
-        # 处理字符串类型
-        if isinstance(value, str):
-            # 去除前后空格
-            value = value.strip()
-            # 如果是空字符串，转为 pd.NA
-            if value == '':
-                return pd.NA
-            # 其他字符串保持原值
-            return value
-            
-        # 处理 pandas 的 NA 类型
-        if pd.isna(value):
-            return pd.NA
-            
-        # 其他类型保持原值
-        return value
-    
-    # 处理每一列的数据
-    for col in df.columns:
-        df[col] = df[col].apply(process_cell_value)
-    
+    return read_excel_sheets(file_path, [sheet_name], reader)[sheet_name]
+
+def read_excel_sheets(file_path, sheet_names, reader=None, stream=None):
+    """一次打开 Excel 文件，读取并预处理多个工作表
+    Args:
+        file_path: Excel 文件路径
+        sheet_names: 需要读取的工作表名称列表
+        reader: 读取后端 (见 readers.py)，None 时使用 config.EXCEL_READER
+        stream: 为 True 时，STREAM_SHEETS 中的工作表 (3.1/3.2/3.3) 流式读取，只保留列映射中的列；
+            None 时使用 config.STREAM_SOURCE_SHEETS
+    Returns:
+        dict: {工作表名称: 预处理后的 DataFrame}
+    """
+    # 读取后端和工作表结构在这里才导入，utils 只依赖 profiling，其他模块都可以导入它而不会循环导入
+    from parse_diag_table.readers import read_raw_sheets, read_sheet_columns
+    from parse_diag_table.config import STREAM_SHEETS, STREAM_SOURCE_SHEETS, SHEET_TYPES
+    from parse_diag_table.schema import compile_schema
+
+    stream = STREAM_SOURCE_SHEETS if stream is None else stream
+    streamed = [name for name in sheet_names if stream and name in STREAM_SHEETS]
+    sheets = {}
+    for name in streamed:
+        with timed('stream_sheet', name):
+            # 保留的列按表头确定 (与处理时编译的工作表结构相同)；空行在流式读取时已经跳过，逐列预处理时只清理单元格的值
+            sheets[name] = read_sheet_columns(
+                file_path, name,
+                lambda labels, name=name: compile_schema(labels, SHEET_TYPES[name], name, warn=False).positions.values(),
+                normalize=lambda df: normalize_df(df, drop_empty_rows=False))
+        record_count('sheet_rows', len(sheets[name]))
+
+    # 其余工作表只打开一次文件，再依次读取
+    rest = [name for name in sheet_names if name not in sheets]
+    raw_sheets, _ = read_raw_sheets(file_path, rest, reader) if rest else ({}, None)
+    for name in rest:
+        with timed('normalize_sheet', name):
+            sheets[name] = normalize_df(raw_sheets.pop(name))
+        record_count('sheet_rows', len(sheets[name]))
+    return {name: sheets[name] for name in sheet_names}
+
+def normalize_df(df, drop_empty_rows=True):
+    """统一处理读取到的 DataFrame：清理单元格的值并删除空行 (drop_empty_rows 为 False 时不删除)
+    对整个 DataFrame 做向量化处理，规则与逐个单元格处理时一致:
+    - 字符串：去除前后空格，空字符串、纯空格转换为 pd.NA
+    - 字符串 'NA', 'NAN'：保持原值
+    - 其他空值 (NaN, None, NaT, pd.NA)：转换为 pd.NA
+    - 其他：保持原值
+    """
+    nrows, ncols = df.shape
+    na_mask = np.zeros((nrows, ncols), dtype=bool)
+    new_columns = {}
+
+    # 文本列 (object/string) 一起处理：诊断表中的取值重复度很高，
+    # 先对所有单元格去重编码，只对去重后的值做字符串处理，再按编码映射回去
+    text_pos = [pos for pos, dtype in enumerate(df.dtypes)
+                if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)]
+    if text_pos and nrows:
+        values = df.iloc[:, text_pos].to_numpy(dtype=object).ravel(order='F')
+        codes, uniques = pd.factorize(values)
+
+        # 最后一位对应空值的编码 -1
+        unique_is_str = np.zeros(len(uniques) + 1, dtype=bool)
+        unique_is_blank = np.zeros(len(uniques) + 1, dtype=bool)
+        unique_stripped = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            if isinstance(value, str):
+                value = value.strip()
+                unique_is_str[i] = True
+                unique_is_blank[i] = value == ''
+                unique_stripped[i] = value
+
+        cell_is_str = unique_is_str[codes]
+        cell_na = (codes == -1) | unique_is_blank[codes]
+        # 非字符串单元格保留原值 (例如数字)，字符串单元格使用去除空格后的值
+        cleaned = np.where(cell_is_str, unique_stripped[codes], values)
+        cleaned[cell_na] = pd.NA
+
+        cell_is_str = cell_is_str.reshape((nrows, len(text_pos)), order='F')
+        cell_na = cell_na.reshape((nrows, len(text_pos)), order='F')
+        cleaned = cleaned.reshape((nrows, len(text_pos)), order='F')
+        for i, pos in enumerate(text_pos):
+            na_mask[:, pos] = cell_na[:, i]
+            if cell_is_str[:, i].any() or cell_na[:, i].any():
+                series = pd.Series(cleaned[:, i], index=df.index, dtype=object)
+                if not pd.api.types.is_object_dtype(df.dtypes.iloc[pos]):
+                    # 新版本 pandas 会把文本列读取为 string 类型，保持原来的列类型
+                    series = series.astype(df.dtypes.iloc[pos])
+                new_columns[pos] = series
+            else:
+                # 整列都是非字符串的值，与逐个处理时一样推断列类型
+                new_columns[pos] = df.iloc[:, pos].infer_objects()
+
+    # 数值、日期等其他类型的列只需要把空值统一转换为 pd.NA
+    for pos in range(ncols):
+        if pos in new_columns:
+            continue
+        series = df.iloc[:, pos]
+        col_na = series.isna().to_numpy(dtype=bool)
+        if col_na.any():
+            na_mask[:, pos] = col_na
+            new_columns[pos] = series.astype(object).mask(col_na, pd.NA)
+
+    for pos, series in new_columns.items():
+        df.isetitem(pos, series)
+
     # 删除所有值都是空值的行（不包括 'NA' 字符串）
-    df = df.dropna(how='all')
+    if drop_empty_rows:
+        df = df.loc[~na_mask.all(axis=1)] if ncols else df.iloc[0:0]
     
     # 重置索引
     df = df.reset_index(drop=True)
     return df
 
-def save_excel(df, file_path, sheet_name, mode='w'):
+def replace_rows(df, drop_positions, new_rows):
+    """删除指定行并在末尾追加新行，只做一次拼接
+    Args:
+        df: DataFrame
+        drop_positions: 需要删除的行号 (按位置)
+        new_rows: 需要追加的行，每行是与 df 列数相同的列表
+    Returns:
+        DataFrame: 处理后的 DataFrame，索引重新从 0 开始
     """
-    保存 DataFrame 到 Excel 文件
-    :param df: DataFrame 对象
-    :param file_path: 保存路径
-    :param sheet_name: 工作表名称
-    :param mode: 'w' 表示覆盖写入，'a' 表示追加写入
+    keep = np.ones(len(df), dtype=bool)
+    keep[list(drop_positions)] = False
+    kept_df = df.iloc[keep]
+    if not new_rows:
+        return kept_df.reset_index(drop=True)
+
+    new_df = pd.DataFrame(new_rows, columns=df.columns)
+    if kept_df.empty:
+        return new_df
+    return pd.concat([kept_df, new_df], ignore_index=True)
+
+# 表头样式与 pandas to_excel 写出的表头保持一致
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                       top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+def get_column_widths(df):
+    """按列中最长的内容 (包括表头) 计算列宽
+    空值的长度按 0 计算：pandas 3 中全为空值的列 str.len() 的结果是 NaN，列宽为 NaN 时写出的文件无法再打开
+    """
+    widths = []
+    for idx, col in enumerate(df.columns):
+        max_length = max(
+            int(df.iloc[:, idx].astype(str).str.len().fillna(0).max()) if len(df) else 0,
+            len(str(col))
+        )
+        widths.append(max_length + 2)
+    return widths
+
+def get_merge_ranges(df, key_col_idx):
+    """按 key 列中连续相同的值分组，返回每组的 Excel 起止行号 (第 1 行是标题)"""
+    ranges = []
+    current_key = None
+    merge_start = 2
+    for row, key in enumerate(df.iloc[:, key_col_idx], start=2):
+        if current_key != key:
+            if current_key is not None:
+                ranges.append((merge_start, row - 1))
+            current_key = key
+            merge_start = row
+    if current_key is not None:
+        ranges.append((merge_start, len(df) + 1))
+    return ranges
+
+def save_excel_workbook(file_path, sheets):
+    """一次写出包含多个工作表的 Excel 文件
+    所有工作表的数据、合并单元格和列宽都在内存中完成，只保存一次，不重新读取文件
+    Args:
+        file_path: 保存路径
+        sheets: [(工作表名称, DataFrame, 合并列索引列表)]
+            合并列索引列表为空时不合并；否则按第一列中连续相同的值，
+            合并列表中每一列对应的单元格 (例如 31_RID_Library 的 A 列和 B 列)
     """
     try:
-        if mode == 'w':
-            # 创建新的 Excel 文件
-            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                # 获取工作表
-                worksheet = writer.sheets[sheet_name]
-                # 调整列宽
-                for idx, col in enumerate(df.columns):
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(str(col))
-                    )
-                    worksheet.column_dimensions[chr(65 + idx)].width = max_length + 2
-        else:
-            # 追加到现有文件
-            with pd.ExcelWriter(file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                # 获取工作表
-                worksheet = writer.sheets[sheet_name]
-                # 调整列宽
-                for idx, col in enumerate(df.columns):
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(str(col))
-                    )
-                    worksheet.column_dimensions[chr(65 + idx)].width = max_length + 2
+        wb = Workbook()
+        wb.remove(wb.active)
+        for sheet_name, df, merge_cols in sheets:
+            with timed('save_build_sheet', sheet_name):
+                ws = wb.create_sheet(sheet_name)
+                write_sheet(ws, df, merge_cols)
+
+        with timed('save_write_file', os.path.basename(file_path)):
+            wb.save(file_path)
     except Exception as e:
         print(f"保存 Excel 文件时出错: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def write_sheet(ws, df, merge_cols):
+    """把 DataFrame 写入工作表：表头样式、数据、列宽和合并单元格"""
+    # 写入表头
+    ws.append([str(col) for col in df.columns])
+    for cell in ws[1]:
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+
+    # 写入数据，空值写为空单元格
+    values = df.astype(object).where(df.notna(), None).to_numpy()
+    for row in values.tolist():
+        ws.append(row)
+
+    # 调整列宽
+    for idx, width in enumerate(get_column_widths(df)):
+        ws.column_dimensions[get_column_letter(idx + 1)].width = width
+
+    # 合并单元格
+    if merge_cols:
+        with timed('save_merge_cells', ws.title):
+            for start_row, end_row in get_merge_ranges(df, merge_cols[0]):
+                for col_idx in merge_cols:
+                    letter = get_column_letter(col_idx + 1)
+                    ws.merge_cells(f'{letter}{start_row}:{letter}{end_row}')
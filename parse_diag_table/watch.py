@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+# watch 模式：轮询各车辆的 CURR_REL/LAST_REL 目录，文件修改后只重新生成对应 ECU 的输出文件
+# - 已解析的工作表保留在内存中，按文件大小和修改时间判断是否需要重新读取，未修改的文件不再读取
+# - 文件在 WATCH_DEBOUNCE 秒内没有再变化才处理，保存过程中写了一半的文件不会被读取
+# - 只关注 .xlsx 文件：Excel 的 ~$ 锁文件和保存时的临时文件不会触发处理
+# 用法: python main.py watch [--vehicle BLANC_RL201] [--interval 0.5] [--debounce 1.0]
+
+import os
+import time
+
+from parse_diag_table.config import (
+    SOURCE_SHEETS, TARGET_SHEETS, WATCH_INTERVAL, WATCH_DEBOUNCE, EXPORT_SQLITE, get_data_dirs
+)
+from parse_diag_table.batch import (
+    get_excel_files, get_ecu_name, get_vehicle_prefixes, get_vehicle_pairs, get_output_file, process_file_pair,
+)
+
+def file_signature(file_path):
+    """文件的 (大小, 修改时间)，文件不存在时返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def scan_files(vehicle_types):
+    """扫描所有车辆的 CURR_REL/LAST_REL 目录
+    Returns:
+        dict: {文件路径: (车辆类型, 签名)}
+    """
+    files = {}
+    for vehicle_type in vehicle_types:
+        curr_rel_dir, last_rel_dir, _ = get_data_dirs(vehicle_type)
+        for directory in (curr_rel_dir, last_rel_dir):
+            try:
+                file_paths = get_excel_files(directory)
+            except OSError:
+                continue
+            for file_path in file_paths:
+                signature = file_signature(file_path)
+                if signature is not None:
+                    files[file_path] = (vehicle_type, signature)
+    return files
+
+class WarmSheets:
+    """保留在内存中的工作表：文件签名与上一次读取时相同时直接返回上一次的结果
+    处理模块不修改传入的工作表 (模板工作表会先复制)，同一份结果可以反复使用
+    """
+
+    def __init__(self, use_cache=True, reader=None, stream=None):
+        self.use_cache = use_cache
+        self.reader = reader
+        self.stream = stream
+        self.entries = {}
+
+    def read(self, file_path, sheet_names):
+        """与 read_excel_sheets 相同，可以作为 process_file_pair 的 loader"""
+        key = (file_path, tuple(sheet_names))
+        signature = file_signature(file_path)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        if self.use_cache:
+            from parse_diag_table.cache import read_excel_sheets_cached
+            sheets = read_excel_sheets_cached(file_path, sheet_names, reader=self.reader, stream=self.stream)
+        else:
+            from parse_diag_table.utils import read_excel_sheets
+            sheets = read_excel_sheets(file_path, sheet_names, self.reader, self.stream)
+        # 读取过程中文件又被修改时不保留，下一次重新读取
+        if file_signature(file_path) == signature:
+            self.entries[key] = (signature, sheets)
+        else:
+            self.entries.pop(key, None)
+        return sheets
+
+    def discard(self, file_path):
+        for key in [key for key in self.entries if key[0] == file_path]:
+            del self.entries[key]
+
+class Watcher:
+    """监视多个车辆类型的目录，按 ECU 重新生成输出文件"""
+
+    def __init__(self, vehicle_types, interval=None, debounce=None, use_cache=True, incremental=True,
+                 reader=None, stream=None, export=None):
+        self.vehicle_types = vehicle_types
+        self.interval = WATCH_INTERVAL if interval is None else interval
+        self.debounce = WATCH_DEBOUNCE if debounce is None else debounce
+        self.incremental = incremental
+        self.export = EXPORT_SQLITE if export is None else export
+        self.use_cache = use_cache
+        self.reader = reader
+        self.sheets = WarmSheets(use_cache, reader, stream)
+        self.files = {}
+        # 有变化、还没有处理的文件 {文件路径: (车辆类型, 最后一次变化的时间)}
+        self.pending = {}
+        self.regenerated = 0
+        self.failed = 0
+
+    def vehicle_tasks(self, vehicle_type, ecus=None):
+        """按当前目录中的文件重新配对，返回需要处理的任务和无法配对的 ECU
+        Returns:
+            list: [(车辆类型, ECU 名称, 标准诊断表, 模板诊断表, 输出文件)]
+            list: [(ECU 名称, 错误信息)]
+        """
+        pairs, pair_errors, output_dir = get_vehicle_pairs(vehicle_type)
+        os.makedirs(output_dir, exist_ok=True)
+        tasks = [(vehicle_type, ecu, source_file, target_file, get_output_file(output_dir, target_file))
+                 for ecu, source_file, target_file in pairs if ecus is None or ecu in ecus]
+        errors = [(ecu, message) for ecu, message in pair_errors if ecus is None or ecu in ecus]
+        return tasks, errors
+
+    def start(self):
+        """读取所有 ECU 的工作表并保留在内存中；输出文件不存在或比输入文件旧的 ECU 立即重新生成"""
+        self.files = scan_files(self.vehicle_types)
+        for vehicle_type in self.vehicle_types:
+            try:
+                tasks, errors = self.vehicle_tasks(vehicle_type)
+            except FileNotFoundError as e:
+                print(f"[{vehicle_type}] 跳过: {e}")
+                continue
+            for ecu, message in errors:
+                print(f"[{vehicle_type}] {ecu} 无法配对: {message}")
+            for task in tasks:
+                _, ecu, source_file, target_file, output_file = task
+                output_signature = file_signature(output_file)
+                inputs = [file_signature(source_file), file_signature(target_file)]
+                if output_signature is None or any(s is None or s[1] > output_signature[1] for s in inputs):
+                    self.regenerate(task)
+                    continue
+                try:
+                    self.sheets.read(source_file, SOURCE_SHEETS)
+                    self.sheets.read(target_file, TARGET_SHEETS)
+                except Exception as e:
+                    # 读取失败的文件在下一次修改时再处理
+                    print(f"[{vehicle_type}] {ecu} 读取失败: {type(e).__name__}: {e}")
+        if self.export:
+            # 输出文件已是最新、但上一次导出之后又被重新生成过 (或还没有导出过) 的 ECU
+            from parse_diag_table.export import export_vehicles
+            export_vehicles(self.vehicle_types, use_cache=self.use_cache, reader=self.reader)
+
+    def poll(self, now=None):
+        """扫描一次目录，处理已经稳定的修改
+        Returns:
+            int: 本次重新生成的 ECU 数
+        """
+        now = time.monotonic() if now is None else now
+        current = scan_files(self.vehicle_types)
+        for file_path in set(current) | set(self.files):
+            if current.get(file_path) != self.files.get(file_path):
+                vehicle_type = (current.get(file_path) or self.files.get(file_path))[0]
+                self.pending[file_path] = (vehicle_type, now)
+        self.files = current
+
+        # 同一个 ECU 还有文件在变化时等它们都稳定后一起处理 (例如依次保存 CURR_REL 和 LAST_REL 的文件)
+        # ECU 名称与配对时相同，先去掉目录中文件名的公共前缀
+        prefixes = {vehicle_type: get_vehicle_prefixes(vehicle_type)
+                    for vehicle_type, _ in self.pending.values()}
+        unstable = {(vehicle_type, get_ecu_name(file_path, prefixes[vehicle_type]))
+                    for file_path, (vehicle_type, changed_at) in self.pending.items()
+                    if now - changed_at < self.debounce}
+        ready = [file_path for file_path, (vehicle_type, changed_at) in self.pending.items()
+                 if (vehicle_type, get_ecu_name(file_path, prefixes[vehicle_type])) not in unstable]
+        affected = {}
+        for file_path in ready:
+            vehicle_type, _ = self.pending.pop(file_path)
+            if file_path not in current:
+                self.sheets.discard(file_path)
+            affected.setdefault(vehicle_type, set()).add(get_ecu_name(file_path, prefixes[vehicle_type]))
+
+        count = 0
+        for vehicle_type, ecus in affected.items():
+            try:
+                tasks, errors = self.vehicle_tasks(vehicle_type, ecus)
+            except FileNotFoundError as e:
+                print(f"[{vehicle_type}] 跳过: {e}")
+                continue
+            for ecu, message in errors:
+                print(f"[{vehicle_type}] {ecu} 无法配对: {message}")
+            for task in tasks:
+                self.regenerate(task)
+                count += 1
+        return count
+
+    def regenerate(self, task):
+        """重新生成一个 ECU 的输出文件 (增量计算)，打印一行结果"""
+        result = process_file_pair(*task, incremental=self.incremental, loader=self.sheets.read)
+        vehicle_type, ecu = task[0], task[1]
+        stamp = time.strftime('%H:%M:%S')
+        if result['status'] == 'ok':
+            self.regenerated += 1
+            print(f"[{stamp}] [{vehicle_type}] {ecu} 已更新: {os.path.basename(result['output_file'])} "
+                  f"({result['elapsed']:.2f}s，重新计算 {result['recomputed']}，沿用 {result['reused']})", flush=True)
+            if self.export:
+                from parse_diag_table.export import export_vehicles
+                export_vehicles([vehicle_type], use_cache=self.use_cache, reader=self.reader)
+        else:
+            # 文件可能还没有保存完整，修改后会再次处理
+            self.failed += 1
+            print(f"[{stamp}] [{vehicle_type}] {ecu} 失败: {result['error']}", flush=True)
+        return result
+
+    def run(self, max_polls=None):
+        """一直运行到 Ctrl+C (或轮询 max_polls 次)"""
+        self.start()
+        print(f"正在监视 {', '.join(self.vehicle_types)} 的 CURR_REL/LAST_REL 目录 "
+              f"(间隔 {self.interval}s，文件稳定 {self.debounce}s 后处理)，按 Ctrl+C 退出", flush=True)
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                time.sleep(self.interval)
+                self.poll()
+                polls += 1
+        except KeyboardInterrupt:
+            pass
+        print(f"\n停止监视: 共重新生成 {self.regenerated} 次，失败 {self.failed} 次")
+        return 0
+
+def watch(vehicle_types, interval=None, debounce=None, use_cache=True, incremental=True, reader=None, stream=None,
+          export=None):
+    """监视目录并在文件修改后重新生成对应 ECU 的输出文件
+    Args:
+        vehicle_types: 车辆类型列表
+        interval: 轮询间隔 (秒)，None 时使用 config.WATCH_INTERVAL
+        debounce: 文件最后一次变化后需要保持不变的时间 (秒)，None 时使用 config.WATCH_DEBOUNCE
+        use_cache: 第一次读取文件时是否使用解析缓存
+        incremental: 是否只重新计算有变化的 DID/RID
+        reader: Excel 读取后端，None 时使用 config.EXCEL_READER
+        stream: 是否流式读取 source 工作表，None 时使用 config.STREAM_SOURCE_SHEETS
+        export: 重新生成后是否导出 SQLite 数据库 (见 export.py)，None 时使用 config.EXPORT_SQLITE
+    """
+    return Watcher(vehicle_types, interval, debounce, use_cache, incremental, reader, stream, export).run()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+from parse_diag_table.batch import get_ecu_name, pair_excel_files
+
+
+def test_pair_without_prefix():
+    """没有公共前缀时按文件名的第一段配对"""
+    pairs, errors = pair_excel_files(['CURR_REL/CDC_Diag_Spec_V2.xlsx'], ['LAST_REL/CDC_Test_Param.xlsx'])
+    assert pairs == [('CDC', 'CURR_REL/CDC_Diag_Spec_V2.xlsx', 'LAST_REL/CDC_Test_Param.xlsx')]
+    assert errors == []
+
+
+def test_pair_shared_prefix_and_duplicate():
+    """所有文件名都以 NIO_XXX_ 开头时按其后的一段配对，重复的 ECU 仍然报错"""
+    sources = ['CURR_REL/NIO_XXX_CDC_Diag_V1.xlsx', 'CURR_REL/NIO_XXX_CDC_Diag_V2.xlsx',
+               'CURR_REL/NIO_XXX_ADCU_Diag.xlsx', 'CURR_REL/NIO_XXX_BCM_Diag.xlsx']
+    targets = ['LAST_REL/NIO_XXX_CDC_Test.xlsx', 'LAST_REL/NIO_XXX_ADCU_Test.xlsx']
+    pairs, errors = pair_excel_files(sources, targets)
+    assert pairs == [('ADCU', 'CURR_REL/NIO_XXX_ADCU_Diag.xlsx', 'LAST_REL/NIO_XXX_ADCU_Test.xlsx')]
+    assert [ecu for ecu, _ in errors] == ['BCM', 'CDC']
+    assert 'ECU 名称重复' in errors[1][1]
+
+
+def test_pair_prefix_from_other_directory():
+    """只有一个文件的目录使用另一个目录的公共前缀"""
+    sources = ['CURR_REL/NIO_XXX_CDC_Diag.xlsx', 'CURR_REL/NIO_XXX_ADCU_Diag.xlsx']
+    targets = ['LAST_REL/NIO_XXX_CDC_Test.xlsx']
+    pairs, errors = pair_excel_files(sources, targets)
+    assert [ecu for ecu, _, _ in pairs] == ['CDC']
+    assert errors[0][0] == 'ADCU'
+
+
+def test_prefix_keeps_last_token():
+    """前缀不会去掉整个文件名"""
+    assert get_ecu_name('NIO_XXX.xlsx', (('NIO', 'XXX'),)) == 'NIO'
+    assert get_ecu_name('NIO_XXX_CDC.xlsx', (('NIO', 'XXX'),)) == 'CDC'
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import threading
+
+from parse_diag_table import pipeline
+
+
+class WriterCrash(BaseException):
+    """保存时写出线程意外退出 (不是普通的保存错误)"""
+
+
+def fake_process_file_pair(vehicle, ecu, source_file, target_file, output_file, incremental, loader, saver):
+    """与 batch.process_file_pair 相同：saver 出错时记为失败，不向外抛出"""
+    loader(source_file, [])
+    result = {'vehicle': vehicle, 'ecu': ecu, 'output_file': output_file, 'status': 'ok', 'error': None,
+              'elapsed': 0.0, 'timings': {'stages': [], 'counts': {}}}
+    try:
+        saver(result, {}, {})
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    return result
+
+
+def test_writer_crash_is_raised(monkeypatch):
+    """写出线程意外退出时主线程不会一直等待队列，而是重新抛出写出线程中的异常"""
+    def save_outputs(output_file, sheets, manifest):
+        raise WriterCrash(output_file)
+
+    monkeypatch.setattr(pipeline, 'read_pair_sheets', lambda *args: ('source', 'target'))
+    monkeypatch.setattr(pipeline, 'save_outputs', save_outputs)
+    monkeypatch.setattr(pipeline, 'process_file_pair', fake_process_file_pair)
+    tasks = [('SYN', f'ECU{i}', f'source{i}.xlsx', f'target{i}.xlsx', f'output{i}.xlsx') for i in range(20)]
+
+    outcome = {}
+    def run():
+        try:
+            pipeline.run_pipelined(tasks, depth=1)
+        except RuntimeError as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "写出线程退出后主线程仍在等待"
+    assert isinstance(outcome['error'].__cause__, WriterCrash)
+
+
+def test_save_error_does_not_stop(monkeypatch):
+    """单个文件保存出错时记为失败，其他文件继续处理"""
+    def save_outputs(output_file, sheets, manifest):
+        if output_file == 'output1.xlsx':
+            raise OSError('disk full')
+
+    monkeypatch.setattr(pipeline, 'read_pair_sheets', lambda *args: ('source', 'target'))
+    monkeypatch.setattr(pipeline, 'save_outputs', save_outputs)
+    monkeypatch.setattr(pipeline, 'process_file_pair', fake_process_file_pair)
+    tasks = [('SYN', f'ECU{i}', f'source{i}.xlsx', f'target{i}.xlsx', f'output{i}.xlsx') for i in range(3)]
+
+    results = pipeline.run_pipelined(tasks, depth=1)
+    assert [result['status'] for result in results] == ['ok', 'failed', 'ok']
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import gc
+import weakref
+
+from parse_diag_table.records import POOL, DidRecord, RecordTable, get_pool, pool_scope
+
+
+def build_table():
+    return RecordTable.from_rows(['F190'], DidRecord.__slots__[:2], [('VIN', 'ASCII')], DidRecord)
+
+
+def test_pool_scope_does_not_grow_process_pool():
+    """pool_scope 中建立的表使用单独的取值表，进程共用的 POOL 不增长"""
+    size = len(POOL)
+    with pool_scope() as pool:
+        table = build_table()
+        assert get_pool() is pool
+    assert get_pool() is POOL
+    assert len(POOL) == size
+    assert table.pool is pool
+    assert table.record('F190').description == 'VIN'
+
+
+def test_pool_released_with_tables():
+    with pool_scope():
+        table = build_table()
+    pool = weakref.ref(table.pool)
+    del table
+    gc.collect()
+    assert pool() is None
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import pytest
+
+from parse_diag_table.schema import ColumnDriftError, compile_schema
+
+HEADERS = ['DID', 'Description', 'Format', 'Length', 'APP', 'Boot', 'Security Level(2E)', 'Security Level(22)']
+
+
+def test_unknown_header_uses_configured_position():
+    """表头写法不同时按配置中的位置使用该列，并记录在 unchecked 中"""
+    labels = HEADERS[:1] + ['Desc'] + HEADERS[2:]
+    schema = compile_schema(labels, 'did_library', warn=False)
+    assert schema['B'] == 1
+    assert schema.unchecked == {'B': 'Desc'}
+
+
+def test_unknown_header_strict():
+    labels = HEADERS[:1] + ['Desc'] + HEADERS[2:]
+    with pytest.raises(ColumnDriftError):
+        compile_schema(labels, 'did_library', warn=False, strict=True)
+
+
+def test_moved_column_found_by_header():
+    """插入一列后，后面的列按表头使用实际位置"""
+    labels = HEADERS[:2] + ['Remark'] + HEADERS[2:]
+    schema = compile_schema(labels, 'did_library', warn=False, strict=True)
+    assert schema['C'] == 3 and schema['H'] == 8
+    assert schema.moved['C'] == (2, 3)
+
+
+def test_too_narrow_sheet():
+    with pytest.raises(ColumnDriftError):
+        compile_schema(HEADERS[:5], 'did_library', warn=False)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import pytest
+from openpyxl import load_workbook
+
+from parse_diag_table.config import SOURCE_SHEETS
+from parse_diag_table.schema import compile_schemas
+from parse_diag_table.synthetic import HEADER_STYLES, generate_pair
+from parse_diag_table.utils import read_excel_sheets
+
+
+@pytest.mark.parametrize('headers', HEADER_STYLES)
+def test_generated_pair(tmp_path, headers):
+    """生成的文件可以用 openpyxl 打开，各种表头形式的列都对应到与 canonical 相同的数据"""
+    source_file, target_file = str(tmp_path / 'CDC_Diag_Spec.xlsx'), str(tmp_path / 'CDC_Test_Param.xlsx')
+    generate_pair(source_file, target_file, n_dids=30, n_rids=5, headers=headers)
+    load_workbook(source_file)
+    load_workbook(target_file)
+
+    sheets = read_excel_sheets(source_file, SOURCE_SHEETS)
+    schemas = compile_schemas(sheets)
+    if headers == 'drift':
+        assert schemas[SOURCE_SHEETS[0]].moved
+    elif headers == 'multirow':
+        assert schemas[SOURCE_SHEETS[0]].unchecked
+    else:
+        assert not schemas[SOURCE_SHEETS[0]].moved and not schemas[SOURCE_SHEETS[0]].unchecked
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+-------------------------------------------------
+   NIO PIT 自动化工具
+   Author:  Charles Xu (charles.xu2@nio.com)
+   Company: NIO
+   Created: 2026-10-18 | Version: 1.0
+-------------------------------------------------
+   Copyright (c) 2026 Charles Xu (NIO)
+   Licensed under the MIT License:
+   https://opensource.org/licenses/MIT
+-------------------------------------------------
+   Change Log:
+   2026-10-18  Charles Xu  Initial creation
+-------------------------------------------------
+"""
+
+import math
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from parse_diag_table.utils import get_column_widths, save_excel_workbook
+
+
+@pytest.mark.parametrize('dtype', [object, 'string'])
+def test_empty_column_width(dtype):
+    """全为空值的列按表头计算列宽，不能是 NaN"""
+    df = pd.DataFrame({'DID': ['F190'], 'Note': pd.Series([pd.NA], dtype=dtype)})
+    widths = get_column_widths(df)
+    assert all(not math.isnan(width) for width in widths)
+    assert widths[1] >= len('Note') + 2
+
+
+def test_save_empty_column_reopens(tmp_path):
+    """含有全为空值的列时，写出的文件可以用 openpyxl 重新打开"""
+    df = pd.DataFrame({'DID': ['F190', 'F18C'], 'Note': pd.Series([pd.NA, pd.NA], dtype=object)})
+    file_path = tmp_path / 'empty_column.xlsx'
+    save_excel_workbook(str(file_path), [('22_2E_DID_Library', df, [])])
+
+    ws = load_workbook(file_path)['22_2E_DID_Library']
+    assert [cell.value for cell in ws[1]] == ['DID', 'Note']
+    assert ws['B2'].value is None
+    assert ws.column_dimensions['B'].width >= len('Note') + 2